@@ -1,13 +1,25 @@
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import HTMLResponse
-from jose import jwt, JWTError
 
-import sqlite3
 import json
-import os
 from pathlib import Path
 
-from roles import AccountType, ROLE_PERMISSIONS
+from roles import AccountType, compiled_roles
+import query_stats
+from storage import get_storage
+from settings import admin_emails, is_admin_email, stats as config_stats
+from json_responses import FastJSONResponse, row_dicts
+from Dashboard.auth import current_user
+from token_cache import stats as token_cache_stats
+from password_hashing import pool as hash_pool
+from mailer import outbox_stats
+from twofa_store import challenges as twofa_challenges
+from login_limiter import stats as login_limiter_stats
+from static_pages import stats as static_pages_stats
+from Dashboard.widget import stats as widget_cache_stats
+from roblox_api import stats as roblox_stats
+from static_assets import asset, stats as static_assets_stats
+from templates import Template
 from dashboard import BASE_STYLE, ME_ENDPOINT  # reuse your existing style + /auth/me path
 
 router = APIRouter()
@@ -15,94 +27,40 @@ router = APIRouter()
 BASE_DIR = Path(__file__).resolve().parents[1]
 DB_PATH = BASE_DIR / "dreambox.db"
 ROLES_JSON_PATH = BASE_DIR / "config" / "roles.json"
-ADMINS_JSON_PATH = BASE_DIR / "config" / "admins.json"
 
-# JWT (must match app.py)
-SECRET_KEY = os.environ.get("SECRET_KEY", "CHANGE_ME_TO_A_LONG_RANDOM_SECRET")
-ALGORITHM = "HS256"
 
-
-def html_page(title: str, body: str) -> HTMLResponse:
-    return HTMLResponse(
-        f"""<!doctype html>
+PAGE_SHELL = Template("""<!doctype html>
 <html lang="en">
 <head>
   <meta charset="utf-8">
-  <title>{title}</title>
-  {BASE_STYLE}
+  <title>{{ title }}</title>
+  {{ style|safe }}
 </head>
 <body>
-  <div class="shell">{body}</div>
+  <div class="shell">{{ body|safe }}</div>
 </body>
-</html>"""
-    )
-
-
-def db():
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def _load_admin_emails() -> set[str]:
-    try:
-        data = json.loads(ADMINS_JSON_PATH.read_text(encoding="utf-8"))
-    except FileNotFoundError:
-        return set()
-    except Exception:
-        return set()
-
-    if isinstance(data, dict):
-        admins = data.get("admins", [])
-    elif isinstance(data, list):
-        admins = data
-    else:
-        admins = []
+</html>""").partial(style=BASE_STYLE)
 
-    return {str(e).strip().lower() for e in admins if str(e).strip()}
 
-
-ADMIN_EMAILS = _load_admin_emails()
-
-
-def _decode_token_get_user_id(token: str) -> int:
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        sub = payload.get("sub")
-        return int(sub)
-    except (JWTError, ValueError):
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-
-
-def _get_bearer_token(request: Request) -> str:
-    auth = request.headers.get("Authorization", "")
-    if not auth.lower().startswith("bearer "):
-        raise HTTPException(status_code=401, detail="Missing bearer token")
-    return auth.split(" ", 1)[1].strip()
+def html_page(title: str, body: str) -> HTMLResponse:
+    return PAGE_SHELL.response(title=title, body=body)
 
 
-def _get_current_user_row(request: Request) -> sqlite3.Row:
-    token = _get_bearer_token(request)
-    user_id = _decode_token_get_user_id(token)
+store = get_storage()
 
-    with db() as conn:
-        row = conn.execute(
-            "SELECT id, email, account_type, is_email_verified FROM users WHERE id=?",
-            (user_id,),
-        ).fetchone()
 
-    if not row:
-        raise HTTPException(status_code=401, detail="User not found")
-    return row
+def _get_current_user_row(request: Request) -> dict:
+    # resolved once per request by Dashboard.auth.AuthMiddleware
+    return current_user(request)
 
 
-def _require_admin(request: Request) -> sqlite3.Row:
+def _require_admin(request: Request) -> dict:
     row = _get_current_user_row(request)
     email = (row["email"] or "").strip().lower()
     acct = (row["account_type"] or "")
 
     # allowlist always wins (admins.json)
-    if email in ADMIN_EMAILS:
+    if is_admin_email(email):
         return row
 
     # otherwise must be admin account type
@@ -130,77 +88,10 @@ def _safe_assignable_account_types() -> list[str]:
     ]
 
 
-def _cleanup_user_data(conn: sqlite3.Connection, user_id: int) -> None:
-    """
-    Best-effort cleanup of rows tied to a user.
-    Only delete tables that definitely exist in your app.py init_db().
-    """
-    cur = conn.cursor()
-
-    # If you add more user-linked tables later, add them here.
-    cur.execute("DELETE FROM games WHERE owner_user_id=?", (user_id,))
-    cur.execute("DELETE FROM brands WHERE owner_user_id=?", (user_id,))
-    cur.execute("DELETE FROM survey_submissions WHERE user_id=?", (user_id,))
-    cur.execute("DELETE FROM zoom_meetings WHERE user_id=?", (user_id,))
-
-    # campaigns are tied to brands, so deleting brands first should orphan them if FK not cascading.
-    # clean orphan campaigns too:
-    cur.execute("DELETE FROM campaigns WHERE brand_id NOT IN (SELECT id FROM brands)")
-
-    conn.commit()
-
-
 # ----------------------------
 # JS boot (token + /auth/me) - injected into every page
 # ----------------------------
-JS_BOOT = """
-<script>
-  const token = localStorage.getItem("dreambox_token");
-  if(!token) window.location.href = "/portal";
-
-  async function me(){
-    const r = await fetch("__ME_ENDPOINT__", {
-      headers: { "Authorization": "Bearer " + token }
-    });
-    if(!r.ok) {
-      localStorage.removeItem("dreambox_token");
-      window.location.href = "/portal";
-      return null;
-    }
-    return await r.json();
-  }
-
-  async function requireAdmin(){
-    const user = await me();
-    if(!user) return;
-    const acct = (user.account_type || "").toLowerCase();
-    if(!acct.includes("administrator")){
-      window.location.href = "/portal-home";
-      return;
-    }
-    const el = document.getElementById("adminEmailLine");
-    if(el) el.textContent = "Signed in as: " + (user.email || "—");
-  }
-
-  async function api(path, opts={}){
-    opts.headers = Object.assign({}, opts.headers || {}, {
-      "Authorization": "Bearer " + token,
-      "Content-Type": "application/json"
-    });
-    const r = await fetch(path, opts);
-    const text = await r.text();
-    let data = null;
-    try { data = JSON.parse(text); } catch(e){}
-    if(!r.ok) throw new Error((data && data.detail) || text || ("HTTP " + r.status));
-    return data;
-  }
-
-  function logout(){
-    localStorage.removeItem("dreambox_token");
-    window.location.href = "/portal";
-  }
-</script>
-""".replace("__ME_ENDPOINT__", ME_ENDPOINT)
+JS_BOOT = asset("admin.js", {"__ME_ENDPOINT__": ME_ENDPOINT}).tag()
 
 
 # ============================================================
@@ -253,13 +144,15 @@ def admin_approvals_page():
         `;
       }
 
-      async function load(){
-        await requireAdmin();
-        const data = await api("/admin/api/pending");
+      function render(data){
         document.getElementById("list").innerHTML =
           (data.users.length ? data.users.map(row).join("") : "<p class='sub'>No pending accounts.</p>");
       }
 
+      async function load(){
+        render(await api("/admin/api/pending"));
+      }
+
       async function approve(id){
         const v = document.getElementById("sel_" + id).value;
         await api("/admin/api/set-account-type", {
@@ -269,7 +162,10 @@ def admin_approvals_page():
         load();
       }
 
-      load();
+      (async () => {
+        const b = await bootstrap("admin-approvals");
+        if(b && adminGate(b.me) && b.data) render(b.data);
+      })();
     </script>
     """
     return html_page("Admin • Approvals", body)
@@ -297,7 +193,7 @@ def admin_users_page():
         <p class="sub" id="adminEmailLine">Signed in as: —</p>
 
         <div style="display:flex; gap:10px; flex-wrap:wrap;">
-          <input id="q" placeholder="email contains..." style="flex:1; min-width:240px;">
+          <input id="q" placeholder="email starts with..." style="flex:1; min-width:240px;">
           <button class="btn" onclick="search()">Search</button>
           <button class="ghost" onclick="loadAll()">All accounts</button>
         </div>
@@ -352,19 +248,18 @@ def admin_users_page():
         `;
       }
 
-      async function loadAll(){
-        await requireAdmin();
-        const data = await api("/admin/api/search?query=");
+      function render(data){
         document.getElementById("results").innerHTML =
           (data.users.length ? data.users.map(userCard).join("") : "<p class='sub'>No results.</p>");
       }
 
+      async function loadAll(){
+        render(await api("/admin/api/search?query="));
+      }
+
       async function search(){
-        await requireAdmin();
         const q = document.getElementById("q").value || "";
-        const data = await api("/admin/api/search?query=" + encodeURIComponent(q));
-        document.getElementById("results").innerHTML =
-          (data.users.length ? data.users.map(userCard).join("") : "<p class='sub'>No results.</p>");
+        render(await api("/admin/api/search?query=" + encodeURIComponent(q)));
       }
 
       async function save(id){
@@ -390,8 +285,8 @@ def admin_users_page():
       }
 
       (async () => {
-        await requireAdmin();
-        loadAll();
+        const b = await bootstrap("admin-users");
+        if(b && adminGate(b.me) && b.data) render(b.data);
       })();
     </script>
     """
@@ -528,45 +423,37 @@ def admin_system_page():
 # ADMIN API
 # ============================================================
 
-@router.get("/admin/api/pending")
-def api_pending(request: Request):
-    _require_admin(request)
-
-    with db() as conn:
-        rows = conn.execute(
-            "SELECT id, email, account_type FROM users WHERE account_type = ? ORDER BY id DESC",
-            (AccountType.ACCOUNT_PENDING.value,),
-        ).fetchall()
+def _user_list(rows) -> list:
+    users = row_dicts(rows)
+    admins = admin_emails()
+    for d in users:
+        d["is_protected"] = str(d.get("email", "")).strip().lower() in admins
+    return users
 
-    users = []
-    for r in rows:
-        d = dict(r)
-        d["is_protected"] = str(d.get("email", "")).lower() in ADMIN_EMAILS
-        users.append(d)
 
-    return {"users": users}
+def pending_payload(request: Request) -> dict:
+    _require_admin(request)
+    return {"users": _user_list(store.users.list_by_account_type(AccountType.ACCOUNT_PENDING.value))}
 
 
-@router.get("/admin/api/search")
-def api_search(request: Request, query: str = ""):
+def search_payload(request: Request, query: str = "", prefix: bool = False) -> dict:
     _require_admin(request)
 
     q = (query or "").strip().lower()
-    like = f"%{q}%"
 
-    with db() as conn:
-        rows = conn.execute(
-            "SELECT id, email, account_type FROM users WHERE lower(email) LIKE ? ORDER BY id DESC LIMIT 200",
-            (like,),
-        ).fetchall()
+    # substring match by default; prefix=True can use the email index
+    rows = store.users.search_by_email(q, limit=200, prefix=prefix) if q else store.users.list_recent(200)
+    return {"users": _user_list(rows)}
+
+
+@router.get("/admin/api/pending")
+def api_pending(request: Request):
+    return FastJSONResponse(pending_payload(request))
 
-    users = []
-    for r in rows:
-        d = dict(r)
-        d["is_protected"] = str(d.get("email", "")).lower() in ADMIN_EMAILS
-        users.append(d)
 
-    return {"users": users}
+@router.get("/admin/api/search")
+def api_search(request: Request, query: str = "", prefix: bool = False):
+    return FastJSONResponse(search_payload(request, query, prefix))
 
 
 @router.post("/admin/api/set-account-type")
@@ -585,33 +472,24 @@ async def api_set_account_type(request: Request):
     if account_type not in allowed:
         raise HTTPException(status_code=400, detail="Invalid account_type")
 
-    with db() as conn:
-        target = conn.execute(
-            "SELECT id, email, account_type FROM users WHERE id=?",
-            (user_id,),
-        ).fetchone()
+    target = store.users.get_by_id(user_id)
+    if not target:
+        raise HTTPException(status_code=404, detail="User not found")
 
-        if not target:
-            raise HTTPException(status_code=404, detail="User not found")
+    # protect admin emails from being changed
+    target_email = str(target["email"] or "").lower()
+    if is_admin_email(target_email):
+        raise HTTPException(status_code=403, detail="This account is protected.")
 
-        # protect admin emails from being changed
-        target_email = str(target["email"] or "").lower()
-        if target_email in ADMIN_EMAILS:
-            raise HTTPException(status_code=403, detail="This account is protected.")
+    # also protect administrator-type accounts
+    if _is_admin_account_type(str(target["account_type"] or "")):
+        raise HTTPException(status_code=403, detail="This account is protected.")
 
-        # also protect administrator-type accounts
-        if _is_admin_account_type(str(target["account_type"] or "")):
-            raise HTTPException(status_code=403, detail="This account is protected.")
+    # prevent admin editing self via this endpoint (optional but safe)
+    if int(target["id"]) == int(admin_row["id"]):
+        raise HTTPException(status_code=403, detail="Cannot change your own account type here.")
 
-        # prevent admin editing self via this endpoint (optional but safe)
-        if int(target["id"]) == int(admin_row["id"]):
-            raise HTTPException(status_code=403, detail="Cannot change your own account type here.")
-
-        conn.execute(
-            "UPDATE users SET account_type = ? WHERE id = ?",
-            (account_type, user_id),
-        )
-        conn.commit()
+    store.users.set_account_type(user_id, account_type)
 
     return {"ok": True}
 
@@ -627,37 +505,23 @@ async def api_delete_user(request: Request):
     if int(user_id) == int(admin_row["id"]):
         raise HTTPException(status_code=403, detail="You cannot delete your own account.")
 
-    with db() as conn:
-        target = conn.execute(
-            "SELECT id, email, account_type FROM users WHERE id=?",
-            (user_id,),
-        ).fetchone()
-
-        if not target:
-            raise HTTPException(status_code=404, detail="User not found")
+    target = store.users.get_by_id(user_id)
+    if not target:
+        raise HTTPException(status_code=404, detail="User not found")
 
-        target_email = str(target["email"] or "").lower()
-        target_type = str(target["account_type"] or "")
+    target_email = str(target["email"] or "").lower()
+    target_type = str(target["account_type"] or "")
 
-        # protect admin allowlist
-        if target_email in ADMIN_EMAILS:
-            raise HTTPException(status_code=403, detail="This account is protected and cannot be deleted.")
+    # protect admin allowlist
+    if is_admin_email(target_email):
+        raise HTTPException(status_code=403, detail="This account is protected and cannot be deleted.")
 
-        # protect any administrator-type account
-        if _is_admin_account_type(target_type):
-            raise HTTPException(status_code=403, detail="Administrator accounts cannot be deleted here.")
+    # protect any administrator-type account
+    if _is_admin_account_type(target_type):
+        raise HTTPException(status_code=403, detail="Administrator accounts cannot be deleted here.")
 
-        # cleanup related data first (best-effort)
-        cur = conn.cursor()
-        cur.execute("DELETE FROM games WHERE owner_user_id=?", (user_id,))
-        cur.execute("DELETE FROM brands WHERE owner_user_id=?", (user_id,))
-        cur.execute("DELETE FROM survey_submissions WHERE user_id=?", (user_id,))
-        cur.execute("DELETE FROM zoom_meetings WHERE user_id=?", (user_id,))
-        cur.execute("DELETE FROM campaigns WHERE brand_id NOT IN (SELECT id FROM brands)")
-
-        # finally delete user
-        cur.execute("DELETE FROM users WHERE id=?", (user_id,))
-        conn.commit()
+    # also removes their games and the rows in the user DB that point at them
+    store.users.delete(user_id)
 
     return {"ok": True}
 
@@ -666,31 +530,47 @@ async def api_delete_user(request: Request):
 def api_roles(request: Request):
     _require_admin(request)
 
-    merged = {k.value: v for k, v in ROLE_PERMISSIONS.items()}
+    roles = compiled_roles()
+    merged = {k.value: v for k, v in roles.permissions.items()}
 
     overrides = {}
     if ROLES_JSON_PATH.exists():
         overrides = json.loads(ROLES_JSON_PATH.read_text(encoding="utf-8"))
 
-    return {"merged": merged, "overrides_config_roles_json": overrides}
+    return {
+        "merged": merged,
+        "masks": roles.masks,
+        "roles_version": roles.version,
+        "overrides_config_roles_json": overrides,
+    }
 
 
 @router.get("/admin/api/health")
 def api_health(request: Request):
     _require_admin(request)
 
-    with db() as conn:
-        user_count = conn.execute("SELECT COUNT(*) AS n FROM users").fetchone()["n"]
-        pending = conn.execute(
-            "SELECT COUNT(*) AS n FROM users WHERE account_type=?",
-            (AccountType.ACCOUNT_PENDING.value,),
-        ).fetchone()["n"]
+    user_count = store.users.count()
+    pending = store.users.count(AccountType.ACCOUNT_PENDING.value)
+    admins = config_stats()
 
     return {
+        "db_backend": store.dialect,
         "db_path": str(DB_PATH),
         "users_total": user_count,
         "users_pending": pending,
         "roles_json_exists": ROLES_JSON_PATH.exists(),
-        "admins_json_exists": ADMINS_JSON_PATH.exists(),
-        "admins_loaded": len(ADMIN_EMAILS),
+        "roles_version": compiled_roles().version,
+        "admins_json_exists": admins["admins_path"] is not None,
+        "admins_loaded": admins["admins_loaded"],
+        "user_cache": store.users.cache.stats(),
+        "token_cache": token_cache_stats(),
+        "password_hashing": hash_pool.stats(),
+        "email_outbox": outbox_stats(),
+        "twofa": twofa_challenges.stats(),
+        "login_limiter": login_limiter_stats(),
+        "static_pages": static_pages_stats(),
+        "static_assets": static_assets_stats(),
+        "widget_cache": widget_cache_stats(),
+        "roblox": roblox_stats(),
+        "query_stats": query_stats.snapshot(),
     }
@@ -0,0 +1,138 @@
+"""
+Request authentication, done once per request.
+
+AuthMiddleware reads the bearer token, verifies it through token_cache and
+loads the user through the user cache, then leaves on request.state:
+
+  user          identity dict (id, email, account_type, is_email_verified, authz_version) or None
+  permissions   permission bitmask for that user (roles.FLAG_BITS; 0 when anonymous)
+  auth_error    why user is None ("Missing bearer token", ...), for the 401
+
+Tokens issued with permission claims (app.create_access_token) are authorized
+from the claims alone as long as their authz_version still matches the user's
+(and their rv the current roles.json + admins.json); older tokens fall back to
+the users row.
+
+It never rejects a request itself; endpoints call current_user() /
+permissions.require(), which raise the 401/403.
+"""
+from typing import Optional, Tuple
+
+from fastapi import Request, HTTPException
+from jose import JWTError
+from starlette.concurrency import run_in_threadpool
+
+from roles import ALL_PERMISSIONS_MASK, compiled_roles, mask_to_permissions, role_mask
+from storage import get_storage
+from token_cache import decode_token
+from settings import SECRET_KEY, ALGORITHM, admins_version, is_admin_email
+
+MISSING_TOKEN = "Missing bearer token"
+INVALID_TOKEN = "Invalid or expired token"
+UNKNOWN_USER = "User not found"
+
+store = get_storage()
+
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers") or ():
+        if name == b"authorization":
+            value = value.decode("latin-1")
+            if value.lower().startswith("bearer "):
+                return value.split(" ", 1)[1].strip() or None
+            return None
+    return None
+
+
+def permission_mask(user: Optional[dict]) -> int:
+    """Permission bitmask for this user; the admins.json allowlist gets every flag."""
+    if not user:
+        return 0
+    if is_admin_email(user.get("email") or ""):
+        return ALL_PERMISSIONS_MASK
+    return role_mask(user.get("account_type"))
+
+
+def authz_config_version() -> int:
+    """Changes whenever roles.json or the admin allowlist does; stamped into tokens as rv."""
+    return compiled_roles().version ^ admins_version()
+
+
+def _user_from_claims(user_id: int, claims: dict) -> dict:
+    return {
+        "id": user_id,
+        "email": claims.get("email"),
+        "account_type": claims.get("acct"),
+        "is_email_verified": int(claims.get("ev") or 0),
+        "authz_version": int(claims["av"]),
+    }
+
+
+def resolve_token(token: str) -> Tuple[Optional[dict], int, Optional[str]]:
+    """(user, permission mask, None) for a good token, else (None, 0, reason)."""
+    try:
+        claims = decode_token(token, SECRET_KEY, ALGORITHM)
+        user_id = int(claims.get("sub"))
+    except (JWTError, TypeError, ValueError):
+        return None, 0, INVALID_TOKEN
+
+    if "perm" in claims and "av" in claims:
+        # permission claims hold until an account-type change bumps authz_version;
+        # the version comes from the user cache, so this is normally no query
+        version = store.users.get_authz_version(user_id)
+        if version is None:
+            return None, 0, UNKNOWN_USER
+        if version == int(claims["av"]):
+            user = _user_from_claims(user_id, claims)
+            # perm was compiled from the roles.json / admins.json of its day; after
+            # an edit recompute it from the (still current) account type in the claims
+            if claims.get("rv") == authz_config_version():
+                return user, int(claims["perm"]), None
+            return user, permission_mask(user), None
+
+    # sub-only or stale token: the current row decides
+    row = store.users.get_identity(user_id)
+    if not row:
+        return None, 0, UNKNOWN_USER
+    return row, permission_mask(row), None
+
+
+class AuthMiddleware:
+    """Pure ASGI (no BaseHTTPMiddleware) so streaming responses pass straight through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            state = scope.setdefault("state", {})
+            token = _bearer_token(scope)
+            if token is None:
+                user, permissions, error = None, 0, MISSING_TOKEN
+            else:
+                # cache hits are dict lookups, but a miss reads the users table
+                user, permissions, error = await run_in_threadpool(resolve_token, token)
+            state["user"] = user
+            state["auth_error"] = error
+            state["permissions"] = permissions
+        await self.app(scope, receive, send)
+
+
+def current_user(request: Request) -> dict:
+    """The authenticated user for this request, or 401."""
+    user = getattr(request.state, "user", None)
+    if not user:
+        raise HTTPException(status_code=401, detail=getattr(request.state, "auth_error", None) or MISSING_TOKEN)
+    return user
+
+
+def me_payload(request: Request) -> dict:
+    """Body of /auth/me: the current user plus decoded permission flags, or 401."""
+    user = current_user(request)
+    return {
+        "id": user["id"],
+        "email": user["email"],
+        "account_type": user["account_type"],
+        "is_email_verified": bool(user["is_email_verified"]),
+        "permissions": mask_to_permissions(getattr(request.state, "permissions", 0)),
+    }
@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Request, HTTPException
 from Dashboard.permissions import require, is_admin_email
-from Dashboard.db import campaigns_db, init_campaigns_db
+from Dashboard.auth import current_user
+from Dashboard.db import init_campaigns_db
+from storage import get_storage
+from json_responses import FastJSONResponse, row_dicts
 
 router = APIRouter()
+store = get_storage()
 
 @router.on_event("startup")
 def _init():
@@ -28,42 +32,26 @@ def admin_issue_invoice(
     stripe_invoice_id: str = "",
     stripe_subscription_id: str = "",
 ):
-    user = request.state.user
+    user = current_user(request)
     if not is_admin_email(user.get("email","")):
         require(request, "can_admin")
 
     if billing_type not in ("one_off", "subscription"):
         raise HTTPException(400, "billing_type must be one_off or subscription")
 
-    with campaigns_db() as db:
-        db.execute(
-            """
-            INSERT INTO invoices(project_id, billing_type, amount, currency, stripe_customer_id, stripe_invoice_id, stripe_subscription_id)
-            VALUES(?,?,?,?,?,?,?)
-            """,
-            (project_id, billing_type, amount, currency,
-             stripe_customer_id or None, stripe_invoice_id or None, stripe_subscription_id or None)
-        )
-        db.commit()
+    store.invoices.create(
+        project_id, billing_type, amount, currency,
+        stripe_customer_id or None, stripe_invoice_id or None, stripe_subscription_id or None,
+    )
 
     return {"ok": True}
 
 @router.get("/billing/invoices")
 def list_invoices(request: Request):
     require(request, "can_pay_for_products")
-    user = request.state.user
-    with campaigns_db() as db:
-        if is_admin_email(user.get("email","")):
-            rows = db.execute("SELECT * FROM invoices ORDER BY id DESC").fetchall()
-        else:
-            # Only invoices for projects user can access
-            rows = db.execute(
-                """
-                SELECT i.* FROM invoices i
-                JOIN project_access a ON a.project_id = i.project_id
-                WHERE a.user_email = ?
-                ORDER BY i.id DESC
-                """,
-                (user["email"],)
-            ).fetchall()
-    return {"ok": True, "invoices": [dict(r) for r in rows]}
+    user = current_user(request)
+    if is_admin_email(user.get("email","")):
+        rows = store.invoices.list_all()
+    else:
+        rows = store.invoices.list_for_user(user["email"])
+    return FastJSONResponse({"ok": True, "invoices": row_dicts(rows)})
@@ -0,0 +1,53 @@
+"""
+GET /portal/bootstrap?view=<name>: everything a portal page needs to draw
+itself, in one request.
+
+Pages used to await /auth/me and only then fire their list call, which is two
+(the users page: three) serial authenticated round trips. The bootstrap
+returns the /auth/me body and the view's initial data together:
+
+  {"me": {...}, "view": "games", "data": {...}, "error": null}
+
+The data comes from the same payload function as the view's list endpoint,
+so the authorization and shape are identical; other query parameters reach
+the loader as they would the list endpoint (e.g. games filters). A 403 from that function leaves
+me in place with data null and error set, so the page can still show who
+is signed in; any other error propagates. Without a view only me is
+returned.
+"""
+from fastapi import APIRouter, Request, HTTPException
+
+from Dashboard.auth import me_payload
+from Dashboard.games import games_payload
+from Dashboard.admin_panel import pending_payload, search_payload
+from Dashboard.admin_game_deletions import delete_requests_payload
+from json_responses import FastJSONResponse
+
+router = APIRouter()
+
+# view -> loader(request) -> dict; each one backs the page's own list endpoint
+VIEWS = {
+    "games": games_payload,
+    "admin-approvals": pending_payload,
+    "admin-users": lambda request: search_payload(request, query=""),
+    "admin-game-deletions": delete_requests_payload,
+}
+
+
+@router.get("/portal/bootstrap")
+def portal_bootstrap(request: Request, view: str = ""):
+    me = me_payload(request)
+    if not view:
+        return FastJSONResponse({"me": me, "view": None, "data": None, "error": None})
+
+    loader = VIEWS.get(view)
+    if loader is None:
+        raise HTTPException(status_code=404, detail=f"Unknown view: {view}")
+
+    try:
+        data, error = loader(request), None
+    except HTTPException as e:
+        if e.status_code != 403:
+            raise
+        data, error = None, e.detail
+    return FastJSONResponse({"me": me, "view": view, "data": data, "error": error})
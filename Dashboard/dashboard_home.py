@@ -1,8 +1,7 @@
 from fastapi import APIRouter, Request
 from Dashboard.style import render
 from Dashboard.permissions import require, is_admin_email
-#from config.roles import ROLE_PRESETS
-from roles import ROLE_PERMISSIONS, AccountType
+from roles import mask_to_permissions
 
 
 router = APIRouter()
@@ -11,7 +10,7 @@ router = APIRouter()
 def dashboard(request: Request):
     require(request, "can_view_basic_dashboard")
     user = request.state.user
-    role = ROLE_PRESETS.get(user["account_type"], {})
+    role = mask_to_permissions(request.state.permissions)  # compiled by Dashboard.auth.AuthMiddleware
 
     tiles = []
 
@@ -1,15 +1,25 @@
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import HTMLResponse
-from jose import jwt, JWTError
+from fastapi.responses import HTMLResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
+import io
 import os
 import re
+import csv
+import asyncio
 import sqlite3
+from collections import Counter
 from pathlib import Path
-from datetime import datetime
-from typing import Optional
+from typing import Iterable, List, Optional, Tuple
 
 from dashboard import BASE_STYLE, ME_ENDPOINT
+from json_responses import FastJSONResponse, dumps, row_dicts
+from roblox_api import resolver as roblox
+from sqlite_schema import create_games_schema
+from static_assets import asset
+from templates import Template
+from storage import get_storage
+from Dashboard.auth import current_user
 
 router = APIRouter()
 
@@ -17,17 +27,19 @@ router = APIRouter()
 DASHBOARD_DIR = Path(__file__).resolve().parent          # .../Dreambox/Dashboard
 BASE_DIR = DASHBOARD_DIR.parent                          # .../Dreambox
 
-USER_DB_PATH = BASE_DIR / "dreambox.db"
 GAMES_DB_PATH = BASE_DIR / "games.db"
 
-SECRET_KEY = os.environ.get("SECRET_KEY", "CHANGE_ME_TO_A_LONG_RANDOM_SECRET")
-ALGORITHM = "HS256"
+# /games/api/bulk-add
+BULK_ADD_MAX_ROWS = int(os.environ.get("BULK_ADD_MAX_ROWS", "2000"))
+BULK_ADD_CONCURRENCY = int(os.environ.get("BULK_ADD_CONCURRENCY", "16"))
+BULK_ADD_PROGRESS_EVERY = 25
 
+# /games/api/list
+GAMES_PAGE_SIZE = int(os.environ.get("GAMES_PAGE_SIZE", "50"))
+GAMES_PAGE_MAX = 200
+_CURSOR = re.compile(r"^([01])\.(\d+)$")
 
-def users_db():
-    conn = sqlite3.connect(str(USER_DB_PATH))
-    conn.row_factory = sqlite3.Row
-    return conn
+store = get_storage()
 
 
 def games_db():
@@ -36,111 +48,54 @@ def games_db():
     return conn
 
 
-def html_page(title: str, body: str) -> HTMLResponse:
-    return HTMLResponse(
-        f"""<!doctype html>
+PAGE_SHELL = Template("""<!doctype html>
 <html lang="en">
 <head>
   <meta charset="utf-8">
-  <title>{title}</title>
-  {BASE_STYLE}
+  <title>{{ title }}</title>
+  {{ style|safe }}
   <style>
-    input {{
+    input {
       padding: 11px 14px;
       border-radius: 999px;
       border: 1px solid rgba(255,255,255,0.12);
       background: #0f0f0f;
       color: #fff;
       outline: none;
-    }}
-    input:focus {{
+    }
+    input:focus, textarea:focus {
       border-color: rgba(255,255,255,0.22);
-    }}
+    }
+    textarea {
+      width: 100%;
+      box-sizing: border-box;
+      padding: 11px 14px;
+      border-radius: 14px;
+      border: 1px solid rgba(255,255,255,0.12);
+      background: #0f0f0f;
+      color: #fff;
+      outline: none;
+      font: inherit;
+      resize: vertical;
+    }
   </style>
 </head>
 <body>
-  <div class="shell">{body}</div>
+  <div class="shell">{{ body|safe }}</div>
 </body>
-</html>"""
-    )
-
-
-def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
-    row = conn.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
-        (table,),
-    ).fetchone()
-    return bool(row)
+</html>""").partial(style=BASE_STYLE)
 
 
-def _column_exists(conn: sqlite3.Connection, table: str, col: str) -> bool:
-    # NOTE: PRAGMA table_info returns rows like: (cid, name, type, notnull, dflt_value, pk)
-    cur = conn.execute(f"PRAGMA table_info({table})")
-    return any(r[1] == col for r in cur.fetchall())
+def html_page(title: str, body: str) -> HTMLResponse:
+    return PAGE_SHELL.response(title=title, body=body)
 
 
 def ensure_games_schema():
-    with games_db() as conn:
-        # Create base table
-        if not _table_exists(conn, "games"):
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS games (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    owner_user_id INTEGER NOT NULL,
-                    universe_id INTEGER NOT NULL,
-                    name TEXT,
-                    created_at TEXT,
-                    game_url TEXT,
-                    is_favorite INTEGER NOT NULL DEFAULT 0,
-                    delete_requested INTEGER NOT NULL DEFAULT 0,
-                    delete_requested_at TEXT
-                );
-            """)
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_games_owner ON games(owner_user_id);")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_games_universe ON games(universe_id);")
-            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_games_owner_universe ON games(owner_user_id, universe_id);")
-
-        # Older installs: add columns if missing (all aligned at same indentation)
-        if not _column_exists(conn, "games", "game_url"):
-            try:
-                conn.execute("ALTER TABLE games ADD COLUMN game_url TEXT;")
-            except Exception:
-                pass
-
-        if not _column_exists(conn, "games", "is_favorite"):
-            try:
-                conn.execute("ALTER TABLE games ADD COLUMN is_favorite INTEGER NOT NULL DEFAULT 0;")
-            except Exception:
-                pass
-
-        if not _column_exists(conn, "games", "delete_requested"):
-            try:
-                conn.execute("ALTER TABLE games ADD COLUMN delete_requested INTEGER NOT NULL DEFAULT 0;")
-            except Exception:
-                pass
-
-        if not _column_exists(conn, "games", "delete_requested_at"):
-            try:
-                conn.execute("ALTER TABLE games ADD COLUMN delete_requested_at TEXT;")
-            except Exception:
-                pass
-
-        # Optional analytics table
-        if not _table_exists(conn, "stats_snapshots"):
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS stats_snapshots (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    universe_id INTEGER NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    playing INTEGER NOT NULL DEFAULT 0,
-                    visits INTEGER NOT NULL DEFAULT 0,
-                    favorites INTEGER NOT NULL DEFAULT 0,
-                    upvotes INTEGER NOT NULL DEFAULT 0,
-                    downvotes INTEGER NOT NULL DEFAULT 0
-                );
-            """)
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_u_ts ON stats_snapshots(universe_id, timestamp);")
+    if store.dialect != "sqlite":
+        return  # storage.init_schema() owns the postgres DDL
 
+    with games_db() as conn:
+        create_games_schema(conn)
         conn.commit()
 
 
@@ -148,35 +103,9 @@ def ensure_games_schema():
 ensure_games_schema()
 
 
-def _get_bearer_token(request: Request) -> str:
-    auth = request.headers.get("Authorization", "")
-    if not auth.lower().startswith("bearer "):
-        raise HTTPException(status_code=401, detail="Missing bearer token")
-    return auth.split(" ", 1)[1].strip()
-
-
-def _decode_token_get_user_id(token: str) -> int:
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        sub = payload.get("sub")
-        return int(sub)
-    except (JWTError, ValueError):
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-
-
-def _get_current_user_row(request: Request) -> sqlite3.Row:
-    token = _get_bearer_token(request)
-    user_id = _decode_token_get_user_id(token)
-
-    with users_db() as conn:
-        row = conn.execute(
-            "SELECT id, email, account_type FROM users WHERE id=?",
-            (user_id,),
-        ).fetchone()
-
-    if not row:
-        raise HTTPException(status_code=401, detail="User not found")
-    return row
+def _get_current_user_row(request: Request) -> dict:
+    # resolved once per request by Dashboard.auth.AuthMiddleware
+    return current_user(request)
 
 
 def _is_partner(acct: str) -> bool:
@@ -187,108 +116,31 @@ def _is_admin(acct: str) -> bool:
     return "administrator" in (acct or "").lower()
 
 
+INVALID_GAME_URL = "Invalid Roblox game URL (must include /games/<placeId>)"
+
+_GAME_URL = re.compile(r"\S*/games/(\d+)\S*")
+
+
 def _extract_place_id_from_url(url: str) -> int:
     m = re.search(r"/games/(\d+)", url or "")
     if not m:
-        raise HTTPException(status_code=400, detail="Invalid Roblox game URL (must include /games/<placeId>)")
+        raise HTTPException(status_code=400, detail=INVALID_GAME_URL)
     return int(m.group(1))
 
 
-def _try_resolve_universe_id(place_id: int) -> int:
-    try:
-        import requests  # type: ignore
-    except Exception:
-        return place_id
+def _parse_bulk_rows(lines: Iterable[str]) -> List[Tuple[int, str, Optional[int]]]:
+    """(row number, game URL or raw row, place id or None) per non-blank line / CSV row."""
+    rows = []
+    for n, cells in enumerate(csv.reader(lines), start=1):
+        raw = ",".join(cells).strip()
+        if not raw:
+            continue
+        m = next((m for m in map(_GAME_URL.search, cells) if m), None)
+        rows.append((n, m.group(0) if m else raw, int(m.group(1)) if m else None))
+    return rows
 
-    try:
-        r = requests.get(
-            f"https://apis.roblox.com/universes/v1/places/{place_id}/universe",
-            timeout=10
-        )
-        if r.ok:
-            j = r.json()
-            uid = j.get("universeId")
-            if isinstance(uid, int) and uid > 0:
-                return uid
-    except Exception:
-        pass
-
-    return place_id
-
-
-def _try_resolve_game_name(universe_id: int) -> Optional[str]:
-    try:
-        import requests  # type: ignore
-    except Exception:
-        return None
 
-    try:
-        r = requests.get(
-            "https://games.roblox.com/v1/games",
-            params={"universeIds": str(universe_id)},
-            timeout=10
-        )
-        if not r.ok:
-            return None
-        j = r.json() or {}
-        data = j.get("data") or []
-        if data and isinstance(data, list) and isinstance(data[0], dict):
-            nm = data[0].get("name")
-            if isinstance(nm, str) and nm.strip():
-                return nm.strip()
-    except Exception:
-        return None
-
-    return None
-
-
-JS_BOOT = f"""
-<script>
-  (function(){{
-    const params = new URLSearchParams(window.location.search);
-    const t = params.get("token");
-    if(t && t.length > 20){{
-      localStorage.setItem("dreambox_token", t);
-      params.delete("token");
-      const newUrl = window.location.pathname + (params.toString() ? ("?" + params.toString()) : "");
-      window.history.replaceState({{}}, "", newUrl);
-    }}
-  }})();
-
-  const token = localStorage.getItem("dreambox_token");
-  if(!token) window.location.href = "/portal";
-
-  async function me(){{
-    const r = await fetch("{ME_ENDPOINT}", {{
-      headers: {{ "Authorization": "Bearer " + token }}
-    }});
-    if(!r.ok){{
-      localStorage.removeItem("dreambox_token");
-      window.location.href = "/portal";
-      return null;
-    }}
-    return await r.json();
-  }}
-
-  async function api(path, opts={{}}){{
-    opts.headers = Object.assign({{}}, opts.headers || {{}}, {{
-      "Authorization": "Bearer " + token,
-      "Content-Type": "application/json"
-    }});
-    const r = await fetch(path, opts);
-    const text = await r.text();
-    let data = null;
-    try {{ data = JSON.parse(text); }} catch(e){{}}
-    if(!r.ok) throw new Error((data && data.detail) || text || ("HTTP " + r.status));
-    return data;
-  }}
-
-  function logout(){{
-    localStorage.removeItem("dreambox_token");
-    window.location.href = "/portal";
-  }}
-</script>
-"""
+JS_BOOT = asset("portal.js", {"__ME_ENDPOINT__": ME_ENDPOINT}).tag()
 
 
 @router.get("/games", response_class=HTMLResponse)
@@ -319,9 +171,26 @@ def games_page():
         <p class="tiny" id="errLine" style="color:#a0a0a0;"></p>
       </div>
 
+      <div class="card" style="margin-top:12px;">
+        <h3>Bulk import</h3>
+        <p class="sub">Paste many Roblox game URLs or CSV rows, one game per line.</p>
+        <textarea id="bulk" rows="5" placeholder="https://www.roblox.com/games/123456789/Game-Name"></textarea>
+        <div style="display:flex; gap:10px; margin-top:10px;">
+          <button class="btn" id="bulkBtn" onclick="bulkAdd()">Import</button>
+        </div>
+        <p class="tiny" id="bulkLine" style="margin-top:10px;"></p>
+        <p class="tiny" id="bulkErr" style="color:#a0a0a0; white-space:pre-line;"></p>
+      </div>
+
       <div class="card" style="margin-top:12px;">
         <h3>Your games</h3>
+        <div style="display:flex; gap:10px; flex-wrap:wrap; align-items:center; margin-top:10px;">
+          <input id="nameFilter" placeholder="Name starts with…" style="flex:1; min-width:200px;" oninput="filterChanged()">
+          <label class="tiny"><input type="checkbox" id="favFilter" onchange="load()"> Favorites</label>
+          <label class="tiny"><input type="checkbox" id="delFilter" onchange="load()"> Delete requested</label>
+        </div>
         <div id="list" style="margin-top:10px; max-height:420px; overflow:auto; padding-right:6px;"></div>
+        <button class="ghost" id="moreBtn" style="display:none; margin-top:10px;" onclick="more()">Load more</button>
       </div>
     </div>
     """ + JS_BOOT + """
@@ -362,7 +231,7 @@ def games_page():
               <h3 style="margin:0;">${nm}</h3>
               <button class="ghost" style="padding:8px 12px;" onclick="toggleFav(${g.id})" title="Favorite">${fav}</button>
             </div>
-            <p class="sub">Universe: <strong>${g.universe_id}</strong> • Delete: ${requested}</p>
+            <p class="sub">Universe: <strong>${g.universe_id}</strong> • Delete: ${requested}${g.ccu ? " • Playing: <strong>" + g.ccu.playing + "</strong>" : ""}</p>
             <p class="tiny">
               <a class="ghost" style="padding:6px 10px;" href="${url}" target="_blank" rel="noreferrer">Open Roblox</a>
             </p>
@@ -375,31 +244,72 @@ def games_page():
 
       let acctType = "";
 
+      // one page at a time (keyset cursor from /games/api/list)
+      let nextCursor = null;
+
+      function filters(){
+        const f = {};
+        const name = (document.getElementById("nameFilter").value || "").trim();
+        if(name) f.q = name;
+        if(document.getElementById("favFilter").checked) f.favorites = "1";
+        if(document.getElementById("delFilter").checked) f.delete_requested = "1";
+        return f;
+      }
+
+      function listQuery(cursor){
+        const q = new URLSearchParams(Object.assign({ include: "ccu" }, filters()));
+        if(cursor) q.set("cursor", cursor);
+        return q;
+      }
+
+      function render(data, append){
+        const list = document.getElementById("list");
+        nextCursor = data.next_cursor || null;
+        document.getElementById("moreBtn").style.display = nextCursor ? "" : "none";
+        const html = (data.games || []).map(g => item(g, acctType)).join("");
+        if(append){
+          list.insertAdjacentHTML("beforeend", html);
+          return;
+        }
+        list.innerHTML = html || (Object.keys(filters()).length
+          ? "<p class='sub'>No games match these filters.</p>"
+          : "<p class='sub'>No games yet. Add your first URL above.</p>");
+      }
+
       async function load(){
-        const err = document.getElementById("errLine");
-        err.textContent = "";
+        document.getElementById("errLine").textContent = "";
+        render(await api("/games/api/list?" + listQuery()), false);
+      }
 
-        const u = await me();
-        if(!u) return;
+      async function more(){
+        if(!nextCursor) return;
+        try {
+          render(await api("/games/api/list?" + listQuery(nextCursor)), true);
+        } catch(e) {
+          document.getElementById("errLine").textContent = String(e.message || e);
+        }
+      }
 
-        acctType = u.account_type || "";
+      let filterTimer = null;
+      function filterChanged(){
+        clearTimeout(filterTimer);
+        filterTimer = setTimeout(load, 250);
+      }
+
+      // first paint: identity + first page of games in one request
+      async function init(){
+        const b = await bootstrap("games", listQuery());
+        if(!b) return;
+
+        acctType = b.me.account_type || "";
         setStatus(acctType);
 
-        const lower = acctType.toLowerCase();
-        const allowed = (lower === "partneraccount") || lower.includes("administrator");
-        if(!allowed){
+        if(!b.data){
           document.getElementById("subtext").textContent = "You do not have access to Games.";
           document.getElementById("list").innerHTML = "<p class='sub'>Access denied.</p>";
           return;
         }
-
-        const data = await api("/games/api/list");
-        const list = document.getElementById("list");
-        if(!data.games || !data.games.length){
-          list.innerHTML = "<p class='sub'>No games yet. Add your first URL above.</p>";
-          return;
-        }
-        list.innerHTML = data.games.map(g => item(g, acctType)).join("");
+        render(b.data, false);
       }
 
       async function add(){
@@ -424,6 +334,67 @@ def games_page():
         }
       }
 
+      // /games/api/bulk-add streams one JSON object per line
+      async function bulkAdd(){
+        const line = document.getElementById("bulkLine");
+        const err = document.getElementById("bulkErr");
+        const btn = document.getElementById("bulkBtn");
+        const text = (document.getElementById("bulk").value || "").trim();
+        line.textContent = "";
+        err.textContent = "";
+        if(!text) return;
+
+        btn.disabled = true;
+        const problems = [];
+        try {
+          const r = await fetch("/games/api/bulk-add", {
+            method: "POST",
+            headers: { "Authorization": "Bearer " + token, "Content-Type": "text/csv" },
+            body: text
+          });
+          if(!r.ok){
+            const data = await r.json().catch(() => null);
+            throw new Error((data && data.detail) || ("HTTP " + r.status));
+          }
+
+          const reader = r.body.getReader();
+          const decoder = new TextDecoder();
+          let buf = "";
+          const onEvent = (ev) => {
+            if(ev.event === "parsed"){
+              line.textContent = "Read " + ev.rows + " rows…";
+            } else if(ev.event === "progress"){
+              line.textContent = (ev.stage === "resolve" ? "Resolving games " : "Fetching names ") + ev.done + " / " + ev.total + "…";
+            } else if(ev.event === "row" && ev.status === "invalid"){
+              problems.push("Row " + ev.row + ": " + ev.error);
+            } else if(ev.event === "error"){
+              problems.push(ev.detail);
+            } else if(ev.event === "done"){
+              line.textContent = "Added " + (ev.added || 0) + ", already tracked " + (ev.exists || 0)
+                + ", duplicates " + (ev.duplicate || 0) + ", invalid " + (ev.invalid || 0) + ".";
+            }
+          };
+          for(;;){
+            const { value, done } = await reader.read();
+            if(done) break;
+            buf += decoder.decode(value, { stream: true });
+            let i;
+            while((i = buf.indexOf("\\n")) >= 0){
+              const raw = buf.slice(0, i);
+              buf = buf.slice(i + 1);
+              if(raw) onEvent(JSON.parse(raw));
+            }
+          }
+          document.getElementById("bulk").value = "";
+          load();
+        } catch(e) {
+          problems.push(String(e.message || e));
+        } finally {
+          btn.disabled = false;
+          err.textContent = problems.slice(0, 10).join("\\n") + (problems.length > 10 ? "\\n…" : "");
+        }
+      }
+
       async function toggleFav(id){
         const err = document.getElementById("errLine");
         err.textContent = "";
@@ -467,28 +438,66 @@ def games_page():
         }
       }
 
-      load();
+      init();
     </script>
     """
     return html_page("Games", body)
 
 
-@router.get("/games/api/list")
-def api_list(request: Request):
+def _flag(value: Optional[str]) -> bool:
+    return (value or "").strip().lower() in ("1", "true", "yes")
+
+
+# ?limit=&cursor=&favorites=1&delete_requested=1&q=<name prefix>&include=ccu
+# Pages follow idx_games_owner_fav_id (see GameRepository.page_for_owner);
+# next_cursor is "<is_favorite>.<id>" of the last row, null on the last page.
+def games_payload(request: Request) -> dict:
     u = _get_current_user_row(request)
     acct = (u["account_type"] or "")
 
     if not (_is_partner(acct) or _is_admin(acct)):
         raise HTTPException(status_code=403, detail="Not allowed")
 
-    with games_db() as conn:
-        rows = conn.execute(
-            "SELECT id, owner_user_id, universe_id, name, game_url, is_favorite, delete_requested, delete_requested_at "
-            "FROM games WHERE owner_user_id=? ORDER BY is_favorite DESC, id DESC",
-            (u["id"],),
-        ).fetchall()
+    q = request.query_params
+    try:
+        limit = min(max(int(q.get("limit") or GAMES_PAGE_SIZE), 1), GAMES_PAGE_MAX)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid limit")
+    cursor = q.get("cursor") or ""
+    after = None
+    if cursor:
+        m = _CURSOR.match(cursor)
+        if not m:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        after = (int(m.group(1)), int(m.group(2)))
+
+    # one extra row tells whether there is a next page
+    rows = row_dicts(store.games.page_for_owner(
+        u["id"], limit + 1, after=after,
+        favorites_only=_flag(q.get("favorites")),
+        delete_requested_only=_flag(q.get("delete_requested")),
+        name_prefix=(q.get("q") or "").strip(),
+    ))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{int(rows[-1]['is_favorite'])}.{rows[-1]['id']}"
+
+    if "ccu" in (q.get("include") or "").split(","):
+        latest = store.snapshots.latest_many([int(g["universe_id"]) for g in rows])
+        for g in rows:
+            snap = latest.get(int(g["universe_id"]))
+            g["ccu"] = None if snap is None else {
+                "playing": snap["playing"], "visits": snap["visits"],
+                "favorites": snap["favorites"], "timestamp": snap["timestamp"],
+            }
+
+    return {"games": rows, "next_cursor": next_cursor}
+
 
-    return {"games": [dict(r) for r in rows]}
+@router.get("/games/api/list")
+def api_list(request: Request):
+    return FastJSONResponse(games_payload(request))
 
 
 @router.post("/games/api/add")
@@ -505,27 +514,120 @@ async def api_add(request: Request):
         raise HTTPException(status_code=400, detail="Missing game_url")
 
     place_id = _extract_place_id_from_url(game_url)
-    universe_id = _try_resolve_universe_id(place_id)
-    name = _try_resolve_game_name(universe_id)
+    # memory -> games db -> Roblox; network calls are async and shared between requests
+    universe_id = await roblox.universe_id(place_id)
 
-    with games_db() as conn:
-        existing = conn.execute(
-            "SELECT id FROM games WHERE owner_user_id=? AND universe_id=?",
-            (u["id"], universe_id),
-        ).fetchone()
-        if existing:
-            raise HTTPException(status_code=400, detail="Game already added")
-
-        conn.execute(
-            "INSERT INTO games (owner_user_id, universe_id, name, created_at, game_url, is_favorite, delete_requested, delete_requested_at) "
-            "VALUES (?, ?, ?, ?, ?, 0, 0, NULL)",
-            (u["id"], universe_id, name, datetime.utcnow().isoformat(), game_url),
-        )
-        conn.commit()
+    if await run_in_threadpool(store.games.exists_for_owner, u["id"], universe_id):
+        raise HTTPException(status_code=400, detail="Game already added")
+
+    name = await roblox.game_name(universe_id)
+    await run_in_threadpool(store.games.add, u["id"], universe_id, name, game_url)
 
     return {"ok": True, "universe_id": universe_id, "name": name}
 
 
+def _ndjson(obj: dict) -> bytes:
+    return dumps(obj) + b"\n"
+
+
+async def _bulk_add_stream(owner_user_id: int, rows: List[Tuple[int, str, Optional[int]]]):
+    places = list(dict.fromkeys(p for _, _, p in rows if p is not None))
+    yield _ndjson({"event": "parsed", "rows": len(rows), "places": len(places)})
+
+    # place -> universe, BULK_ADD_CONCURRENCY lookups in flight (most are cache hits)
+    gate = asyncio.Semaphore(BULK_ADD_CONCURRENCY)
+
+    async def resolve(place_id: int):
+        async with gate:
+            return place_id, await roblox.universe_id(place_id)
+
+    universes = {}
+    for done, pending in enumerate(asyncio.as_completed([resolve(p) for p in places]), start=1):
+        place_id, universe_id = await pending
+        universes[place_id] = universe_id
+        if done % BULK_ADD_PROGRESS_EVERY == 0 or done == len(places):
+            yield _ndjson({"event": "progress", "stage": "resolve", "done": done, "total": len(places)})
+
+    # names only for games the owner does not track yet, in batched multi-id calls
+    unique = list(dict.fromkeys(universes.values()))
+    existing = await run_in_threadpool(store.games.existing_universe_ids, owner_user_id, unique)
+    new = [u for u in unique if u not in existing]
+    names = await roblox.game_names(new) if new else {}
+    yield _ndjson({"event": "progress", "stage": "names", "done": len(new), "total": len(new)})
+
+    results, to_add, seen = [], [], set()
+    for n, raw, place_id in rows:
+        r = {"row": n, "input": raw}
+        results.append(r)
+        if place_id is None:
+            r.update(status="invalid", error=INVALID_GAME_URL)
+            continue
+        universe_id = universes[place_id]
+        r.update(universe_id=universe_id, name=names.get(universe_id))
+        if universe_id in seen:
+            r["status"] = "duplicate"
+            continue
+        seen.add(universe_id)
+        if universe_id in existing:
+            r["status"] = "exists"
+            continue
+        to_add.append((universe_id, names.get(universe_id), raw))
+
+    try:
+        added = await run_in_threadpool(store.games.add_many, owner_user_id, to_add)
+    except Exception as e:
+        print(f"[GAMES] bulk add for user {owner_user_id} failed: {e}")
+        yield _ndjson({"event": "error", "detail": "Could not save games, nothing was added"})
+        return
+
+    for r in results:
+        if "status" not in r:
+            game_id = added.get(r["universe_id"])
+            if game_id is None:
+                # added by another request since the check above
+                r["status"] = "exists"
+            else:
+                r.update(status="added", id=game_id)
+        yield _ndjson({"event": "row", **r})
+
+    yield _ndjson({"event": "done", **Counter(r["status"] for r in results)})
+
+
+# Body: {"game_urls": [...]}, {"csv": "..."} or a text/csv | text/plain body,
+# one game per line; any cell holding a /games/<placeId> URL counts.
+# Streams NDJSON: parsed, progress (resolve / names), one row event per input
+# row (added | exists | duplicate | invalid), then done with the counts.
+# All new games are inserted in one transaction.
+@router.post("/games/api/bulk-add")
+async def api_bulk_add(request: Request):
+    u = _get_current_user_row(request)
+    acct = (u["account_type"] or "")
+
+    if not (_is_partner(acct) or _is_admin(acct)):
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    if (request.headers.get("content-type") or "").startswith("application/json"):
+        payload = await request.json()
+        if not isinstance(payload, dict):
+            raise HTTPException(status_code=400, detail="Expected game_urls or csv")
+        items = payload.get("game_urls")
+        if items is None:
+            items = str(payload.get("csv") or "").splitlines()
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="game_urls must be a list")
+        lines = [str(x) for x in items]
+    else:
+        lines = (await request.body()).decode("utf-8", "replace").splitlines()
+
+    rows = _parse_bulk_rows(lines)
+    if not rows:
+        raise HTTPException(status_code=400, detail="No game URLs")
+    if len(rows) > BULK_ADD_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"Too many rows (max {BULK_ADD_MAX_ROWS})")
+
+    return StreamingResponse(_bulk_add_stream(u["id"], rows), media_type="application/x-ndjson")
+
+
 @router.post("/games/api/favorite")
 async def api_favorite(request: Request):
     u = _get_current_user_row(request)
@@ -539,20 +641,12 @@ async def api_favorite(request: Request):
     if game_id <= 0:
         raise HTTPException(status_code=400, detail="Invalid game_id")
 
-    with games_db() as conn:
-        row = conn.execute(
-            "SELECT id, is_favorite FROM games WHERE id=? AND owner_user_id=?",
-            (game_id, u["id"]),
-        ).fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Game not found")
-
-        new_val = 0 if int(row["is_favorite"] or 0) == 1 else 1
-        conn.execute(
-            "UPDATE games SET is_favorite=? WHERE id=?",
-            (new_val, game_id),
-        )
-        conn.commit()
+    row = store.games.get(game_id, owner_user_id=u["id"])
+    if not row:
+        raise HTTPException(status_code=404, detail="Game not found")
+
+    new_val = 0 if int(row["is_favorite"] or 0) == 1 else 1
+    store.games.set_favorite(game_id, new_val)
 
     return {"ok": True, "is_favorite": new_val}
 
@@ -570,19 +664,11 @@ async def api_request_delete(request: Request):
     if game_id <= 0:
         raise HTTPException(status_code=400, detail="Invalid game_id")
 
-    with games_db() as conn:
-        row = conn.execute(
-            "SELECT id FROM games WHERE id=? AND owner_user_id=?",
-            (game_id, u["id"]),
-        ).fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Game not found")
-
-        conn.execute(
-            "UPDATE games SET delete_requested=1, delete_requested_at=? WHERE id=?",
-            (datetime.utcnow().isoformat(), game_id),
-        )
-        conn.commit()
+    row = store.games.get(game_id, owner_user_id=u["id"])
+    if not row:
+        raise HTTPException(status_code=404, detail="Game not found")
+
+    store.games.request_delete(game_id)
 
     return {"ok": True}
 
@@ -599,12 +685,7 @@ async def api_admin_delete(request: Request):
     if game_id <= 0:
         raise HTTPException(status_code=400, detail="Invalid game_id")
 
-    with games_db() as conn:
-        row = conn.execute("SELECT id FROM games WHERE id=?", (game_id,)).fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Game not found")
-
-        conn.execute("DELETE FROM games WHERE id=?", (game_id,))
-        conn.commit()
+    if not store.games.delete(game_id):
+        raise HTTPException(status_code=404, detail="Game not found")
 
     return {"ok": True}
@@ -1,12 +1,10 @@
 from fastapi import APIRouter, Request, HTTPException
 from Dashboard.permissions import require, is_admin_email
-from Dashboard.db import games_db, init_games_db
+from Dashboard.auth import current_user
+from storage import get_storage
 
 router = APIRouter()
-
-@router.on_event("startup")
-def _init():
-    init_games_db()
+store = get_storage()
 
 @router.get("/projects")
 def projects_page(request: Request):
@@ -15,27 +13,21 @@ def projects_page(request: Request):
     return {"ok": True, "message": "Projects/Games area (partners add games; admins can remove)."}
 
 @router.post("/projects/games")
-def add_game(request: Request, name: str, universe_id: str = ""):
+def add_game(request: Request, name: str, universe_id: int):
     require(request, "can_manage_games")
-    user = request.state.user
-    with games_db() as db:
-        db.execute(
-            "INSERT INTO games(partner_email, name, universe_id) VALUES(?,?,?)",
-            (user["email"], name, universe_id or None)
-        )
-        db.commit()
-    return {"ok": True}
+    user = current_user(request)
+    if store.games.exists_for_owner(user["id"], universe_id):
+        raise HTTPException(400, "Game already added")
+    game_id = store.games.add(user["id"], universe_id, name.strip() or None, "")
+    return {"ok": True, "id": game_id}
 
 @router.delete("/projects/games/{game_id}")
 def remove_game(request: Request, game_id: int):
     # Admins only can remove
-    user = request.state.user
+    user = current_user(request)
     if not is_admin_email(user.get("email","")):
         require(request, "can_admin")
 
-    with games_db() as db:
-        cur = db.execute("DELETE FROM games WHERE id = ?", (game_id,))
-        db.commit()
-        if cur.rowcount == 0:
-            raise HTTPException(404, "Game not found")
+    if not store.games.delete(game_id):
+        raise HTTPException(404, "Game not found")
     return {"ok": True}
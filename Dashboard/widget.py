@@ -0,0 +1,143 @@
+"""
+/widget?token=<jwt>: the dashboard card partners embed on their sites.
+
+Embeds reload constantly, so the rendered card is cached per
+
+  (user id, email, account type, authz_version, permission mask, games data version)
+
+A role change bumps authz_version and changes the mask, a roles.json /
+admins.json edit changes the mask, and every games write bumps
+cache_versions('games') (storage.GameRepository.data_version). Each of those
+produces a new key, so an outdated card is never served; old entries just
+age out of the LRU.
+
+The ETag is a digest of that key plus the template, so a matching
+If-None-Match gets a 304 before anything is looked up in the cache or
+rendered. Responses are Cache-Control: private (the card is per user) with
+a max-age of WIDGET_MAX_AGE seconds; after that the browser revalidates.
+"""
+import os
+import hashlib
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, Response
+
+from cache import TTLCache
+from roles import FLAG_BITS
+from storage import get_storage
+from templates import Template
+from Dashboard.auth import MISSING_TOKEN, resolve_token
+
+WIDGET_CACHE_SIZE = int(os.environ.get("WIDGET_CACHE_SIZE", "4096"))
+WIDGET_CACHE_TTL = float(os.environ.get("WIDGET_CACHE_TTL", "600"))
+WIDGET_MAX_AGE = int(os.environ.get("WIDGET_MAX_AGE", "60"))
+
+router = APIRouter()
+store = get_storage()
+widget_cache = TTLCache(WIDGET_CACHE_SIZE, WIDGET_CACHE_TTL)
+
+WIDGET_PAGE = Template(
+    "<!doctype html><html><head><meta charset='utf-8'>"
+    "<title>Dreambox Widget</title></head>"
+    "<body style='margin:0;font-family:system-ui;background:#101010;color:#e5e5e5;'>"
+    "<div style='border:1px solid #262626;border-radius:10px;background:#171717;overflow:hidden;'>"
+    "<header style='padding:12px 16px;border-bottom:1px solid #2a2a2a;'>"
+    "<h2 style='margin:0;font-family:system-ui;'>Dreambox Dashboard - {{ account_type }}</h2>"
+    "<small style='color:#888;'>{{ email }}</small>"
+    "</header>"
+    "{{ sections|safe }}"
+    "</div></body></html>"
+)
+
+# (permission flag or None for everyone, markup), in display order
+SECTIONS = (
+    ("can_view_basic_dashboard",
+     "<section style='padding:12px 16px;'>"
+     "<h3>Overview</h3>"
+     "<p>Welcome. Your account is live. If you're AccountPending, you’ll still see Zoom + messaging.</p>"
+     "</section>"),
+    (None,
+     "<section style='padding:12px 16px;border-top:1px solid #222;'>"
+     "<h3>Zoom & Support</h3>"
+     "<p><strong>Zoom requests</strong> are logged. An admin will confirm your meeting by email.</p>"
+     "<p><strong>Messaging</strong>: support inbox (UI placeholder).</p>"
+     "</section>"),
+    ("can_view_game_data",
+     "<section style='padding:12px 16px;border-top:1px solid #222;'>"
+     "<h3>Game Analytics</h3>"
+     "<p>CCU / visits snapshots will show here.</p>"
+     "</section>"),
+    ("can_admin",
+     "<section style='padding:12px 16px;border-top:1px solid #222;background:#151515;'>"
+     "<h3>Admin</h3>"
+     "<p>Admin tools placeholder.</p>"
+     "</section>"),
+)
+
+# a deploy that changes the markup must not be answered with a 304
+_TEMPLATE_DIGEST = hashlib.sha256(
+    b"".join(c for c in WIDGET_PAGE.chunks if isinstance(c, bytes))
+    + "".join(markup for _, markup in SECTIONS).encode("utf-8")
+).hexdigest()[:12]
+
+
+def _cache_key(user: dict, mask: int) -> tuple:
+    return (
+        int(user["id"]),
+        user.get("email") or "",
+        user.get("account_type") or "",
+        int(user.get("authz_version") or 0),
+        mask,
+        store.games.data_version.current(),
+    )
+
+
+def _etag(key: tuple) -> str:
+    return '"' + hashlib.sha256(f"{_TEMPLATE_DIGEST}:{key!r}".encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _render(user: dict, mask: int) -> bytes:
+    sections = "".join(
+        markup for flag, markup in SECTIONS
+        if flag is None or mask & FLAG_BITS.get(flag, 0)
+    )
+    return WIDGET_PAGE.render(
+        account_type=user.get("account_type") or "",
+        email=user.get("email") or "",
+        sections=sections,
+    )
+
+
+def _not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or ("W/" + etag) in tags
+
+
+@router.get("/widget", response_class=HTMLResponse)
+def widget(request: Request, token: str = Query(None, description="JWT access token")):
+    if not token:
+        raise HTTPException(status_code=401, detail=MISSING_TOKEN)
+
+    # token verification and the identity lookup are cached too (token_cache / user cache)
+    user, mask, error = resolve_token(token)
+    if user is None:
+        raise HTTPException(status_code=401, detail=error)
+
+    key = _cache_key(user, mask)
+    etag = _etag(key)
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={WIDGET_MAX_AGE}"}
+    if _not_modified(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    body = widget_cache.get(key)
+    if body is None:
+        body = _render(user, mask)
+        widget_cache.set(key, body)
+    return HTMLResponse(content=body, headers=headers)
+
+
+def stats() -> dict:
+    return {**widget_cache.stats(), "max_age_seconds": WIDGET_MAX_AGE}
@@ -1,23 +1,37 @@
 # app.py
 import os
 import json
+import hashlib
 import sqlite3
 import random
 import string
-import smtplib
-from email.message import EmailMessage
-from email.utils import formataddr
+import secrets
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Set
+from typing import Optional
 
-from fastapi import FastAPI, HTTPException, Depends, Query, Form
+from fastapi import FastAPI, HTTPException, Depends, Form, Header, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipMiddleware
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
 
-from roles import AccountType, ROLE_PERMISSIONS
+from settings import BASE_DIR, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, is_admin_email
+from roles import AccountType
+from sqlite_schema import create_dreambox_schema
+from storage import get_storage
+from token_cache import decode_token, revoke_token, revoke_user_tokens
+from password_hashing import HashingBusy, make_unusable_password, pool as hash_pool
+from mailer import enqueue_email, worker as outbox_worker
+from roblox_api import resolver as roblox_resolver
+import twofa_store
+from twofa_store import challenges as twofa_challenges
+from login_limiter import TooManyAttempts, client_ip, login_limiter, twofa_limiter
+from Dashboard.auth import AuthMiddleware, authz_config_version, current_user, me_payload, permission_mask
+from static_assets import asset
+from templates import Template
+from json_responses import FastJSONResponse, GZIP_EXCLUDED_CONTENT_TYPES, JSON_GZIP_LEVEL, JSON_GZIP_MIN_SIZE
 
 # ============================================================
 # DOMAIN + EMAIL CONFIG (change later via environment variables)
@@ -31,13 +45,15 @@ EMAIL_FROM = os.environ.get("EMAIL_FROM", "no-reply@dreamboxinteractive.com")
 # APP CONFIG
 # ============================================================
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "dreambox.db")
 
-# JWT
-SECRET_KEY = os.environ.get("SECRET_KEY", "CHANGE_ME_TO_A_LONG_RANDOM_SECRET")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
+# users / games / snapshots / projects / invoices go through storage.py
+# (DREAMBOX_DB_BACKEND=sqlite|postgres)
+store = get_storage()
+
+# JWT: SECRET_KEY / ALGORITHM / ACCESS_TOKEN_EXPIRE_MINUTES come from settings.py
+# embed account type / permission mask / authz_version in access tokens (0 = sub only)
+TOKEN_PERMISSION_CLAIMS = os.environ.get("TOKEN_PERMISSION_CLAIMS", "1").strip() not in ("0", "false", "no")
 
 # 2FA
 TWOFA_CODE_EXPIRE_MINUTES = 10
@@ -45,419 +61,83 @@ TWOFA_CODE_EXPIRE_MINUTES = 10
 # password reset
 PASSWORD_RESET_EXPIRE_MINUTES = 60
 
-# SMTP
-SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.ionos.co.uk")
-SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
-SMTP_USER = os.environ.get("SMTP_USER", "")
-SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD", "")
+# SMTP settings (SMTP_HOST / SMTP_PORT / SMTP_USER / SMTP_PASSWORD / MAIL_BACKEND) live in mailer.py
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
+app = FastAPI(title="Dreambox Interactive Backend", default_response_class=FastJSONResponse)
 
-pwd_context = CryptContext(
-    schemes=["pbkdf2_sha256"],
-    deprecated="auto"
+# resolves the bearer token once per request into request.state.user / .permissions
+app.add_middleware(AuthMiddleware)
+# JSON only, above a size threshold (pages and assets are precompressed)
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=JSON_GZIP_MIN_SIZE,
+    compresslevel=JSON_GZIP_LEVEL,
+    exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + GZIP_EXCLUDED_CONTENT_TYPES,
 )
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+@app.on_event("startup")
+def _start_hash_pool():
+    hash_pool.warm_up()
+
+@app.on_event("startup")
+def _start_outbox_worker():
+    outbox_worker.start()
 
-app = FastAPI(title="Dreambox Interactive Backend")
+@app.on_event("shutdown")
+def _stop_hash_pool():
+    hash_pool.shutdown()
+
+@app.on_event("shutdown")
+def _stop_outbox_worker():
+    outbox_worker.stop()
+
+@app.on_event("shutdown")
+async def _close_roblox_client():
+    await roblox_resolver.aclose()
 
 # ============================================================
 # UI STYLE (DARK BG + WHITE GLOW HALO)
 # ============================================================
 
-AUTH_STYLE = """
-<style>
-  :root{
-    --page:#1a1a1a;
-    --card:#0b0d10;
-    --card2:#0a0c0f;
-    --text:#f4f6f8;
-    --muted:rgba(244,246,248,.65);
-    --field:rgba(255,255,255,.06);
-    --fieldLine:rgba(255,255,255,.12);
-    --radius:26px;
-  }
-
-  *{box-sizing:border-box}
-  html, body{height:100%;}
-
-  body{
-    margin:0;
-    font-family: ui-sans-serif, system-ui, -apple-system, Segoe UI, Roboto, Arial;
-    background: var(--page);
-    color: var(--text);
-
-    /* ✅ IMPORTANT: prevents "vh + padding" overflow */
-    height: 100vh;
-
-    display:flex;
-    justify-content:center;
-
-    /* ✅ top aligned like your screenshot */
-    align-items:flex-start;
-
-    /* ✅ only top padding (no bottom padding that causes overflow) */
-    padding:40px 20px 0;
-
-    /* ✅ stop scrollbars from glow/shadows */
-    overflow:hidden;
-  }
-
-  .glow-wrap{
-    position:relative;
-    width: min(980px, 100%);
-    margin: 0 auto;
-
-    /* ✅ contains the glow so it can’t create overflow */
-    overflow:hidden;
-    border-radius: var(--radius);
-  }
-
-  .glow-wrap::before{
-    content:"";
-    position:absolute;
-    inset:-70px; /* ✅ slightly reduced to avoid overflow edges */
-    background: radial-gradient(680px 280px at 50% 45%, rgba(255,255,255,.18), transparent 70%);
-    filter: blur(42px);
-    z-index:0;
-    pointer-events:none;
-  }
-
-  .card{
-    position:relative;
-    z-index:1;
-    width:100%;
-    background: linear-gradient(180deg, var(--card), var(--card2));
-    border-radius: var(--radius);
-    border: 1px solid rgba(255,255,255,.08);
-    padding: 26px;
-    box-shadow:
-      0 30px 80px rgba(0,0,0,.75),
-      inset 0 1px 0 rgba(255,255,255,.04);
-  }
-
-  .grid{
-    display:grid;
-    grid-template-columns: 1.2fr 0.8fr;
-    gap: 22px;
-
-    /* ✅ top-align so it doesn’t “float” */
-    align-items:start;
-    align-content:start;
-  }
-
-  @media (max-width: 860px){
-    .grid{ grid-template-columns: 1fr; }
-    body{ overflow:auto; } /* ✅ allow scroll on small screens */
-  }
-
-  .step{
-    font-size:11px;
-    letter-spacing:.18em;
-    text-transform:uppercase;
-    color:rgba(244,246,248,.55);
-    margin-bottom:8px;
-  }
-
-  h1,h2{
-    margin:0 0 8px 0;
-    font-size:34px;
-    letter-spacing:-0.02em;
-  }
-
-  .sub{
-    margin:0 0 18px 0;
-    color:var(--muted);
-    font-size:14px;
-    line-height:1.4;
-  }
-
-  .pill{
-    display:inline-flex;
-    align-items:center;
-    gap:8px;
-    padding:8px 12px;
-    border-radius: 999px;
-    border:1px solid rgba(255,255,255,.10);
-    background: rgba(255,255,255,.04);
-    color: rgba(244,246,248,.75);
-    font-size: 12px;
-  }
-
-  .dot{
-    width:10px; height:10px; border-radius:999px;
-    background: #22c55e;
-    box-shadow: 0 0 0 3px rgba(34,197,94,.10);
-  }
-
-  .hint{
-    margin-top:14px;
-    padding:12px 14px;
-    border-radius: 14px;
-    border:1px solid rgba(255,255,255,.10);
-    background: rgba(255,255,255,.03);
-    color: rgba(244,246,248,.72);
-    font-size: 13px;
-  }
-
-  .panel{
-    border-radius: 18px;
-    border:1px solid rgba(255,255,255,.10);
-    background: rgba(0,0,0,.18);
-    padding: 16px;
-
-    /* ✅ prevents panel stretching */
-    height: fit-content;
-    align-self: start;
-  }
-
-  label{
-    display:block;
-    margin: 14px 0 6px 0;
-    font-size: 12px;
-    letter-spacing:.08em;
-    text-transform:uppercase;
-    color: rgba(244,246,248,.72);
-  }
-
-  input{
-    width:100%;
-    padding: 12px 14px;
-    border-radius: 12px;
-    border: 1px solid var(--fieldLine);
-    background: var(--field);
-    color: var(--text);
-    outline:none;
-  }
-
-  input::placeholder{ color: rgba(244,246,248,.45) }
-
-  input:focus{
-    border-color: rgba(255,255,255,.22);
-    box-shadow: 0 0 0 4px rgba(255,255,255,.06);
-  }
-
-  .btn{
-    width:100%;
-    margin-top: 16px;
-    padding: 12px 16px;
-    border-radius: 999px;
-    border: 0;
-    background:#ffffff;
-    color:#0b0d10;
-    font-weight: 800;
-    cursor:pointer;
-  }
-
-  .btn-ghost{
-    width:100%;
-    margin-top: 10px;
-    padding: 12px 16px;
-    border-radius: 999px;
-    border: 1px solid rgba(255,255,255,.14);
-    background: rgba(255,255,255,.04);
-    color: rgba(244,246,248,.90);
-    font-weight: 700;
-    cursor:pointer;
-  }
-
-  .linkrow{
-    margin-top: 10px;
-    display:flex;
-    justify-content:flex-end;
-  }
-
-  a{
-    color: rgba(244,246,248,.75);
-    text-decoration: underline;
-    text-underline-offset: 3px;
-    font-size: 12px;
-  }
-
-  .code{
-    letter-spacing: .28em;
-    text-align:center;
-    font-size:18px;
-  }
-</style>
-"""
-
-
-def render_auth_shell(title: str, left_html: str, right_html: str) -> str:
-    return f"""<!doctype html>
+AUTH_STYLE = asset("auth.css").tag()
+
+
+# Compiled once: title is escaped, left / right are trusted fragments
+# (Templates spliced in at import via partial()).
+AUTH_SHELL = Template("""<!doctype html>
 <html>
 <head>
   <meta charset="utf-8">
-  <title>{title}</title>
-  {AUTH_STYLE}
+  <title>{{ title }}</title>
+  {{ style|safe }}
 </head>
 <body>
   <div class="glow-wrap">
     <div class="card">
       <div class="grid">
-        <div>{left_html}</div>
-        <div class="panel">{right_html}</div>
+        <div>{{ left|safe }}</div>
+        <div class="panel">{{ right|safe }}</div>
       </div>
     </div>
   </div>
 </body>
 </html>
-"""
-
-# ============================================================
-# CONFIG LOADING (admins.json can be in /config or root)
-# ============================================================
+""").partial(style=AUTH_STYLE)
 
-def _load_json_if_exists(path: str) -> Optional[dict]:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
-    except Exception as e:
-        print(f"[CONFIG] Failed reading {path}: {e}")
-        return None
-
-def load_admin_emails() -> Set[str]:
-    """
-    Supports both:
-      - ./config/admins.json  (preferred)
-      - ./admins.json         (fallback)
-    Format supported:
-      { "admins": ["a@b.com", ...] }  OR  ["a@b.com", ...]
-    """
-    config_dir = os.path.join(BASE_DIR, "config")
-    candidates = [
-        os.path.join(config_dir, "admins.json"),
-        os.path.join(BASE_DIR, "admins.json"),
-    ]
-
-    data = None
-    used = None
-    for p in candidates:
-        data = _load_json_if_exists(p)
-        if data is not None:
-            used = p
-            break
-
-    if data is None:
-        print("[CONFIG] No admins.json found. Admin list empty.")
-        return set()
-
-    if isinstance(data, dict):
-        admins_list = data.get("admins", [])
-    elif isinstance(data, list):
-        admins_list = data
-    else:
-        admins_list = []
-
-    emails = {str(e).lower() for e in admins_list if str(e).strip()}
-    print(f"[CONFIG] Loaded {len(emails)} admin emails from {used}")
-    return emails
-
-ADMIN_EMAILS = load_admin_emails()
 
 # ============================================================
 # DB INIT + LIGHT MIGRATIONS
 # ============================================================
 
-def _column_exists(cur: sqlite3.Cursor, table: str, col: str) -> bool:
-    cur.execute(f"PRAGMA table_info({table})")
-    cols = [r[1] for r in cur.fetchall()]
-    return col in cols
-
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS users ("
-        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
-        "email TEXT UNIQUE NOT NULL,"
-        "password_hash TEXT NOT NULL,"
-        "account_type TEXT NOT NULL DEFAULT 'AccountPending',"
-        "is_email_verified INTEGER NOT NULL DEFAULT 0,"
-        "twofa_code TEXT,"
-        "twofa_expires_at TEXT"
-        ");"
-    )
-
-    if not _column_exists(cur, "users", "password_reset_token"):
-        cur.execute("ALTER TABLE users ADD COLUMN password_reset_token TEXT;")
-    if not _column_exists(cur, "users", "password_reset_expires_at"):
-        cur.execute("ALTER TABLE users ADD COLUMN password_reset_expires_at TEXT;")
-
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS games ("
-        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
-        "owner_user_id INTEGER NOT NULL,"
-        "universe_id INTEGER NOT NULL,"
-        "name TEXT,"
-        "created_at TEXT NOT NULL,"
-        "FOREIGN KEY(owner_user_id) REFERENCES users(id)"
-        ");"
-    )
-
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS brands ("
-        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
-        "name TEXT NOT NULL,"
-        "owner_user_id INTEGER NOT NULL,"
-        "created_at TEXT NOT NULL,"
-        "FOREIGN KEY(owner_user_id) REFERENCES users(id)"
-        ");"
-    )
-
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS campaigns ("
-        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
-        "brand_id INTEGER NOT NULL,"
-        "name TEXT NOT NULL,"
-        "status TEXT NOT NULL DEFAULT 'draft',"
-        "created_at TEXT NOT NULL,"
-        "FOREIGN KEY(brand_id) REFERENCES brands(id)"
-        ");"
-    )
-
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS stats_snapshots ("
-        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
-        "universe_id INTEGER NOT NULL,"
-        "timestamp TEXT NOT NULL,"
-        "playing INTEGER,"
-        "visits INTEGER"
-        ");"
-    )
-
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS survey_submissions ("
-        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
-        "user_id INTEGER NOT NULL,"
-        "name TEXT,"
-        "company TEXT,"
-        "role TEXT,"
-        "goals TEXT,"
-        "budget_range TEXT,"
-        "timeline TEXT,"
-        "extra_notes TEXT,"
-        "preferred_time TEXT,"
-        "created_at TEXT NOT NULL,"
-        "FOREIGN KEY(user_id) REFERENCES users(id)"
-        ");"
-    )
-
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS zoom_meetings ("
-        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
-        "user_id INTEGER NOT NULL,"
-        "email TEXT NOT NULL,"
-        "preferred_time TEXT NOT NULL,"
-        "status TEXT NOT NULL DEFAULT 'requested',"
-        "zoom_join_url TEXT,"
-        "created_at TEXT NOT NULL,"
-        "FOREIGN KEY(user_id) REFERENCES users(id)"
-        ");"
-    )
+    if store.dialect != "sqlite":
+        store.init_schema()
+        return
 
+    conn = sqlite3.connect(DB_PATH)
+    create_dreambox_schema(conn)
     conn.commit()
     conn.close()
 
@@ -508,49 +188,60 @@ class PasswordResetJSON(BaseModel):
 # ============================================================
 
 def get_user_by_email(email: str) -> Optional[sqlite3.Row]:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM users WHERE email = ?", (email.lower(),))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    return store.users.get_by_email(email)
 
 def get_user_by_id(user_id: int) -> Optional[sqlite3.Row]:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    return store.users.get_by_id(user_id)
 
 # ============================================================
 # SECURITY UTILS
 # ============================================================
 
+# pbkdf2/bcrypt run in password_hashing's process pool; a full pool sheds with 503
+
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many sign-in attempts right now. Please try again in a moment.",
+        headers={"Retry-After": "2"},
+    )
+
 def hash_password(password: str) -> str:
     if len(password.encode("utf-8")) > 4096:
         raise HTTPException(status_code=400, detail="Password too long.")
-    return pwd_context.hash(password)
+    try:
+        return hash_pool.hash(password)
+    except HashingBusy:
+        raise _hashing_busy()
 
 def verify_password(plain: str, hashed: str) -> bool:
-    if hashed.startswith("$2a$") or hashed.startswith("$2b$") or hashed.startswith("$2y$"):
-        try:
-            import bcrypt
-            return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
-        except Exception:
-            return False
-    return pwd_context.verify(plain, hashed)
-
-def create_access_token(user_id: int) -> str:
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    payload = {"sub": str(user_id), "exp": expire}
+    try:
+        return hash_pool.verify(plain, hashed)
+    except HashingBusy:
+        raise _hashing_busy()
+
+def create_access_token(user_id: int, user: Optional[dict] = None) -> str:
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # iat is sub-second (a JWT NumericDate may be fractional) so revoke_user_tokens() cuts off
+    # exactly the tokens issued up to a password change, even within the same second;
+    # jti keeps two logins at the same instant from sharing a token (and a revocation)
+    payload = {"sub": str(user_id), "iat": time.time(), "exp": expire, "jti": secrets.token_urlsafe(12)}
+    if user is not None and TOKEN_PERMISSION_CLAIMS:
+        # AuthMiddleware authorizes from these while av matches users.authz_version
+        payload.update({
+            "email": user["email"],
+            "acct": user["account_type"],
+            "ev": int(user["is_email_verified"] or 0),
+            "perm": permission_mask(user),
+            "rv": authz_config_version(),
+            "av": int(user["authz_version"] or 0),
+        })
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 def decode_access_token(token: str) -> int:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token, SECRET_KEY, ALGORITHM)
         return int(payload.get("sub"))
     except (JWTError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid or expired token")
@@ -558,60 +249,18 @@ def decode_access_token(token: str) -> int:
 def create_twofa_code() -> str:
     return "".join(random.choices(string.digits, k=6))
 
-def set_twofa_code(user_id: int, code: str, expires_at: datetime):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE users SET twofa_code = ?, twofa_expires_at = ? WHERE id = ?;",
-        (code, expires_at.isoformat(), user_id),
-    )
-    conn.commit()
-    conn.close()
-
-def clear_twofa_code(user_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE users SET twofa_code = NULL, twofa_expires_at = NULL WHERE id = ?;",
-        (user_id,),
-    )
-    conn.commit()
-    conn.close()
+def set_twofa_code(user_id: int, code: str):
+    # twofa_store keeps challenges off the users row (memory or twofa_challenges table)
+    twofa_challenges.issue(user_id, code, TWOFA_CODE_EXPIRE_MINUTES * 60)
 
 # ============================================================
 # EMAIL HELPERS
 # ============================================================
 
-SENDER_NAME = "Dreambox Interactive"
-SENDER_EMAIL = "no-reply@dreamboxinteractive.com"
-
-def send_email(to_email: str, subject: str, body: str) -> bool:
-    if not SMTP_USER or not SMTP_PASSWORD:
-        print("\n--- EMAIL (SMTP NOT CONFIGURED) ---")
-        print("From:", formataddr((SENDER_NAME, SENDER_EMAIL)))
-        print("To:", to_email)
-        print("Subject:", subject)
-        print(body)
-        print("--- END EMAIL ---\n")
-        return False  # IMPORTANT
-
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = formataddr((SENDER_NAME, SENDER_EMAIL))
-    msg["To"] = to_email
-    msg.set_content(body)
-
-    try:
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=20) as server:
-            server.ehlo()
-            server.starttls()
-            server.ehlo()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.send_message(msg)
-        return True
-    except Exception as e:
-        print("[EMAIL ERROR]", repr(e))
-        return False
+def send_email(to_email: str, subject: str, body: str, db=None) -> int:
+    # queued in email_outbox; mailer's background worker does the SMTP part.
+    # with db the email is part of the caller's transaction
+    return enqueue_email(to_email, subject, body, db)
 
 
 def send_twofa_code_via_email(email: str, code: str):
@@ -619,7 +268,7 @@ def send_twofa_code_via_email(email: str, code: str):
     body = f"Your login code is: {code}\n\nIt expires in {TWOFA_CODE_EXPIRE_MINUTES} minutes."
     send_email(email, subject, body)
 
-def send_password_reset_email(email: str, token: str) -> bool:
+def send_password_reset_email(email: str, token: str, db=None) -> int:
     reset_link = f"{API_BASE_URL}/reset-password?token={token}"
     subject = "Set / Reset your Dreambox password"
     body = (
@@ -627,76 +276,37 @@ def send_password_reset_email(email: str, token: str) -> bool:
         f"{reset_link}\n\n"
         f"This link expires in {PASSWORD_RESET_EXPIRE_MINUTES} minutes."
     )
-    return send_email(email, subject, body)
+    return send_email(email, subject, body, db)
 
 # ============================================================
 # PASSWORD RESET CORE
 # ============================================================
 
-def create_password_reset_for_user(user_id: int, email: str):
-    token = "".join(random.choices(string.ascii_letters + string.digits, k=48))
-    expires_at = (datetime.utcnow() + timedelta(minutes=PASSWORD_RESET_EXPIRE_MINUTES)).isoformat()
-
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE users SET password_reset_token=?, password_reset_expires_at=? WHERE id=?;",
-        (token, expires_at, user_id),
-    )
-    conn.commit()
-    conn.close()
-
-    ok = send_password_reset_email(email, token)
-    if not ok:
-        raise HTTPException(
-            status_code=500,
-            detail="Email is not configured or failed to send. Contact support."
-        )
+def create_password_reset_for_user(user_id: int, email: str, db=None):
+    # only sha256(token) is stored (password_reset_tokens); the link carries the raw token
+    token = secrets.token_urlsafe(36)
+    store.reset_tokens.create(user_id, token, time.time() + PASSWORD_RESET_EXPIRE_MINUTES * 60, db=db)
+    send_password_reset_email(email, token, db)
 
-def consume_password_reset_token(token: str) -> sqlite3.Row:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM users WHERE password_reset_token=?;", (token,))
-    user = cur.fetchone()
-    conn.close()
+def consume_password_reset_token(token: str) -> dict:
+    # single use: the row is deleted whether or not it has expired
+    row = store.reset_tokens.consume(token)
 
-    if not user:
-        raise HTTPException(status_code=400, detail="Invalid reset token")
-
-    exp = user["password_reset_expires_at"]
-    if not exp:
+    if not row:
         raise HTTPException(status_code=400, detail="Invalid reset token")
 
-    try:
-        exp_dt = datetime.fromisoformat(exp)
-    except ValueError:
-        raise HTTPException(status_code=500, detail="Invalid reset expiry stored")
-
-    if datetime.utcnow() > exp_dt:
+    if time.time() > float(row["expires_at"]):
         raise HTTPException(status_code=400, detail="Reset token expired")
 
-    return user
-
-def clear_password_reset(user_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE users SET password_reset_token=NULL, password_reset_expires_at=NULL WHERE id=?;",
-        (user_id,),
-    )
-    conn.commit()
-    conn.close()
+    return {"id": int(row["user_id"])}
 
 # ============================================================
 # AUTH DEPENDENCY
 # ============================================================
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInfo:
-    user_id = decode_access_token(token)
-    row = get_user_by_id(user_id)
-    if not row:
-        raise HTTPException(status_code=401, detail="User not found")
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme)) -> UserInfo:
+    # AuthMiddleware already resolved the bearer token; oauth2_scheme stays for the OpenAPI docs
+    row = current_user(request)
     return UserInfo(
         id=row["id"],
         email=row["email"],
@@ -714,18 +324,9 @@ def signup(req: SignUpRequest):
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    account_type = AccountType.ADMIN if req.email.lower() in ADMIN_EMAILS else AccountType.PARTNER
+    account_type = AccountType.ADMIN if is_admin_email(req.email) else AccountType.PARTNER
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO users (email, password_hash, account_type, is_email_verified) "
-        "VALUES (?, ?, ?, 0);",
-        (req.email.lower(), hash_password(req.password), account_type.value),
-    )
-    conn.commit()
-    user_id = cur.lastrowid
-    conn.close()
+    user_id = store.users.create(req.email, hash_password(req.password), account_type.value)
 
     return UserInfo(
         id=user_id,
@@ -734,17 +335,32 @@ def signup(req: SignUpRequest):
         is_email_verified=False,
     )
 
+def _too_many_attempts(e: TooManyAttempts) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many attempts. Please wait a moment and try again.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
 @app.post("/auth/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
+def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     email = form_data.username
     password = form_data.password
+    ip = client_ip(request)
+    # before the user lookup and the pbkdf2 verify, so a stuffing burst costs no hashing
+    try:
+        login_limiter.check(ip, email)
+    except TooManyAttempts as e:
+        raise _too_many_attempts(e)
+
     row = get_user_by_email(email)
     if not row or not verify_password(password, row["password_hash"]):
+        login_limiter.failed(ip, email)
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    login_limiter.succeeded(email)
 
     code = create_twofa_code()
-    expires_at = datetime.utcnow() + timedelta(minutes=TWOFA_CODE_EXPIRE_MINUTES)
-    set_twofa_code(row["id"], code, expires_at)
+    set_twofa_code(row["id"], code)
     send_twofa_code_via_email(email, code)
 
     # NOTE: still JSON, but now you also have an HTML place to paste:
@@ -752,30 +368,32 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
     return {"detail": "2FA code sent to your email.", "twofa_url": f"{API_BASE_URL}/twofa?email={email}"}
 
 @app.post("/auth/verify-2fa", response_model=TokenResponse)
-def verify_twofa(req: TwoFAVerifyRequest):
+def verify_twofa(req: TwoFAVerifyRequest, request: Request):
+    ip = client_ip(request)
+    try:
+        twofa_limiter.check(ip, req.email)
+    except TooManyAttempts as e:
+        raise _too_many_attempts(e)
+
     row = get_user_by_email(req.email)
     if not row:
+        twofa_limiter.failed(ip, req.email)
         raise HTTPException(status_code=401, detail="Invalid email or code")
 
-    stored_code = row["twofa_code"]
-    expires_at_str = row["twofa_expires_at"]
-    if not stored_code or not expires_at_str:
+    result = twofa_challenges.check(row["id"], req.code.strip())
+    if result != twofa_store.OK:
+        twofa_limiter.failed(ip, req.email)
+    if result == twofa_store.MISSING:
         raise HTTPException(status_code=401, detail="2FA not initialized, please login again")
-
-    try:
-        expires_at = datetime.fromisoformat(expires_at_str)
-    except ValueError:
-        raise HTTPException(status_code=500, detail="Invalid 2FA expiry")
-
-    if datetime.utcnow() > expires_at:
-        clear_twofa_code(row["id"])
+    if result == twofa_store.EXPIRED:
         raise HTTPException(status_code=401, detail="2FA code expired, please login again")
-
-    if req.code != stored_code:
+    if result == twofa_store.LOCKED:
+        raise HTTPException(status_code=429, detail="Too many invalid codes, please login again")
+    if result != twofa_store.OK:
         raise HTTPException(status_code=401, detail="Invalid 2FA code")
 
-    clear_twofa_code(row["id"])
-    token = create_access_token(row["id"])
+    twofa_limiter.succeeded(req.email)
+    token = create_access_token(row["id"], dict(row))
     return TokenResponse(access_token=token)
 
 #@app.get("/auth/me", response_model=UserInfo)
@@ -783,48 +401,50 @@ def verify_twofa(req: TwoFAVerifyRequest):
   #  return current_user
 
 @app.get("/auth/me")
-def read_me(current_user: UserInfo = Depends(get_current_user)):
-    perms = ROLE_PERMISSIONS[current_user.account_type]
-    return {
-        "id": current_user.id,
-        "email": current_user.email,
-        "account_type": current_user.account_type.value,
-        "is_email_verified": current_user.is_email_verified,
-        "permissions": perms,
-    }
+def read_me(request: Request, current_user: UserInfo = Depends(get_current_user)):
+    return me_payload(request)
 
+@app.post("/auth/logout")
+def logout(token: str = Depends(oauth2_scheme)):
+    decode_access_token(token)
+    revoke_token(token)
+    return {"detail": "Logged out."}
 
 
 # ============================================================
 # 2FA HTML PAGE (PLACE TO PASTE THE CODE) - STYLED
 # ============================================================
 
-@app.get("/twofa", response_class=HTMLResponse)
-def twofa_page(email: str = ""):
-    left = f"""
+TWOFA_PAGE = AUTH_SHELL.partial(
+    title="Verify 2FA",
+    left="""
       <div class="step">STEP 2 · SECURE LOGIN</div>
       <h1>Verify 2FA</h1>
       <p class="sub">Enter the 6-digit code we emailed to finish signing in.</p>
       <div class="pill"><span class="dot"></span> 2FA required for every login</div>
       <div class="hint">If your code expired, go back and sign in again to receive a new one.</div>
-    """
-    right = f"""
+    """,
+    right=Template("""
       <form method="POST" action="/twofa">
         <label>Email</label>
-        <input name="email" type="email" required placeholder="you@company.com" value="{email}">
+        <input name="email" type="email" required placeholder="you@company.com" value="{{ email }}">
         <label>2FA Code</label>
-        <input class="code" name="code" inputmode="numeric" pattern="\\d{{6}}" maxlength="6" minlength="6" required placeholder="••••••">
+        <input class="code" name="code" inputmode="numeric" pattern="\\d{6}" maxlength="6" minlength="6" required placeholder="••••••">
         <button class="btn" type="submit">Continue</button>
         <div class="linkrow">
           <a href="/forgot-password">Forgot your password?</a>
         </div>
       </form>
-    """
-    return HTMLResponse(render_auth_shell("Verify 2FA", left, right))
+    """),
+)
+
+@app.get("/twofa", response_class=HTMLResponse)
+def twofa_page(email: str = ""):
+    return TWOFA_PAGE.response(email=email)
 
 @app.post("/twofa")
-def twofa_submit(email: str = Form(...), code: str = Form(...)):
-    token = verify_twofa(TwoFAVerifyRequest(email=email, code=code)).access_token
+def twofa_submit(request: Request, email: str = Form(...), code: str = Form(...)):
+    token = verify_twofa(TwoFAVerifyRequest(email=email, code=code), request).access_token
     # Simple redirect back to frontend; you can grab token from URL there.
     return RedirectResponse(url=f"{FRONTEND_BASE_URL}/login?token={token}", status_code=302)
 
@@ -842,88 +462,72 @@ def request_password_reset(req: PasswordResetRequest):
 @app.post("/auth/reset-password")
 def reset_password_json(req: PasswordResetJSON):
     user = consume_password_reset_token(req.token)
-
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE users SET password_hash=? WHERE id=?;",
-        (hash_password(req.new_password), user["id"]),
-    )
-    conn.commit()
-    conn.close()
-
-    clear_password_reset(user["id"])
+    store.users.set_password_hash(user["id"], hash_password(req.new_password))
+    revoke_user_tokens(user["id"])
     return {"detail": "Password updated successfully."}
 
 # ============================================================
 # RESET PASSWORD (HTML PAGE ON API DOMAIN) - STYLED
 # ============================================================
 
-@app.get("/reset-password", response_class=HTMLResponse)
-def reset_password_page(token: str):
-    left = """
+RESET_PASSWORD_PAGE = AUTH_SHELL.partial(
+    title="Set Password",
+    left="""
       <div class="step">STEP 1 · SECURE LOGIN</div>
       <h1>Set password</h1>
       <p class="sub">Create a new password to access your Dreambox account.</p>
       <div class="pill"><span class="dot"></span> 2FA required for every login</div>
       <div class="hint">After setting your password, you’ll be redirected back to the main site.</div>
-    """
-    right = f"""
+    """,
+    right=Template("""
       <form method="POST" action="/reset-password">
-        <input type="hidden" name="token" value="{token}">
+        <input type="hidden" name="token" value="{{ token }}">
         <label>New password</label>
         <input type="password" name="new_password" required minlength="8" placeholder="At least 8 characters">
         <button class="btn" type="submit">Continue</button>
       </form>
-    """
-    return HTMLResponse(render_auth_shell("Set Password", left, right))
+    """),
+)
+
+@app.get("/reset-password", response_class=HTMLResponse)
+def reset_password_page(token: str):
+    return RESET_PASSWORD_PAGE.response(token=token)
 
 @app.post("/reset-password")
 def reset_password_form(token: str = Form(...), new_password: str = Form(...)):
     user = consume_password_reset_token(token)
-
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE users SET password_hash=? WHERE id=?;",
-        (hash_password(new_password), user["id"]),
-    )
-    conn.commit()
-    conn.close()
-
-    clear_password_reset(user["id"])
+    store.users.set_password_hash(user["id"], hash_password(new_password))
+    revoke_user_tokens(user["id"])
     return RedirectResponse(url=f"{FRONTEND_BASE_URL}/login", status_code=302)
 
 # ============================================================
 # SURVEY FLOW (EMAIL ONLY + AccountPending + sends reset)
 # ============================================================
 
-def create_or_get_pending_user(email: str) -> int:
-    row = get_user_by_email(email)
-    if row:
-        return row["id"]
-
-    temp_password = "Temp-" + "".join(random.choices(string.digits, k=12))
-
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO users (email, password_hash, account_type, is_email_verified) "
-        "VALUES (?, ?, ?, 0);",
-        (email.lower(), hash_password(temp_password), AccountType.ACCOUNT_PENDING.value),
-    )
-    conn.commit()
-    user_id = cur.lastrowid
-    conn.close()
-    return user_id
+# One transaction: pending user, survey row, zoom request, reset link and the
+# queued email commit together or not at all. No password is hashed (the user
+# sets one from the emailed link) and no SMTP runs in the request.
 
-def store_survey_submission(user_id: int, req: SurveySubmission):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
+def survey_idempotency_key(req: SurveySubmission, header: Optional[str]) -> str:
+    """
+    The client's Idempotency-Key when sent; otherwise a digest of the answers
+    plus today's date, so a resubmit of the same form the same day is a no-op.
+    Header keys are hashed with the submitter's email, so two people sending
+    the same key never drop each other's survey.
+    """
+    if header and header.strip():
+        raw = req.email.lower() + "|" + header.strip()
+        return "h:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    raw = json.dumps([req.email.lower(), req.dict(), datetime.utcnow().date().isoformat()], sort_keys=True, default=str)
+    return "d:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def store_survey_submission(db, user_id: int, req: SurveySubmission, idempotency_key: str) -> bool:
+    """Insert the survey row; False when idempotency_key was already used (a retry)."""
+    cur = db.execute(
         "INSERT INTO survey_submissions (user_id, name, company, role, goals, "
-        "budget_range, timeline, extra_notes, preferred_time, created_at) "
-        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);",
+        "budget_range, timeline, extra_notes, preferred_time, created_at, idempotency_key) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(idempotency_key) DO NOTHING;",
         (
             user_id,
             req.name,
@@ -935,161 +539,95 @@ def store_survey_submission(user_id: int, req: SurveySubmission):
             req.extra_notes,
             req.preferred_time,
             datetime.utcnow().isoformat(),
+            idempotency_key,
         ),
     )
-    conn.commit()
-    conn.close()
+    return cur.rowcount > 0
 
-def create_zoom_booking(user_id: int, email: str, preferred_time: str) -> None:
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
+def create_zoom_booking(db, user_id: int, email: str, preferred_time: str) -> None:
+    db.execute(
         "INSERT INTO zoom_meetings (user_id, email, preferred_time, status, zoom_join_url, created_at) "
         "VALUES (?, ?, ?, ?, NULL, ?);",
         (user_id, email.lower(), preferred_time or "", "requested", datetime.utcnow().isoformat()),
     )
-    conn.commit()
-    conn.close()
 
 @app.post("/survey/submit")
-def submit_survey(req: SurveySubmission):
-    user_id = create_or_get_pending_user(req.email)
-    store_survey_submission(user_id, req)
-    create_zoom_booking(user_id, req.email, req.preferred_time)
-    create_password_reset_for_user(user_id, req.email)
-    return {"detail": "Survey submitted. Check your email to set your password."}
-
-# ============================================================
-# WIDGET (EMBED DASHBOARD) - LEFT AS-IS (OPTIONAL TO RESTYLE)
-# ============================================================
-
-@app.get("/widget", response_class=HTMLResponse)
-def widget(token: str = Query(None, description="JWT access token")):
-    if not token:
-        raise HTTPException(status_code=401, detail="Missing token")
-
-    user_id = decode_access_token(token)
-    row = get_user_by_id(user_id)
-    if not row:
-        raise HTTPException(status_code=401, detail="User not found")
-
-    account_type = AccountType(row["account_type"])
-    perms = ROLE_PERMISSIONS[account_type]
-
-    sections = []
-    sections.append(
-        f"<header style='padding:12px 16px;border-bottom:1px solid #2a2a2a;'>"
-        f"<h2 style='margin:0;font-family:system-ui;'>Dreambox Dashboard - {account_type.value}</h2>"
-        f"<small style='color:#888;'>{row['email']}</small>"
-        f"</header>"
-    )
-
-    if perms.get("can_view_basic_dashboard"):
-        sections.append(
-            "<section style='padding:12px 16px;'>"
-            "<h3>Overview</h3>"
-            "<p>Welcome. Your account is live. If you're AccountPending, you’ll still see Zoom + messaging.</p>"
-            "</section>"
-        )
-
-    sections.append(
-        "<section style='padding:12px 16px;border-top:1px solid #222;'>"
-        "<h3>Zoom & Support</h3>"
-        "<p><strong>Zoom requests</strong> are logged. An admin will confirm your meeting by email.</p>"
-        "<p><strong>Messaging</strong>: support inbox (UI placeholder).</p>"
-        "</section>"
-    )
-
-    if perms.get("can_view_game_data"):
-        sections.append(
-            "<section style='padding:12px 16px;border-top:1px solid #222;'>"
-            "<h3>Game Analytics</h3>"
-            "<p>CCU / visits snapshots will show here.</p>"
-            "</section>"
-        )
-
-    if perms.get("can_admin"):
-        sections.append(
-            "<section style='padding:12px 16px;border-top:1px solid #222;background:#151515;'>"
-            "<h3>Admin</h3>"
-            "<p>Admin tools placeholder.</p>"
-            "</section>"
+def submit_survey(req: SurveySubmission, idempotency_key: Optional[str] = Header(None)):
+    key = survey_idempotency_key(req, idempotency_key)
+    with store.connect("dreambox") as db:
+        user_id = store.users.get_or_create(
+            db, req.email, make_unusable_password(), AccountType.ACCOUNT_PENDING.value
         )
-
-    html = (
-        "<!doctype html><html><head><meta charset='utf-8'>"
-        "<title>Dreambox Widget</title></head>"
-        "<body style='margin:0;font-family:system-ui;background:#101010;color:#e5e5e5;'>"
-        "<div style='border:1px solid #262626;border-radius:10px;background:#171717;overflow:hidden;'>"
-        + "".join(sections) +
-        "</div></body></html>"
-    )
-    return HTMLResponse(content=html)
+        is_new = store_survey_submission(db, user_id, req, key)
+        if is_new:
+            create_zoom_booking(db, user_id, req.email, req.preferred_time)
+            create_password_reset_for_user(user_id, req.email, db)
+    if is_new:
+        outbox_worker.wake()
+    return {"detail": "Survey submitted. Check your email to set your password."}
 
 # ============================================================
 # HTML FORGOT PASSWORD PAGE - STYLED
 # ============================================================
 
-@app.get("/forgot-password", response_class=HTMLResponse)
-def forgot_password_page():
-    left = """
+FORGOT_PASSWORD_PAGE = AUTH_SHELL.partial(
+    title="Forgot Password",
+    left="""
       <div class="step">STEP 1 · SECURE LOGIN</div>
       <h1>Forgot password</h1>
       <p class="sub">Enter your email and we’ll send a reset link.</p>
       <div class="pill"><span class="dot"></span> 2FA required for every login</div>
       <div class="hint">If the email exists, we’ll send a reset link.</div>
-    """
-    right = f"""
+    """,
+    right="""
       <form method="POST" action="/forgot-password">
         <label>Email</label>
         <input type="email" name="email" required placeholder="you@company.com">
         <button class="btn" type="submit">Continue</button>
         <button class="btn-ghost" type="button" onclick="window.location.href='/twofa'">Back to 2FA</button>
       </form>
-    """
-    return HTMLResponse(render_auth_shell("Forgot Password", left, right))
+    """,
+)
+
+# Styled confirmation page (same glow)
+RESET_LINK_SENT_PAGE = AUTH_SHELL.partial(
+    title="Reset Link Sent",
+    left="""
+      <div class="step">DONE</div>
+      <h1>Check your email</h1>
+      <p class="sub">If the email exists, a reset link has been sent.</p>
+      <div class="hint">Open the email and click the reset link to set a new password.</div>
+    """,
+    right=Template("""
+      <div class="sub" style="margin-bottom:14px;">When you’re ready:</div>
+      <button class="btn" type="button" onclick="window.location.href='{{ login_url }}'">Back to login</button>
+    """).partial(login_url=f"{FRONTEND_BASE_URL}/login"),
+)
+
+@app.get("/forgot-password", response_class=HTMLResponse)
+def forgot_password_page():
+    return FORGOT_PASSWORD_PAGE.response()
 
 @app.post("/forgot-password")
 def forgot_password_submit(email: str = Form(...)):
     email_l = email.lower().strip()
     row = get_user_by_email(email_l)
 
-    if not row and email_l in ADMIN_EMAILS:
-        temp_password = "Temp-" + "".join(random.choices(string.digits, k=12))
-
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO users (email, password_hash, account_type, is_email_verified) "
-            "VALUES (?, ?, ?, 0);",
-            (email_l, hash_password(temp_password), AccountType.ADMIN.value),
-        )
-        conn.commit()
-        user_id = cur.lastrowid
-        conn.close()
+    if not row and is_admin_email(email_l):
+        user_id = store.users.create(email_l, make_unusable_password(), AccountType.ADMIN.value)
 
         row = {"id": user_id, "email": email_l}
 
     if row:
         create_password_reset_for_user(row["id"], row["email"])
 
-    # Styled confirmation page (same glow)
-    left = """
-      <div class="step">DONE</div>
-      <h1>Check your email</h1>
-      <p class="sub">If the email exists, a reset link has been sent.</p>
-      <div class="hint">Open the email and click the reset link to set a new password.</div>
-    """
-    right = f"""
-      <div class="sub" style="margin-bottom:14px;">When you’re ready:</div>
-      <button class="btn" type="button" onclick="window.location.href='{FRONTEND_BASE_URL}/login'">Back to login</button>
-    """
-    return HTMLResponse(render_auth_shell("Reset Link Sent", left, right))
+    return RESET_LINK_SENT_PAGE.response()
 
 # ===========================
 # ROUTER INCLUDES
 # ===========================
 
+from static_assets import router as static_assets_router
 from landing_pages import router as landing_router
 from portal_pages import router as portal_router
 from dashboard import router as legacy_dashboard_router  # option A: keep old dashboard.py routes
@@ -1104,7 +642,12 @@ from Dashboard.games import router as games_router
 from Dashboard.campaigns import router as campaigns_router
 from Dashboard.billing import router as billing_router
 from Dashboard.admin_panel import router as admin_router
+from Dashboard.bootstrap import router as bootstrap_router
+from Dashboard.widget import router as widget_router
+
 
+# Fingerprinted CSS / JS under /static
+app.include_router(static_assets_router)
 
 # Include base site routers first
 app.include_router(landing_router)
@@ -1123,4 +666,6 @@ app.include_router(games_router)
 app.include_router(campaigns_router)
 app.include_router(billing_router)
 app.include_router(admin_router)
+app.include_router(bootstrap_router)
+app.include_router(widget_router)
 
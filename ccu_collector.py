@@ -3,40 +3,25 @@ import time
 import sqlite3
 from datetime import datetime
 import requests
-import os
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "games.db")
+from storage import get_storage
+
 POLL_INTERVAL_SECONDS = 300  # 5 minutes
 
+store = get_storage()
+
 
 def get_tracked_universe_ids():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
     try:
-        cur.execute("SELECT DISTINCT universe_id FROM games")
+        return store.games.tracked_universe_ids()
     except sqlite3.OperationalError as e:
         print("DB not ready yet (games table missing):", e)
-        conn.close()
         return []
-    rows = cur.fetchall()
-    conn.close()
-    return [r["universe_id"] for r in rows]
-
-
-def insert_snapshot(universe_id: int, playing: int, visits: int, favorites: int):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO stats_snapshots (universe_id, timestamp, playing, visits, favorites)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (universe_id, datetime.utcnow().isoformat(), playing, visits, favorites),
-    )
-    conn.commit()
-    conn.close()
+
+
+def insert_snapshots(rows):
+    """rows: (universe_id, timestamp, playing, visits, favorites). One bulk write per poll."""
+    return store.snapshots.insert_many(rows)
 
 
 
@@ -54,19 +39,23 @@ def poll_once():
         print("Error talking to Roblox API:", e)
         return
     data = resp.json().get("data", [])
+    now = datetime.utcnow().isoformat()
+    rows = []
     for game in data:
         universe_id = game["id"]
         playing = game.get("playing") or 0
         visits = game.get("visits") or 0
         favorites = game.get("favoritedCount") or 0
 
-        insert_snapshot(universe_id, playing, visits, favorites)
+        rows.append((universe_id, now, playing, visits, favorites))
 
         print(
             f"[SNAPSHOT] {universe_id} "
             f"playing={playing} visits={visits} favorites={favorites}"
     )
 
+    insert_snapshots(rows)
+
 
 
 def main():
@@ -0,0 +1,307 @@
+# db_indexes.py
+"""
+Index pack + query catalogue for the three SQLite files (dreambox.db, games.db,
+campaigns.db).
+
+- INDEX_MIGRATIONS is applied at startup by each module's schema/init code via
+  apply_index_migrations(conn, "<db key>").
+- QUERY_CATALOGUE lists the hot statements the app runs. Each is defined
+  once, through register_query(), next to the method that runs it (see
+  CATALOGUE_MODULES), so the catalogue is the SQL the app actually sends.
+- The advisor below builds each schema in an in-memory DB from the same
+  sqlite_schema DDL the app runs at startup, seeds it, and runs every
+  catalogued query through EXPLAIN QUERY PLAN. It needs no database files.
+
+Usage:
+  python db_indexes.py              # print plans for every catalogued query
+  python db_indexes.py --baseline   # also show which pack index fixes which scan
+  python db_indexes.py --check      # exit 1 if any catalogued query scans a table
+"""
+import sys
+import sqlite3
+import argparse
+import importlib
+from typing import Dict, List, Optional
+
+# ============================================================
+# INDEX PACK (applied by apply_index_migrations)
+# ============================================================
+
+# (db key, index name, table, columns that must exist, DDL)
+INDEX_MIGRATIONS = [
+    (
+        "dreambox", "idx_users_email_nocase", "users", ["email"],
+        "CREATE INDEX IF NOT EXISTS idx_users_email_nocase ON users(email COLLATE NOCASE);",
+    ),
+    (
+        "dreambox", "idx_users_account_type", "users", ["account_type"],
+        "CREATE INDEX IF NOT EXISTS idx_users_account_type ON users(account_type);",
+    ),
+    (
+        "dreambox", "idx_brands_owner", "brands", ["owner_user_id"],
+        "CREATE INDEX IF NOT EXISTS idx_brands_owner ON brands(owner_user_id);",
+    ),
+    (
+        "dreambox", "idx_survey_submissions_user", "survey_submissions", ["user_id"],
+        "CREATE INDEX IF NOT EXISTS idx_survey_submissions_user ON survey_submissions(user_id);",
+    ),
+    (
+        "dreambox", "idx_survey_submissions_idempotency", "survey_submissions", ["idempotency_key"],
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_survey_submissions_idempotency "
+        "ON survey_submissions(idempotency_key);",
+    ),
+    (
+        "dreambox", "idx_zoom_meetings_user", "zoom_meetings", ["user_id"],
+        "CREATE INDEX IF NOT EXISTS idx_zoom_meetings_user ON zoom_meetings(user_id);",
+    ),
+    (
+        "dreambox", "idx_token_revocations_expires", "token_revocations", ["expires_at"],
+        "CREATE INDEX IF NOT EXISTS idx_token_revocations_expires ON token_revocations(expires_at);",
+    ),
+    (
+        "dreambox", "idx_email_outbox_due", "email_outbox", ["status", "next_attempt_at"],
+        "CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(status, next_attempt_at);",
+    ),
+    (
+        "dreambox", "idx_email_outbox_claim", "email_outbox", ["claim_token"],
+        "CREATE INDEX IF NOT EXISTS idx_email_outbox_claim "
+        "ON email_outbox(claim_token) WHERE claim_token IS NOT NULL;",
+    ),
+    (
+        "dreambox", "idx_twofa_challenges_expires", "twofa_challenges", ["expires_at"],
+        "CREATE INDEX IF NOT EXISTS idx_twofa_challenges_expires ON twofa_challenges(expires_at);",
+    ),
+    (
+        "dreambox", "idx_password_reset_tokens_expires", "password_reset_tokens", ["expires_at"],
+        "CREATE INDEX IF NOT EXISTS idx_password_reset_tokens_expires ON password_reset_tokens(expires_at);",
+    ),
+    (
+        "dreambox", "idx_password_reset_tokens_user", "password_reset_tokens", ["user_id"],
+        "CREATE INDEX IF NOT EXISTS idx_password_reset_tokens_user ON password_reset_tokens(user_id);",
+    ),
+    (
+        "dreambox", "idx_auth_failures_key_ts", "auth_failures", ["key", "ts"],
+        "CREATE INDEX IF NOT EXISTS idx_auth_failures_key_ts ON auth_failures(key, ts);",
+    ),
+    (
+        "dreambox", "idx_auth_failures_ts", "auth_failures", ["ts"],
+        "CREATE INDEX IF NOT EXISTS idx_auth_failures_ts ON auth_failures(ts);",
+    ),
+    (
+        "games", "idx_games_delete_requested", "games", ["delete_requested"],
+        "CREATE INDEX IF NOT EXISTS idx_games_delete_requested "
+        "ON games(delete_requested) WHERE delete_requested = 1;",
+    ),
+    (
+        "games", "idx_games_owner_fav_id", "games", ["owner_user_id", "is_favorite", "id"],
+        "CREATE INDEX IF NOT EXISTS idx_games_owner_fav_id ON games(owner_user_id, is_favorite DESC, id DESC);",
+    ),
+    (
+        "campaigns", "idx_project_access_user_email", "project_access", ["user_email", "project_id"],
+        "CREATE INDEX IF NOT EXISTS idx_project_access_user_email "
+        "ON project_access(user_email, project_id);",
+    ),
+    (
+        "campaigns", "idx_invoices_project_id", "invoices", ["project_id"],
+        "CREATE INDEX IF NOT EXISTS idx_invoices_project_id ON invoices(project_id);",
+    ),
+]
+
+# (db key, index name) of pack indexes no query reads any more; dropped on startup
+RETIRED_INDEXES = [
+    # reset links moved to password_reset_tokens; nothing reads users.password_reset_token
+    ("dreambox", "idx_users_password_reset_token"),
+    # the dreambox copy of games is legacy; game rows live in games.db
+    ("dreambox", "idx_games_delete_requested"),
+    ("dreambox", "idx_games_owner"),
+]
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    # NOTE: PRAGMA table_info returns rows like: (cid, name, type, notnull, dflt_value, pk)
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def apply_index_migrations(conn: sqlite3.Connection, db_key: str) -> List[str]:
+    """
+    Create every pack index for db_key whose table/columns exist in this file
+    and drop its RETIRED_INDEXES. Safe to call on every startup. Returns the
+    index names that were applied.
+    """
+    for key, name in RETIRED_INDEXES:
+        if key == db_key:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+    applied = []
+    for key, name, table, cols, ddl in INDEX_MIGRATIONS:
+        if key != db_key:
+            continue
+        existing = _table_columns(conn, table)
+        if not existing or any(c not in existing for c in cols):
+            continue
+        conn.execute(ddl)
+        applied.append(name)
+    return applied
+
+
+# ============================================================
+# QUERY CATALOGUE
+# ============================================================
+
+# name -> {"db", "sql", "params", "allow_scan"}
+# allow_scan documents why a full scan is expected (admin-wide listings etc).
+QUERY_CATALOGUE: Dict[str, dict] = {}
+
+# Each hot statement is a constant next to the method that runs it, defined
+# through register_query() so the catalogue holds the exact SQL the app sends.
+CATALOGUE_MODULES = ("storage", "token_cache", "twofa_store", "login_limiter", "mailer")
+
+# "{marks}" in a registered statement is an IN list built at call time
+SAMPLE_IN_LIST = "?, ?, ?"
+
+
+def register_query(name: str, db: str, sql: str, params: tuple = (), allow_scan: Optional[str] = None) -> str:
+    """Catalogue sql under name (params are sample values for EXPLAIN) and return it unchanged."""
+    QUERY_CATALOGUE[name] = {
+        "db": db,
+        "sql": sql.replace("{marks}", SAMPLE_IN_LIST),
+        "params": params,
+        "allow_scan": allow_scan,
+    }
+    return sql
+
+
+def load_catalogue() -> Dict[str, dict]:
+    """Import every module that registers queries (they import this one, so not at the top)."""
+    for module in CATALOGUE_MODULES:
+        importlib.import_module(module)
+    return QUERY_CATALOGUE
+
+
+# ============================================================
+# ADVISOR (seeded in-memory copy of each schema)
+# ============================================================
+
+SEED_ROWS = 2000
+
+
+def _seed_value(col_type: str, col: str, i: int):
+    t = (col_type or "").upper()
+    if "INT" in t:
+        return i
+    if "REAL" in t or "FLOA" in t or "DOUB" in t:
+        return float(i)
+    return f"{col}-{i}"
+
+
+def build_seeded_db(db_key: str, with_pack: bool = True, rows: int = SEED_ROWS) -> sqlite3.Connection:
+    """Create db_key's schema in memory, fill every table with synthetic rows, ANALYZE."""
+    from sqlite_schema import SCHEMAS  # sqlite_schema imports this module
+
+    mem = sqlite3.connect(":memory:")
+    SCHEMAS[db_key](mem)
+    if not with_pack:
+        for key, name, *_ in INDEX_MIGRATIONS:
+            if key == db_key:
+                mem.execute(f"DROP INDEX IF EXISTS {name}")
+
+    tables = [r[0] for r in mem.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()]
+    for name in tables:
+        info = mem.execute(f"PRAGMA table_info({name})").fetchall()
+        cols = [r for r in info if not r[5]]  # skip INTEGER PRIMARY KEY
+        if not cols:
+            continue
+        col_names = ", ".join(r[1] for r in cols)
+        marks = ", ".join("?" for _ in cols)
+        mem.executemany(
+            f"INSERT OR IGNORE INTO {name} ({col_names}) VALUES ({marks})",
+            ([_seed_value(r[2], r[1], i) for r in cols] for i in range(rows)),
+        )
+
+    mem.execute("ANALYZE")
+    mem.commit()
+    return mem
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    return [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+def scan_lines(plan: List[str]) -> List[str]:
+    # "SCAN t" is a full table walk; "SCAN t USING COVERING INDEX" still visits every entry.
+    return [line for line in plan if line.startswith("SCAN ")]
+
+
+def run_advisor(baseline: bool = False) -> List[dict]:
+    results = []
+    conns: Dict[tuple, sqlite3.Connection] = {}
+
+    def _conn(key: str, with_pack: bool) -> sqlite3.Connection:
+        if (key, with_pack) not in conns:
+            conns[(key, with_pack)] = build_seeded_db(key, with_pack=with_pack)
+        return conns[(key, with_pack)]
+
+    for name, q in load_catalogue().items():
+        key = q["db"]
+        res = {"name": name, "db": key, "allow_scan": q["allow_scan"], "plan": [], "scans": [], "fixed_by": [], "error": None}
+        try:
+            res["plan"] = explain(_conn(key, True), q["sql"], q["params"])
+            res["scans"] = scan_lines(res["plan"])
+            if baseline:
+                before = explain(_conn(key, False), q["sql"], q["params"])
+                if scan_lines(before):
+                    res["fixed_by"] = sorted({
+                        idx for k, idx, *_ in INDEX_MIGRATIONS
+                        if k == key and any(idx in line for line in res["plan"])
+                    })
+        except sqlite3.Error as e:
+            res["error"] = str(e)
+        results.append(res)
+
+    for c in conns.values():
+        c.close()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN every catalogued query.")
+    parser.add_argument("--check", action="store_true", help="exit 1 on any unexpected SCAN or error")
+    parser.add_argument("--baseline", action="store_true", help="compare against the schema without the index pack")
+    args = parser.parse_args(argv)
+
+    results = run_advisor(baseline=args.baseline)
+
+    failures = 0
+    for r in results:
+        if r["error"]:
+            status = "ERROR"
+            failures += 1
+        elif r["scans"] and not r["allow_scan"]:
+            status = "SCAN"
+            failures += 1
+        elif r["scans"]:
+            status = "ok (scan allowed)"
+        else:
+            status = "ok"
+
+        print(f"[{status}] {r['db']}: {r['name']}")
+        if r["error"]:
+            print(f"    {r['error']}")
+        for line in r["plan"]:
+            print(f"    {line}")
+        if r["allow_scan"] and r["scans"]:
+            print(f"    allowed: {r['allow_scan']}")
+        if r["fixed_by"]:
+            print(f"    recommended: {', '.join(r['fixed_by'])}")
+
+    print(f"\n{len(results)} queries, {failures} problem(s)")
+    if args.check and failures:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    # run the imported module, not __main__: register_query() calls land in db_indexes.QUERY_CATALOGUE
+    import db_indexes
+    sys.exit(db_indexes.main())
@@ -0,0 +1,132 @@
+# json_responses.py
+"""
+Fast JSON for the API.
+
+FastJSONResponse renders with orjson (optional; without it the stdlib encoder
+is used, same output). It is the app's default_response_class. dumps() is
+the same encoder for bodies built by hand (NDJSON streams).
+
+A dict returned from an endpoint still goes through FastAPI's
+jsonable_encoder before it reaches the response class, and for a list of a
+few hundred rows that pass costs more than everything else in the request.
+Row-list endpoints therefore return FastJSONResponse(...) themselves, which
+skips it, and build their rows with row_dicts(): column names are read once
+per result instead of once per row, and Postgres rows (already dicts) pass
+through untouched.
+
+Compression: app.py adds Starlette's GZipMiddleware for JSON bodies of at
+least JSON_GZIP_MIN_SIZE bytes. text/* is excluded, since HTML, CSS and JS
+are precompressed with their own ETags (static_pages / static_assets).
+
+Benchmark:
+  python json_responses.py --bench [rows]
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import sqlite3
+from decimal import Decimal
+from typing import Any, List, Sequence
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson  # optional
+except ImportError:
+    orjson = None
+
+JSON_GZIP_MIN_SIZE = int(os.environ.get("JSON_GZIP_MIN_SIZE", "1024"))
+JSON_GZIP_LEVEL = int(os.environ.get("JSON_GZIP_LEVEL", "6"))
+
+# on top of Starlette's defaults: HTML / CSS / JS carry their own
+# Content-Encoding + ETag per encoding; NDJSON progress streams
+# (/games/api/bulk-add) would sit in the compressor instead of reaching the client
+GZIP_EXCLUDED_CONTENT_TYPES = ("text/*", "application/x-ndjson")
+
+
+def _default(obj: Any):
+    # the few non-JSON types our rows can hold; anything else is a bug
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, sqlite3.Row):
+        return dict(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, same encoder and output as FastJSONResponse."""
+    if orjson is None:
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                          default=_default).encode("utf-8")
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def row_dicts(rows: Sequence) -> List[dict]:
+    """Rows (sqlite3.Row or dict) as dicts, reading the column names once."""
+    if not rows:
+        return []
+    if isinstance(rows[0], dict):
+        return list(rows)
+    columns = rows[0].keys()
+    return [dict(zip(columns, r)) for r in rows]
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+
+def _bench(n_rows: int = 200, rounds: int = 300):
+    from fastapi.encoders import jsonable_encoder
+
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        "CREATE TABLE invoices (id INTEGER PRIMARY KEY, project_id INTEGER, billing_type TEXT, amount REAL, "
+        "currency TEXT, status TEXT, stripe_customer_id TEXT, stripe_invoice_id TEXT, issued_at TEXT, paid_at TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO invoices (project_id, billing_type, amount, currency, status, stripe_customer_id, "
+        "stripe_invoice_id, issued_at, paid_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(i % 17, "one_off", 99.5 + i, "EUR", "issued", f"cus_{i:08d}", f"in_{i:08d}", "2026-01-01 10:00:00", None)
+         for i in range(n_rows)],
+    )
+    rows = conn.execute("SELECT * FROM invoices ORDER BY id DESC").fetchall()
+
+    def before() -> bytes:
+        # dict endpoint: jsonable_encoder + stdlib JSONResponse
+        return JSONResponse(jsonable_encoder({"ok": True, "invoices": [dict(r) for r in rows]})).body
+
+    def after() -> bytes:
+        return FastJSONResponse({"ok": True, "invoices": row_dicts(rows)}).body
+
+    results = {}
+    for name, fn in (("before", before), ("after", after)):
+        body = fn()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        per_call = (time.perf_counter() - started) / rounds
+        results[name] = (per_call, len(body), len(gzip.compress(body, JSON_GZIP_LEVEL)))
+
+    print(f"{n_rows} invoice rows, {rounds} rounds, orjson={'yes' if orjson else 'no'}")
+    for name, (per_call, raw, gz) in results.items():
+        print(f"  {name:<7} encode {per_call * 1e3:7.3f} ms   body {raw:7d} B   gzip {gz:6d} B")
+    b, a = results["before"], results["after"]
+    print(f"  encode {b[0] / a[0]:.1f}x faster; gzip ships {100 * (1 - a[2] / b[1]):.0f}% fewer bytes")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        args = [a for a in sys.argv[1:] if a != "--bench"]
+        _bench(int(args[0]) if args else 200)
+    else:
+        print("usage: python json_responses.py --bench [rows]")
@@ -1,6 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 
+from static_pages import static_page
+
 router = APIRouter()
 
 # Reuse the exact style used on /portal
@@ -245,6 +247,9 @@ SURVEY_HTML = """
       </form>
 
       <script>
+        // one key per page load: a retried submit is recognised server-side and not booked twice
+        const surveyKey = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : String(Date.now()) + Math.random();
+
         async function submitSurvey(event) {
           event.preventDefault();
           const btn = document.getElementById("submitBtn");
@@ -267,7 +272,7 @@ SURVEY_HTML = """
           try {
             const res = await fetch("/survey/submit", {
               method: "POST",
-              headers: { "Content-Type": "application/json" },
+              headers: { "Content-Type": "application/json", "Idempotency-Key": surveyKey },
               body: JSON.stringify(payload)
             });
 
@@ -291,14 +296,18 @@ SURVEY_HTML = """
 </html>
 """
 
+# encoded + compressed once; served with ETag / 304
+LANDING_PAGE = static_page("landing", LANDING_HTML)
+SURVEY_PAGE = static_page("survey", SURVEY_HTML)
+
 @router.get("/", response_class=HTMLResponse)
-def landing_root():
-    return HTMLResponse(LANDING_HTML)
+def landing_root(request: Request):
+    return LANDING_PAGE.response(request)
 
 @router.get("/landing", response_class=HTMLResponse)
-def landing_alias():
-    return HTMLResponse(LANDING_HTML)
+def landing_alias(request: Request):
+    return LANDING_PAGE.response(request)
 
 @router.get("/survey", response_class=HTMLResponse)
-def survey_page():
-    return HTMLResponse(SURVEY_HTML)
+def survey_page(request: Request):
+    return SURVEY_PAGE.response(request)
@@ -0,0 +1,231 @@
+# login_limiter.py
+"""
+Sliding-window limiter for /auth/login and 2FA guesses.
+
+Failed attempts are counted per client IP and per email over
+LOGIN_WINDOW_SECONDS. check() runs before any user lookup or password
+hashing and raises TooManyAttempts (-> 429 + Retry-After) when either key is
+over its limit, or when it is still inside its progressive delay:
+after LOGIN_FREE_FAILURES failures each further attempt has to wait
+LOGIN_DELAY_BASE_SECONDS * 2^(n - free - 1), capped at LOGIN_DELAY_MAX_SECONDS,
+since the last failure. Delays are enforced by rejecting early, not by
+sleeping, so a burst costs neither hashing CPU nor request threads.
+
+A successful login clears the email key (the IP key keeps counting).
+
+LOGIN_LIMIT_STORE:
+  memory   per-process deques (default when WEB_CONCURRENCY is unset or 1)
+  db       auth_failures table in the dreambox db, shared by all workers
+
+Env:
+  LOGIN_WINDOW_SECONDS=900
+  LOGIN_MAX_FAILURES_PER_EMAIL=10
+  LOGIN_MAX_FAILURES_PER_IP=50
+  LOGIN_FREE_FAILURES=3
+  LOGIN_DELAY_BASE_SECONDS=1
+  LOGIN_DELAY_MAX_SECONDS=60
+  LOGIN_TRUST_FORWARDED=0         take the client IP from X-Forwarded-For (behind a proxy)
+"""
+import os
+import time
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+from db_indexes import register_query
+from storage import get_storage
+
+_default_store = "memory" if os.environ.get("WEB_CONCURRENCY", "1").strip() in ("", "1") else "db"
+LOGIN_LIMIT_STORE = os.environ.get("LOGIN_LIMIT_STORE", _default_store).strip().lower()
+LOGIN_WINDOW_SECONDS = float(os.environ.get("LOGIN_WINDOW_SECONDS", "900"))
+LOGIN_MAX_FAILURES_PER_EMAIL = int(os.environ.get("LOGIN_MAX_FAILURES_PER_EMAIL", "10"))
+LOGIN_MAX_FAILURES_PER_IP = int(os.environ.get("LOGIN_MAX_FAILURES_PER_IP", "50"))
+LOGIN_FREE_FAILURES = int(os.environ.get("LOGIN_FREE_FAILURES", "3"))
+LOGIN_DELAY_BASE_SECONDS = float(os.environ.get("LOGIN_DELAY_BASE_SECONDS", "1"))
+LOGIN_DELAY_MAX_SECONDS = float(os.environ.get("LOGIN_DELAY_MAX_SECONDS", "60"))
+LOGIN_TRUST_FORWARDED = os.environ.get("LOGIN_TRUST_FORWARDED", "0").strip() in ("1", "true", "yes")
+LOGIN_SWEEP_SECONDS = 60
+LOGIN_SWEEP_BATCH = 500
+
+
+class TooManyAttempts(Exception):
+    """Too many recent failures for this IP or email; retry after retry_after seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after)
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+def client_ip(request) -> str:
+    if LOGIN_TRUST_FORWARDED:
+        fwd = request.headers.get("x-forwarded-for", "")
+        if fwd.strip():
+            return fwd.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+# ============================================================
+# FAILURE STORES
+# ============================================================
+
+class MemoryFailureStore:
+    def __init__(self):
+        self._items: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._swept_at = 0.0
+
+    def summary(self, key: str, since: float) -> Tuple[int, float]:
+        """(failures after since, time of the last one)."""
+        with self._lock:
+            q = self._items.get(key)
+            if not q:
+                return 0, 0.0
+            while q and q[0] <= since:
+                q.popleft()
+            if not q:
+                del self._items[key]
+                return 0, 0.0
+            return len(q), q[-1]
+
+    def add(self, keys: Iterable[str], ts: float):
+        with self._lock:
+            for key in keys:
+                self._items.setdefault(key, deque()).append(ts)
+            if ts - self._swept_at > LOGIN_SWEEP_SECONDS:
+                self._swept_at = ts
+                cutoff = ts - LOGIN_WINDOW_SECONDS
+                for key in [k for k, q in self._items.items() if q[-1] <= cutoff]:
+                    del self._items[key]
+
+    def clear(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"store": "memory", "tracked_keys": len(self._items)}
+
+
+class DBFailureStore:
+    def __init__(self):
+        self._swept_at = 0.0
+
+    SUMMARY_SQL = register_query(
+        "limiter.summary", "dreambox",
+        "SELECT COUNT(*) AS n, MAX(ts) AS last_ts FROM auth_failures WHERE key = ? AND ts > ?", ("login:ip:x", 1.0),
+    )
+
+    def summary(self, key: str, since: float) -> Tuple[int, float]:
+        with get_storage().connect("dreambox") as db:
+            row = db.execute(self.SUMMARY_SQL, (key, since)).fetchone()
+        return int(row["n"]), float(row["last_ts"] or 0.0)
+
+    def add(self, keys: Iterable[str], ts: float):
+        with get_storage().connect("dreambox") as db:
+            db.executemany("INSERT INTO auth_failures (key, ts) VALUES (?, ?)", [(k, ts) for k in keys])
+        if ts - self._swept_at > LOGIN_SWEEP_SECONDS:
+            self._swept_at = ts
+            self.sweep(ts - LOGIN_WINDOW_SECONDS)
+
+    CLEAR_SQL = register_query(
+        "limiter.clear", "dreambox", "DELETE FROM auth_failures WHERE key = ?", ("login:email:a@b.com",),
+    )
+
+    def clear(self, key: str):
+        with get_storage().connect("dreambox") as db:
+            db.execute(self.CLEAR_SQL, (key,))
+
+    SWEEP_SQL = register_query(
+        "limiter.sweep", "dreambox",
+        "DELETE FROM auth_failures WHERE id IN ("
+        "  SELECT id FROM auth_failures WHERE ts <= ? LIMIT ?"
+        ")",
+        (1.0, 500),
+    )
+
+    def sweep(self, cutoff: float) -> int:
+        """Delete failures older than the window, LOGIN_SWEEP_BATCH rows per statement."""
+        total = 0
+        while True:
+            with get_storage().connect("dreambox") as db:
+                n = db.execute(self.SWEEP_SQL, (cutoff, LOGIN_SWEEP_BATCH)).rowcount
+            total += max(n, 0)
+            if n < LOGIN_SWEEP_BATCH:
+                return total
+
+    def stats(self) -> dict:
+        with get_storage().connect("dreambox") as db:
+            row = db.execute("SELECT COUNT(*) AS n FROM auth_failures").fetchone()
+        return {"store": "db", "failures_in_table": int(row["n"])}
+
+
+# ============================================================
+# LIMITER
+# ============================================================
+
+def _delay_after(failures: int) -> float:
+    extra = failures - LOGIN_FREE_FAILURES
+    if extra <= 0:
+        return 0.0
+    return min(LOGIN_DELAY_MAX_SECONDS, LOGIN_DELAY_BASE_SECONDS * (2 ** (extra - 1)))
+
+
+class AttemptLimiter:
+    def __init__(self, scope: str, store):
+        self.scope = scope  # "login" / "2fa": each has its own counters
+        self.store = store
+        self.allowed = 0
+        self.rejected = 0
+        self.failures = 0
+
+    def _keys(self, ip: str, email: Optional[str]):
+        keys = [(f"{self.scope}:ip:{ip}", LOGIN_MAX_FAILURES_PER_IP)]
+        if email:
+            keys.append((f"{self.scope}:email:{email.strip().lower()}", LOGIN_MAX_FAILURES_PER_EMAIL))
+        return keys
+
+    def check(self, ip: str, email: Optional[str]):
+        """Raise TooManyAttempts if this IP or email must wait; cheap, no hashing."""
+        now = time.time()
+        since = now - LOGIN_WINDOW_SECONDS
+        wait = 0.0
+        for key, limit in self._keys(ip, email):
+            n, last = self.store.summary(key, since)
+            if n >= limit:
+                # the window slides: the oldest counted failure ages out by last + window at the latest
+                wait = max(wait, last + LOGIN_WINDOW_SECONDS - now)
+            else:
+                wait = max(wait, last + _delay_after(n) - now)
+        if wait > 0:
+            self.rejected += 1
+            raise TooManyAttempts(wait)
+        self.allowed += 1
+
+    def failed(self, ip: str, email: Optional[str]):
+        self.failures += 1
+        self.store.add([key for key, _ in self._keys(ip, email)], time.time())
+
+    def succeeded(self, email: str):
+        self.store.clear(f"{self.scope}:email:{email.strip().lower()}")
+
+    def stats(self) -> dict:
+        return {"allowed": self.allowed, "rejected": self.rejected, "failures": self.failures}
+
+
+if LOGIN_LIMIT_STORE == "db":
+    _store = DBFailureStore()
+elif LOGIN_LIMIT_STORE == "memory":
+    _store = MemoryFailureStore()
+else:
+    raise RuntimeError(f"Unknown LOGIN_LIMIT_STORE: {LOGIN_LIMIT_STORE}")
+
+login_limiter = AttemptLimiter("login", _store)
+twofa_limiter = AttemptLimiter("2fa", _store)
+
+
+def stats() -> dict:
+    return {
+        **_store.stats(),
+        "window_seconds": LOGIN_WINDOW_SECONDS,
+        "login": login_limiter.stats(),
+        "2fa": twofa_limiter.stats(),
+    }
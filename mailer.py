@@ -0,0 +1,384 @@
+# mailer.py
+"""
+Outbound email via a persisted outbox.
+
+Request handlers call enqueue_email(); the row is committed to email_outbox
+(dreambox db) and a background thread in each app worker drains it:
+  - claims up to OUTBOX_BATCH due rows (safe with several workers)
+  - opens ONE SMTP session (connect, STARTTLS, login) for the whole batch
+  - failed rows are retried with exponential backoff, then marked 'failed'
+    (a batch whose lease expires, e.g. the worker died, counts as a failed attempt)
+  - sent rows drop their body (2FA codes / reset links) and are purged later
+
+MAIL_BACKEND:
+  smtp      send through SMTP_HOST:SMTP_PORT (default when SMTP_USER/PASSWORD are set)
+  console   print the email to stdout instead (default otherwise, same as before)
+
+Local testing without a real mail server:
+  python mailer.py --standin --port 8025
+  MAIL_BACKEND=smtp SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=0 uvicorn app:app
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import smtplib
+import argparse
+import threading
+import socketserver
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import List, Optional
+
+from db_indexes import register_query
+from storage import get_storage
+
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.ionos.co.uk")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+SMTP_USER = os.environ.get("SMTP_USER", "")
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD", "")
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", "20"))
+
+MAIL_BACKEND = os.environ.get(
+    "MAIL_BACKEND", "smtp" if (SMTP_USER and SMTP_PASSWORD) else "console"
+).strip().lower()
+
+SENDER_NAME = "Dreambox Interactive"
+SENDER_EMAIL = "no-reply@dreamboxinteractive.com"
+
+OUTBOX_BATCH = int(os.environ.get("OUTBOX_BATCH", "50"))
+OUTBOX_POLL_SECONDS = float(os.environ.get("OUTBOX_POLL_SECONDS", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE_SECONDS = float(os.environ.get("OUTBOX_RETRY_BASE_SECONDS", "10"))
+OUTBOX_RETRY_MAX_SECONDS = float(os.environ.get("OUTBOX_RETRY_MAX_SECONDS", "1800"))
+OUTBOX_KEEP_DAYS = int(os.environ.get("OUTBOX_KEEP_DAYS", "7"))
+# a claimed batch that is not finished by then (worker died) becomes due again
+OUTBOX_LEASE_SECONDS = 300
+
+
+# ============================================================
+# QUEUE
+# ============================================================
+
+def enqueue_email(to_email: str, subject: str, body: str, db=None) -> int:
+    """
+    Persist an email for the background sender. Returns the outbox id.
+
+    With db the row is written in the caller's transaction, so the email only
+    exists if that transaction commits; the caller wakes the worker afterwards.
+    """
+    if db is None:
+        with get_storage().connect("dreambox") as db:
+            outbox_id = enqueue_email(to_email, subject, body, db)
+        worker.wake()
+        return outbox_id
+    return db.insert(
+        "INSERT INTO email_outbox (to_email, subject, body, status, attempts, next_attempt_at, created_at) "
+        "VALUES (?, ?, ?, 'pending', 0, ?, ?)",
+        (to_email, subject, body, time.time(), datetime.utcnow().isoformat()),
+    )
+
+
+OUTBOX_DEPTH_SQL = register_query(
+    "mail.outbox_depth", "dreambox",
+    "SELECT status, COUNT(*) AS n FROM email_outbox GROUP BY status", (),
+    allow_scan="walks idx_email_outbox_due; one row per status comes back",
+)
+
+
+def outbox_stats() -> dict:
+    store = get_storage()
+    with store.connect("dreambox") as db:
+        rows = db.execute(OUTBOX_DEPTH_SQL).fetchall()
+        oldest = db.execute(
+            "SELECT MIN(created_at) AS oldest FROM email_outbox WHERE status IN ('pending', 'sending')"
+        ).fetchone()
+    counts = {r["status"]: int(r["n"]) for r in rows}
+    return {
+        "backend": MAIL_BACKEND,
+        "depth": counts.get("pending", 0) + counts.get("sending", 0),
+        "by_status": counts,
+        "oldest_unsent_at": oldest["oldest"] if oldest else None,
+        "worker_running": worker.is_alive(),
+    }
+
+
+# status/next_attempt_at are re-checked in the outer WHERE so two workers
+# racing for the same ids can't both win. A row still 'sending' here had its
+# lease expire (the worker died mid-batch), which counts as an attempt.
+CLAIM_BATCH_SQL = register_query(
+    "mail.claim_batch", "dreambox",
+    "UPDATE email_outbox SET status = 'sending', claim_token = ?, next_attempt_at = ?, "
+    "attempts = attempts + CASE WHEN status = 'sending' THEN 1 ELSE 0 END "
+    "WHERE status IN ('pending', 'sending') AND next_attempt_at <= ? AND id IN ("
+    "  SELECT id FROM email_outbox WHERE status IN ('pending', 'sending') AND next_attempt_at <= ? "
+    "  ORDER BY next_attempt_at LIMIT ?"
+    ")",
+    ("c", 1.0, 1.0, 1.0, 50),
+)
+FAIL_EXHAUSTED_SQL = register_query(
+    "mail.fail_exhausted_claims", "dreambox",
+    "UPDATE email_outbox SET status = 'failed', claim_token = NULL, last_error = ? "
+    "WHERE claim_token = ? AND attempts >= ?",
+    ("e", "c", 8),
+)
+CLAIMED_ROWS_SQL = register_query(
+    "mail.claimed_rows", "dreambox",
+    "SELECT id, to_email, subject, body, attempts FROM email_outbox WHERE claim_token = ? ORDER BY id",
+    ("c",),
+)
+
+
+def _claim_batch(limit: int) -> List[dict]:
+    store = get_storage()
+    claim = uuid.uuid4().hex
+    now = time.time()
+    with store.connect("dreambox") as db:
+        db.execute(CLAIM_BATCH_SQL, (claim, now + OUTBOX_LEASE_SECONDS, now, now, limit))
+        # rows whose leases kept expiring are given up on rather than sent again
+        db.execute(FAIL_EXHAUSTED_SQL, ("lease expired while sending", claim, OUTBOX_MAX_ATTEMPTS))
+        rows = db.execute(CLAIMED_ROWS_SQL, (claim,)).fetchall()
+    return [dict(r) for r in rows]
+
+
+def _backoff(attempts: int) -> float:
+    delay = min(OUTBOX_RETRY_MAX_SECONDS, OUTBOX_RETRY_BASE_SECONDS * (2 ** attempts))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _finish(sent_ids: List[int], failures: List[tuple]):
+    """failures: (row, error text)."""
+    store = get_storage()
+    now = time.time()
+    sent_at = datetime.utcnow().isoformat()
+    with store.connect("dreambox") as db:
+        if sent_ids:
+            db.executemany(
+                "UPDATE email_outbox SET status = 'sent', body = '', sent_at = ?, claim_token = NULL, last_error = NULL "
+                "WHERE id = ?",
+                [(sent_at, i) for i in sent_ids],
+            )
+        if failures:
+            params = []
+            for row, err in failures:
+                attempts = int(row["attempts"]) + 1
+                status = "failed" if attempts >= OUTBOX_MAX_ATTEMPTS else "pending"
+                params.append((status, attempts, now + _backoff(attempts - 1), err[:500], row["id"]))
+            db.executemany(
+                "UPDATE email_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, "
+                "claim_token = NULL WHERE id = ?",
+                params,
+            )
+    for row, err in failures:
+        print(f"[MAIL] outbox #{row['id']} to {row['to_email']} failed (attempt {int(row['attempts']) + 1}): {err}")
+
+
+def _build_message(row: dict) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = row["subject"]
+    msg["From"] = formataddr((SENDER_NAME, SENDER_EMAIL))
+    msg["To"] = row["to_email"]
+    msg.set_content(row["body"])
+    return msg
+
+
+def _print_email(row: dict):
+    print("\n--- EMAIL (SMTP NOT CONFIGURED) ---")
+    print("From:", formataddr((SENDER_NAME, SENDER_EMAIL)))
+    print("To:", row["to_email"])
+    print("Subject:", row["subject"])
+    print(row["body"])
+    print("--- END EMAIL ---\n")
+
+
+def _open_smtp() -> smtplib.SMTP:
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    server.ehlo()
+    if SMTP_STARTTLS:
+        server.starttls()
+        server.ehlo()
+    if SMTP_USER:
+        server.login(SMTP_USER, SMTP_PASSWORD)
+    return server
+
+
+def _send_batch(rows: List[dict]):
+    if MAIL_BACKEND == "console":
+        for row in rows:
+            _print_email(row)
+        _finish([r["id"] for r in rows], [])
+        return
+
+    try:
+        server = _open_smtp()
+    except Exception as e:
+        _finish([], [(r, f"connect: {e!r}") for r in rows])
+        return
+
+    sent, failures = [], []
+    try:
+        for i, row in enumerate(rows):
+            try:
+                server.send_message(_build_message(row))
+                sent.append(row["id"])
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                # session is gone; everything not yet sent goes back to the queue
+                failures.extend((r, f"disconnected: {e!r}") for r in rows[i:])
+                break
+            except smtplib.SMTPException as e:
+                failures.append((row, repr(e)))
+    finally:
+        try:
+            server.quit()
+        except Exception:
+            pass
+        _finish(sent, failures)
+
+
+def drain_once(limit: int = OUTBOX_BATCH) -> int:
+    """Send one batch of due emails. Returns how many rows were claimed."""
+    rows = _claim_batch(limit)
+    if rows:
+        _send_batch(rows)
+    return len(rows)
+
+
+PURGE_SENT_SQL = register_query(
+    "mail.purge_sent", "dreambox",
+    "DELETE FROM email_outbox WHERE status = 'sent' AND sent_at < ?", ("2000-01-01",),
+)
+
+
+def purge_sent(keep_days: int = OUTBOX_KEEP_DAYS) -> int:
+    cutoff = (datetime.utcnow() - timedelta(days=keep_days)).isoformat()
+    store = get_storage()
+    with store.connect("dreambox") as db:
+        return db.execute(PURGE_SENT_SQL, (cutoff,)).rowcount
+
+
+# ============================================================
+# WORKER
+# ============================================================
+
+class OutboxWorker:
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._last_purge = 0.0
+
+    def start(self):
+        if self.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def wake(self):
+        self._wake.set()
+
+    def is_alive(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _run(self):
+        print(f"[MAIL] outbox worker started ({MAIL_BACKEND})")
+        while not self._stop.is_set():
+            claimed = 0
+            try:
+                claimed = drain_once()
+                if time.monotonic() - self._last_purge > 3600:
+                    self._last_purge = time.monotonic()
+                    purge_sent()
+            except Exception as e:
+                print("[MAIL] outbox worker error:", repr(e))
+            if claimed < OUTBOX_BATCH:
+                self._wake.wait(OUTBOX_POLL_SECONDS)
+                self._wake.clear()
+
+
+worker = OutboxWorker()
+
+
+# ============================================================
+# LOCAL SMTP STAND-IN (python mailer.py --standin)
+# ============================================================
+
+class _StandinHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib without STARTTLS/AUTH. Prints each message."""
+
+    def _reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode("utf-8"))
+
+    def handle(self):
+        self._reply("220 dreambox-standin ESMTP")
+        rcpts: List[str] = []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            cmd = raw.decode("utf-8", "replace").strip()
+            verb = cmd.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self._reply("250-dreambox-standin")
+                self._reply("250 8BITMIME")
+            elif verb == "HELO":
+                self._reply("250 dreambox-standin")
+            elif verb == "MAIL":
+                rcpts = []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                rcpts.append(cmd.split(":", 1)[-1].strip())
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    line = self.rfile.readline().decode("utf-8", "replace")
+                    if line in (".\r\n", ".\n", ""):
+                        break
+                    lines.append(line[1:] if line.startswith("..") else line)
+                self.server.received.append({"to": rcpts, "data": "".join(lines)})
+                print(f"--- standin received for {', '.join(rcpts)} ---\n{''.join(lines)}--- end ---")
+                self._reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class SMTPStandin(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8025):
+        super().__init__((host, port), _StandinHandler)
+        self.received: List[dict] = []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Email outbox tools")
+    parser.add_argument("--standin", action="store_true", help="run a local SMTP stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--drain", action="store_true", help="send one batch of due emails and exit")
+    args = parser.parse_args()
+    if args.standin:
+        print(f"SMTP stand-in on {args.host}:{args.port}")
+        SMTPStandin(args.host, args.port).serve_forever()
+    elif args.drain:
+        print(f"claimed {drain_once()}")
+    else:
+        parser.print_help()
+        sys.exit(0)
@@ -0,0 +1,191 @@
+# metadata_refresher.py
+"""
+Keeps Roblox metadata for every tracked universe current.
+
+A pass walks the tracked universes (store.games.tracked_universe_ids()) in
+batches of REFRESH_BATCH ids. Per batch it makes:
+  - one games.roblox.com/v1/games call (name, description, creator)
+  - one thumbnails.roblox.com/v1/games/icons call (icon URL)
+  - one read of the stored metadata (universe_meta_cache) to compare against
+  - one read of the games rows, for names shown on the games pages
+
+and writes only what differs: the metadata rows that changed (with
+changed_at stamped) and the games rows still showing an old name. A pass
+therefore costs two HTTP calls and a few queries per batch, and an
+unchanged catalogue writes nothing.
+
+Rate limits: calls are at least REFRESH_MIN_INTERVAL seconds apart. A 429
+or 5xx waits for Retry-After (or 2^attempt seconds, capped at
+REFRESH_BACKOFF_MAX) and is retried up to REFRESH_MAX_RETRIES times. After
+that the batch is skipped until the next pass. If only the thumbnail call
+fails, the stored thumbnail is kept.
+
+  python metadata_refresher.py          # every REFRESH_INTERVAL_SECONDS (run_all.sh)
+  python metadata_refresher.py --once   # one pass, then exit
+"""
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from roblox_api import GAMES_URL, ROBLOX_HTTP_TIMEOUT
+from storage import get_storage
+
+REFRESH_INTERVAL_SECONDS = float(os.environ.get("REFRESH_INTERVAL_SECONDS", "21600"))  # 6 hours
+REFRESH_BATCH = int(os.environ.get("REFRESH_BATCH", "50"))
+REFRESH_MIN_INTERVAL = float(os.environ.get("REFRESH_MIN_INTERVAL", "1"))
+REFRESH_MAX_RETRIES = int(os.environ.get("REFRESH_MAX_RETRIES", "4"))
+REFRESH_BACKOFF_MAX = float(os.environ.get("REFRESH_BACKOFF_MAX", "120"))
+
+ICONS_URL = "https://thumbnails.roblox.com/v1/games/icons"
+
+store = get_storage()
+FIELDS = store.roblox_cache.METADATA_FIELDS
+
+
+# ============================================================
+# HTTP (spaced calls + backoff)
+# ============================================================
+
+class RobloxClient:
+    def __init__(self, min_interval: float = REFRESH_MIN_INTERVAL, max_retries: int = REFRESH_MAX_RETRIES):
+        self.session = requests.Session()
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self._next_call = 0.0
+        self.calls = 0
+        self.throttled = 0
+
+    def _delay(self, r: Optional[requests.Response], attempt: int) -> float:
+        retry_after = r.headers.get("Retry-After", "") if r is not None else ""
+        delay = float(retry_after) if retry_after.isdigit() else 2.0 ** attempt
+        return min(max(delay, self.min_interval), REFRESH_BACKOFF_MAX)
+
+    def get_json(self, url: str, params: dict) -> Optional[dict]:
+        for attempt in range(self.max_retries + 1):
+            wait = self._next_call - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._next_call = time.monotonic() + self.min_interval
+            self.calls += 1
+
+            try:
+                r = self.session.get(url, params=params, timeout=ROBLOX_HTTP_TIMEOUT)
+            except requests.RequestException as e:
+                r, error = None, str(e)
+            else:
+                if r.status_code != 429 and r.status_code < 500:
+                    if not r.ok:
+                        print(f"[REFRESH] {url} -> HTTP {r.status_code}")
+                        return None
+                    return r.json()
+                self.throttled += r.status_code == 429
+                error = f"HTTP {r.status_code}"
+
+            # the wait also spaces whatever call comes next
+            delay = self._delay(r, attempt)
+            self._next_call = time.monotonic() + delay
+            if attempt < self.max_retries:
+                print(f"[REFRESH] {url} -> {error}, retrying in {delay:.0f}s")
+        print(f"[REFRESH] {url} failed after {self.max_retries + 1} attempts")
+        return None
+
+
+# ============================================================
+# REFRESH
+# ============================================================
+
+def fetch_metadata(client: RobloxClient, universe_ids: List[int]) -> Dict[int, dict]:
+    """universe_id -> fields from Roblox; thumbnail_url is absent if the icon call failed."""
+    ids = ",".join(str(u) for u in universe_ids)
+    games = client.get_json(GAMES_URL, {"universeIds": ids})
+    if games is None:
+        return {}
+    icons = client.get_json(ICONS_URL, {"universeIds": ids, "size": "512x512", "format": "Png", "isCircular": "false"})
+    thumbs = {
+        int(i["targetId"]): i.get("imageUrl")
+        for i in (icons or {}).get("data") or []
+        if i.get("state") == "Completed"
+    }
+
+    out = {}
+    for g in games.get("data") or []:
+        uid = int(g["id"])
+        creator = g.get("creator") or {}
+        meta = {
+            "name": (g.get("name") or "").strip() or None,
+            "description": g.get("description") or None,
+            "creator_id": creator.get("id"),
+            "creator_name": creator.get("name"),
+            "creator_type": creator.get("type"),
+        }
+        if icons is not None:
+            meta["thumbnail_url"] = thumbs.get(uid)
+        out[uid] = meta
+    return out
+
+
+def refresh_batch(client: RobloxClient, universe_ids: List[int]) -> Tuple[int, int]:
+    """Returns (metadata rows changed, games rows renamed)."""
+    fetched = fetch_metadata(client, universe_ids)
+    if not fetched:
+        return 0, 0
+
+    stored = store.roblox_cache.get_metadata(list(fetched))
+    changed = {}
+    for uid, meta in fetched.items():
+        old = stored.get(uid)
+        new = {c: meta.get(c, old.get(c) if old else None) for c in FIELDS}
+        if old is None or any(old.get(c) != new[c] for c in FIELDS):
+            changed[uid] = new
+    store.roblox_cache.save_metadata(changed)
+
+    # every fetched name, not only changed ones: a game added while Roblox was down has none yet
+    renamed = store.games.sync_names({uid: m["name"] for uid, m in fetched.items() if m["name"]})
+    return len(changed), renamed
+
+
+def refresh_all(client: RobloxClient) -> dict:
+    started = time.monotonic()
+    calls_before = client.calls
+    universe_ids = store.games.tracked_universe_ids()
+    totals = {"universes": len(universe_ids), "batches": 0, "changed": 0, "renamed": 0}
+
+    for i in range(0, len(universe_ids), REFRESH_BATCH):
+        try:
+            changed, renamed = refresh_batch(client, universe_ids[i:i + REFRESH_BATCH])
+        except Exception as e:
+            # one bad batch must not end the pass
+            print(f"[REFRESH] batch at offset {i} failed: {e}")
+            continue
+        totals["batches"] += 1
+        totals["changed"] += changed
+        totals["renamed"] += renamed
+
+    totals["calls"] = client.calls - calls_before
+    print(
+        f"[REFRESH] {totals['universes']} universes in {totals['batches']} batches: "
+        f"{totals['changed']} changed, {totals['renamed']} game rows renamed, "
+        f"{totals['calls']} calls, {time.monotonic() - started:.1f}s"
+    )
+    return totals
+
+
+def main():
+    client = RobloxClient()
+    if "--once" in sys.argv:
+        refresh_all(client)
+        return
+    print("Starting metadata refresher loop...")
+    while True:
+        try:
+            refresh_all(client)
+        except Exception as e:
+            print("[REFRESH] pass failed:", e)
+        time.sleep(REFRESH_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
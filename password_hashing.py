@@ -0,0 +1,268 @@
+# password_hashing.py
+"""
+Password hashing / verification off the request threads.
+
+pbkdf2 (and the legacy bcrypt path) run in a dedicated process pool so a
+login burst doesn't hold the GIL for every other request. Jobs are admitted
+through a bounded semaphore: when the pool plus its queue is full for longer
+than PASSWORD_HASH_WAIT_SECONDS, HashingBusy is raised and the caller answers
+503 instead of piling up threads.
+
+Env:
+  PASSWORD_HASH_WORKERS            pool size, default min(4, cpus) (0 = hash inline, no pool)
+  PASSWORD_HASH_QUEUE              jobs allowed to wait on top of the running ones (default 4x workers)
+  PASSWORD_HASH_WAIT_SECONDS=1.0   how long a request waits for a slot before shedding
+  PBKDF2_ROUNDS=29000              pbkdf2_sha256 work factor for new hashes
+
+Accounts created without a password (survey sign-ups) store
+make_unusable_password(): it never verifies and is rejected without touching
+the pool.
+
+Existing hashes keep verifying whatever their rounds; only new hashes use
+PBKDF2_ROUNDS. To pick it:
+
+  python password_hashing.py --bench --rate 20 --target-p99-ms 250
+"""
+import os
+import sys
+import time
+import random
+import secrets
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+from passlib.context import CryptContext
+
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 2))))
+PASSWORD_HASH_QUEUE = int(os.environ.get("PASSWORD_HASH_QUEUE", str(PASSWORD_HASH_WORKERS * 4)))
+PASSWORD_HASH_WAIT_SECONDS = float(os.environ.get("PASSWORD_HASH_WAIT_SECONDS", "1.0"))
+PBKDF2_ROUNDS = int(os.environ.get("PBKDF2_ROUNDS", "29000"))
+
+UNUSABLE_PASSWORD_PREFIX = "!"
+
+
+class HashingBusy(Exception):
+    """The hashing pool is saturated; retry later."""
+
+
+def make_unusable_password() -> str:
+    """A password_hash value no password matches (not a valid pbkdf2/bcrypt hash)."""
+    return UNUSABLE_PASSWORD_PREFIX + secrets.token_hex(8)
+
+
+def is_usable_password(hashed: str) -> bool:
+    return bool(hashed) and not hashed.startswith(UNUSABLE_PASSWORD_PREFIX)
+
+
+# ============================================================
+# WORK (runs inside the pool processes)
+# ============================================================
+
+_contexts = {}
+
+
+def _context(rounds: int) -> CryptContext:
+    ctx = _contexts.get(rounds)
+    if ctx is None:
+        ctx = _contexts[rounds] = CryptContext(
+            schemes=["pbkdf2_sha256"],
+            deprecated="auto",
+            pbkdf2_sha256__default_rounds=rounds,
+        )
+    return ctx
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify(plain: str, hashed: str) -> bool:
+    if hashed.startswith("$2a$") or hashed.startswith("$2b$") or hashed.startswith("$2y$"):
+        try:
+            import bcrypt
+            return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+        except Exception:
+            return False
+    try:
+        return _context(PBKDF2_ROUNDS).verify(plain, hashed)
+    except (ValueError, TypeError):
+        # unknown / malformed hash
+        return False
+
+
+def _noop() -> int:
+    return os.getpid()
+
+
+# ============================================================
+# POOL
+# ============================================================
+
+class HashPool:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue: int = PASSWORD_HASH_QUEUE,
+                 wait_seconds: float = PASSWORD_HASH_WAIT_SECONDS):
+        self.workers = workers
+        self.wait_seconds = wait_seconds
+        self._slots = threading.BoundedSemaphore(max(1, workers + queue))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.shed = 0
+        self.completed = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # fork where we can: spawn would re-run __main__ in every worker.
+                # warm_up() forks them at startup, before the request threads exist.
+                method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(method),
+                )
+            return self._executor
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.wait_seconds):
+            self.shed += 1
+            raise HashingBusy()
+        try:
+            try:
+                result = self._get_executor().submit(fn, *args).result()
+            except BrokenProcessPool:
+                # a worker died (OOM kill etc); start a fresh pool and retry once
+                with self._lock:
+                    self._executor = None
+                result = self._get_executor().submit(fn, *args).result()
+            self.completed += 1
+            return result
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str, rounds: int = PBKDF2_ROUNDS) -> str:
+        return self._run(_hash, password, rounds)
+
+    def verify(self, plain: str, hashed: str) -> bool:
+        if not is_usable_password(hashed):
+            return False
+        return self._run(_verify, plain, hashed)
+
+    def warm_up(self):
+        """Start the worker processes now instead of on the first login."""
+        if self.workers <= 0:
+            return
+        ex = self._get_executor()
+        for f in [ex.submit(_noop) for _ in range(self.workers)]:
+            f.result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pbkdf2_rounds": PBKDF2_ROUNDS,
+            "completed": self.completed,
+            "shed": self.shed,
+        }
+
+
+pool = HashPool()
+
+
+# ============================================================
+# BENCHMARK (python password_hashing.py --bench)
+# ============================================================
+
+def _percentile(values: List[float], pct: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, max(0, int(round(pct / 100.0 * len(s))) - 1))]
+
+
+def _load_test(hp: HashPool, stored: str, rate: float, seconds: float) -> dict:
+    """Fire verify() calls at `rate` per second (Poisson arrivals) and time each one end to end."""
+    latencies: List[float] = []
+    shed = [0]
+    lock = threading.Lock()
+    threads = []
+
+    def one():
+        t0 = time.perf_counter()
+        try:
+            hp.verify("correct horse battery staple", stored)
+        except HashingBusy:
+            with lock:
+                shed[0] += 1
+            return
+        with lock:
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        t = threading.Thread(target=one)
+        t.start()
+        threads.append(t)
+        time.sleep(random.expovariate(rate))
+    for t in threads:
+        t.join()
+
+    return {
+        "requests": len(threads),
+        "shed": shed[0],
+        "p50_ms": _percentile(latencies, 50) if latencies else 0.0,
+        "p99_ms": _percentile(latencies, 99) if latencies else 0.0,
+    }
+
+
+def bench(rate: float, target_p99_ms: float, seconds: float, candidates: List[int]) -> Optional[int]:
+    hp = HashPool()
+    hp.warm_up()
+    print(f"workers={hp.workers} queue={PASSWORD_HASH_QUEUE} rate={rate}/s target p99={target_p99_ms}ms")
+    print(f"{'rounds':>8} {'1 hash ms':>10} {'p50 ms':>8} {'p99 ms':>8} {'shed':>5}")
+
+    best = None
+    try:
+        for rounds in candidates:
+            stored = hp.hash("correct horse battery staple", rounds)
+            t0 = time.perf_counter()
+            hp.verify("correct horse battery staple", stored)
+            single = (time.perf_counter() - t0) * 1000.0
+
+            r = _load_test(hp, stored, rate, seconds)
+            ok = r["p99_ms"] <= target_p99_ms and r["shed"] == 0
+            print(f"{rounds:>8} {single:>10.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['shed']:>5}  {'ok' if ok else '--'}")
+            if ok:
+                best = rounds
+            else:
+                break
+    finally:
+        hp.shutdown()
+
+    if best is None:
+        print("No candidate met the target; add workers or lower the rate/target.")
+    else:
+        print(f"Recommended: PBKDF2_ROUNDS={best}")
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick a pbkdf2 work factor for the login rate you need.")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--rate", type=float, default=20.0, help="peak logins per second")
+    parser.add_argument("--target-p99-ms", type=float, default=250.0)
+    parser.add_argument("--seconds", type=float, default=5.0, help="load duration per candidate")
+    parser.add_argument("--rounds", type=int, nargs="*",
+                        default=[10000, 29000, 60000, 100000, 200000, 400000, 600000])
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+        sys.exit(0)
+    bench(args.rate, args.target_p99_ms, args.seconds, sorted(args.rounds))
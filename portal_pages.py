@@ -1,6 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 
+from static_pages import static_page
+
 router = APIRouter()
 
 PORTAL_HTML = """
@@ -506,10 +508,14 @@ FORGOT_HTML = """
 </html>
 """
 
+# encoded + compressed once; served with ETag / 304
+PORTAL_PAGE = static_page("portal", PORTAL_HTML)
+FORGOT_PAGE = static_page("forgot-password", FORGOT_HTML)
+
 @router.get("/portal", response_class=HTMLResponse)
-def portal_page():
-  return HTMLResponse(content=PORTAL_HTML)
+def portal_page(request: Request):
+  return PORTAL_PAGE.response(request)
 
 @router.get("/forgot-password", response_class=HTMLResponse)
-def forgot_password_page():
-  return HTMLResponse(content=FORGOT_HTML)
+def forgot_password_page(request: Request):
+  return FORGOT_PAGE.response(request)
@@ -0,0 +1,259 @@
+# query_stats.py
+"""
+Per-query timing for the storage sessions.
+
+Every statement that goes through storage.SQLiteSession / PostgresSession.execute
+is recorded under a name:
+  - the db_indexes.QUERY_CATALOGUE name when the SQL matches a catalogued query
+  - otherwise the normalised SQL, cut to 80 chars
+
+For each name we keep call count, total ms, rows returned and a window of the
+most recent durations for p50/p95/p99. A statement is timed when execute()
+returns, so SELECTs whose rows are never fetched still count; rows are added
+as they are fetched. Anything slower than SLOW_QUERY_MS goes to the slow-query
+log (stdout + in-memory ring, optionally a JSONL file) with its EXPLAIN /
+EXPLAIN QUERY PLAN output, cached per query name for PLAN_TTL_SECONDS.
+
+Env:
+  SLOW_QUERY_MS=200            threshold for the slow log (0 disables it)
+  SLOW_QUERY_LOG=/path.jsonl   also append slow entries to this file
+  QUERY_STATS_WINDOW=1024      durations kept per query for percentiles
+
+Stats are per process; /admin/api/health shows the worker that answered.
+"""
+import os
+import re
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+from cache import TTLCache
+from db_indexes import QUERY_CATALOGUE
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.environ.get("SLOW_QUERY_LOG", "").strip()
+QUERY_STATS_WINDOW = int(os.environ.get("QUERY_STATS_WINDOW", "1024"))
+SLOW_RING_SIZE = 100
+# the same query name is only re-EXPLAINed this often
+PLAN_TTL_SECONDS = 300
+PLAN_CACHE_SIZE = 256
+
+_WS = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\?(?:\s*,\s*\?)+\)")
+
+
+def _normalise(sql: str) -> str:
+    # "IN (?, ?, ?)" of any length counts as one statement
+    return _IN_LIST.sub("(?...)", _WS.sub(" ", sql).strip().rstrip(";").strip())
+
+
+# normalised SQL -> catalogue name. Modules register their queries when they
+# are imported (after this one), so the map is rebuilt when the catalogue grows.
+_CATALOGUE_NAMES: Dict[str, str] = {}
+_catalogue_size = -1
+_LABELS: Dict[str, str] = {}
+
+
+def _catalogue_name(norm: str) -> Optional[str]:
+    global _CATALOGUE_NAMES, _catalogue_size
+    if _catalogue_size != len(QUERY_CATALOGUE):
+        _catalogue_size = len(QUERY_CATALOGUE)
+        _CATALOGUE_NAMES = {_normalise(q["sql"]): name for name, q in list(QUERY_CATALOGUE.items())}
+    return _CATALOGUE_NAMES.get(norm)
+
+
+def query_name(sql: str) -> str:
+    """Catalogue name for sql, or a short label built from the statement."""
+    label = _LABELS.get(sql)
+    if label is None:
+        norm = _normalise(sql)
+        label = _catalogue_name(norm) or ("sql: " + (norm[:80] + "..." if len(norm) > 80 else norm))
+        if len(_LABELS) < 2048:
+            _LABELS[sql] = label
+    return label
+
+
+# ============================================================
+# STATS
+# ============================================================
+
+class _QueryStat:
+    __slots__ = ("calls", "total_ms", "max_ms", "rows", "slow", "window")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.slow = 0
+        self.window: Deque[float] = deque(maxlen=QUERY_STATS_WINDOW)
+
+
+_lock = threading.Lock()
+_stats: Dict[str, _QueryStat] = {}
+_slow: Deque[dict] = deque(maxlen=SLOW_RING_SIZE)
+_plans = TTLCache(PLAN_CACHE_SIZE, PLAN_TTL_SECONDS)  # query name -> plan lines
+_started_at = datetime.utcnow().isoformat()
+
+
+def record(name: str, ms: float, rows: int) -> bool:
+    """Add one execution. Returns True if it crossed the slow threshold."""
+    is_slow = SLOW_QUERY_MS > 0 and ms >= SLOW_QUERY_MS
+    with _lock:
+        st = _stats.get(name)
+        if st is None:
+            st = _stats[name] = _QueryStat()
+        st.calls += 1
+        st.total_ms += ms
+        st.rows += max(rows, 0)
+        st.window.append(ms)
+        if ms > st.max_ms:
+            st.max_ms = ms
+        if is_slow:
+            st.slow += 1
+    return is_slow
+
+
+def record_rows(name: str, rows: int):
+    """Add rows fetched after the execution was recorded."""
+    if rows <= 0:
+        return
+    with _lock:
+        st = _stats.get(name)
+        if st is not None:
+            st.rows += rows
+
+
+def _percentile(sorted_ms: List[float], pct: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    k = min(len(sorted_ms) - 1, max(0, int(round(pct / 100.0 * len(sorted_ms))) - 1))
+    return sorted_ms[k]
+
+
+def snapshot() -> dict:
+    """Stats for every query seen so far, slowest total first."""
+    with _lock:
+        items = [(name, st.calls, st.total_ms, st.max_ms, st.rows, st.slow, sorted(st.window))
+                 for name, st in _stats.items()]
+        slow = list(_slow)
+
+    queries = []
+    for name, calls, total_ms, max_ms, rows, slow_n, window in items:
+        queries.append({
+            "name": name,
+            "calls": calls,
+            "total_ms": round(total_ms, 3),
+            "avg_ms": round(total_ms / calls, 3) if calls else 0.0,
+            "p50_ms": round(_percentile(window, 50), 3),
+            "p95_ms": round(_percentile(window, 95), 3),
+            "p99_ms": round(_percentile(window, 99), 3),
+            "max_ms": round(max_ms, 3),
+            "rows": rows,
+            "slow": slow_n,
+        })
+    queries.sort(key=lambda q: q["total_ms"], reverse=True)
+
+    return {
+        "pid": os.getpid(),
+        "since": _started_at,
+        "slow_threshold_ms": SLOW_QUERY_MS,
+        "queries": queries,
+        "slow_queries": slow[::-1],
+    }
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _slow.clear()
+        _plans.clear()
+
+
+# ============================================================
+# SLOW LOG
+# ============================================================
+
+def log_slow(name: str, sql: str, ms: float, rows: int, explain: Callable[[], List[str]]):
+    """Record a slow execution. explain() runs the dialect's EXPLAIN on the same connection."""
+    plan = _plans.get(name)
+    if plan is None:
+        try:
+            plan = explain()
+        except Exception as e:
+            plan = [f"explain failed: {e}"]
+        _plans.set(name, plan)
+
+    entry = {
+        "at": datetime.utcnow().isoformat(),
+        "name": name,
+        "ms": round(ms, 3),
+        "rows": rows,
+        "sql": _normalise(sql),
+        "plan": plan,
+    }
+    with _lock:
+        _slow.append(entry)
+
+    print(f"[SLOWQUERY] {name} {entry['ms']}ms rows={rows} plan={' | '.join(plan)}")
+    if SLOW_QUERY_LOG:
+        try:
+            with open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"[SLOWQUERY] could not write {SLOW_QUERY_LOG}: {e}")
+
+
+# ============================================================
+# CURSOR WRAPPER
+# ============================================================
+
+class TimedCursor:
+    """
+    Wraps a DB-API cursor and records the statement when it is created, i.e.
+    once execute() has returned: the time is the execute time, and the rows are
+    rowcount for INSERT/UPDATE/DELETE. Rows a SELECT returns are added as
+    fetchone/fetchall/fetchmany/iteration hand them out.
+    """
+
+    def __init__(self, cursor, sql: str, started: float, explain: Callable[[], List[str]]):
+        self._cursor = cursor
+        self._name = query_name(sql)
+        ms = (time.perf_counter() - started) * 1000.0
+        rows = 0
+        if cursor.description is None:
+            rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        if record(self._name, ms, rows):
+            log_slow(self._name, sql, ms, rows, explain)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            record_rows(self._name, 1)
+        return row
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        record_rows(self._name, len(rows))
+        return rows
+
+    def fetchmany(self, size: Optional[int] = None):
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        record_rows(self._name, len(rows))
+        return rows
+
+    def __iter__(self):
+        n = 0
+        try:
+            for row in self._cursor:
+                n += 1
+                yield row
+        finally:
+            record_rows(self._name, n)
+
+    def __getattr__(self, item):
+        # lastrowid, rowcount, description, close, ...
+        return getattr(self._cursor, item)
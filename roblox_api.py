@@ -0,0 +1,231 @@
+# roblox_api.py
+"""
+Roblox metadata lookups that never block the event loop.
+
+  await resolver.universe_id(place_id)     -> universe id (the place id if Roblox can't say)
+  await resolver.game_names(universe_ids)  -> {universe_id: name} for the ids Roblox knows
+  await resolver.game_name(universe_id)    -> name or None
+
+Each lookup goes through three layers:
+  1. an in-memory TTLCache (per worker)
+  2. place_universe_cache / universe_meta_cache in the games db, shared by
+     every worker and kept across restarts (storage.RobloxCacheRepository,
+     called from the thread pool)
+  3. Roblox, over one shared httpx.AsyncClient (keep-alive, ROBLOX_HTTP_TIMEOUT
+     seconds per call); names are fetched ROBLOX_NAME_BATCH ids per call
+
+A place's universe never changes, so those rows are trusted for
+PLACE_UNIVERSE_TTL (30 days); games get renamed, so names are trusted for
+UNIVERSE_META_TTL (1 day). When Roblox fails, an expired row is still used.
+Failures are remembered in memory only, for ROBLOX_NEGATIVE_TTL seconds, so
+an outage is never written down. Concurrent lookups of the same ids share
+one request.
+
+httpx is optional; without it the same calls go through requests in the
+thread pool.
+"""
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from cache import TTLCache
+from storage import get_storage
+
+try:
+    import httpx  # optional
+except ImportError:
+    httpx = None
+
+ROBLOX_HTTP_TIMEOUT = float(os.environ.get("ROBLOX_HTTP_TIMEOUT", "5"))
+ROBLOX_CACHE_SIZE = int(os.environ.get("ROBLOX_CACHE_SIZE", "10000"))
+ROBLOX_NAME_BATCH = int(os.environ.get("ROBLOX_NAME_BATCH", "50"))
+ROBLOX_NEGATIVE_TTL = float(os.environ.get("ROBLOX_NEGATIVE_TTL", "60"))
+PLACE_UNIVERSE_TTL = float(os.environ.get("PLACE_UNIVERSE_TTL", str(30 * 86400)))
+UNIVERSE_META_TTL = float(os.environ.get("UNIVERSE_META_TTL", "86400"))
+
+UNIVERSE_URL = "https://apis.roblox.com/universes/v1/places/{place_id}/universe"
+GAMES_URL = "https://games.roblox.com/v1/games"
+
+_MISSING = object()
+
+
+def _requests_get_json(url: str, params: Optional[dict]):
+    import requests  # type: ignore
+
+    r = requests.get(url, params=params, timeout=ROBLOX_HTTP_TIMEOUT)
+    r.raise_for_status()
+    return r.json()
+
+
+class RobloxResolver:
+    def __init__(self, storage=None):
+        self.store = storage or get_storage()
+        # ("place", place_id) -> universe id | None, ("name", universe_id) -> name | None
+        self.cache = TTLCache(ROBLOX_CACHE_SIZE, UNIVERSE_META_TTL)
+        self._client = None
+        self._client_loop = None
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self.db_hits = 0
+        self.network_calls = 0
+        self.network_errors = 0
+
+    # ---------------- plumbing ----------------
+
+    def _http(self):
+        # one connection pool per event loop (uvicorn runs exactly one per worker)
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(timeout=ROBLOX_HTTP_TIMEOUT)
+            self._client_loop = loop
+        return self._client
+
+    async def _get_json(self, url: str, params: Optional[dict] = None):
+        self.network_calls += 1
+        try:
+            if httpx is None:
+                return await run_in_threadpool(_requests_get_json, url, params)
+            r = await self._http().get(url, params=params)
+            r.raise_for_status()
+            return r.json()
+        except Exception as e:
+            self.network_errors += 1
+            print(f"[ROBLOX] {url} failed: {e}")
+            return None
+
+    async def _db(self, fn: Callable, *args):
+        # the cache tables are an optimisation: a failing query must not fail the lookup
+        try:
+            return await run_in_threadpool(fn, *args)
+        except Exception as e:
+            print(f"[ROBLOX] cache table {fn.__name__} failed: {e}")
+            return None
+
+    async def _shared(self, key: tuple, make: Callable[[], Awaitable]):
+        # concurrent callers await the same task; it finishes (and fills the
+        # caches) even if the request that started it goes away
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(make())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    # ---------------- place -> universe ----------------
+
+    async def universe_id(self, place_id: int) -> int:
+        uid = self.cache.get(("place", place_id), _MISSING)
+        if uid is _MISSING:
+            uid = await self._shared(("place", place_id), lambda: self._load_universe(place_id))
+        return place_id if uid is None else uid
+
+    async def _load_universe(self, place_id: int) -> Optional[int]:
+        key = ("place", place_id)
+        row = await self._db(self.store.roblox_cache.get_universe, place_id)
+        stale = int(row["universe_id"]) if row else None
+        if row:
+            left = float(row["fetched_at"]) + PLACE_UNIVERSE_TTL - time.time()
+            if left > 0:
+                self.db_hits += 1
+                self.cache.set(key, stale, ttl=left)
+                return stale
+
+        j = await self._get_json(UNIVERSE_URL.format(place_id=place_id))
+        uid = (j or {}).get("universeId") if isinstance(j, dict) else None
+        if not (isinstance(uid, int) and uid > 0):
+            self.cache.set(key, stale, ttl=ROBLOX_NEGATIVE_TTL)
+            return stale
+
+        await self._db(self.store.roblox_cache.put_universe, place_id, uid)
+        self.cache.set(key, uid, ttl=PLACE_UNIVERSE_TTL)
+        return uid
+
+    # ---------------- universe -> name ----------------
+
+    async def game_name(self, universe_id: int) -> Optional[str]:
+        return (await self.game_names([universe_id])).get(universe_id)
+
+    async def game_names(self, universe_ids: Iterable[int]) -> Dict[int, str]:
+        names: Dict[int, str] = {}
+        missing: List[int] = []
+        for uid in dict.fromkeys(int(u) for u in universe_ids):
+            hit = self.cache.get(("name", uid), _MISSING)
+            if hit is _MISSING:
+                missing.append(uid)
+            elif hit:
+                names[uid] = hit
+        if not missing:
+            return names
+
+        rows = await self._db(self.store.roblox_cache.get_meta, missing) or {}
+        now = time.time()
+        cold: List[int] = []
+        stale: Dict[int, str] = {}
+        for uid in missing:
+            name, fetched_at = rows.get(uid, (None, 0.0))
+            left = fetched_at + UNIVERSE_META_TTL - now
+            if name and left > 0:
+                self.db_hits += 1
+                self.cache.set(("name", uid), name, ttl=left)
+                names[uid] = name
+                continue
+            if name:
+                stale[uid] = name
+            cold.append(uid)
+
+        chunks = [tuple(cold[i:i + ROBLOX_NAME_BATCH]) for i in range(0, len(cold), ROBLOX_NAME_BATCH)]
+        results = await asyncio.gather(*(
+            self._shared(("names", chunk), lambda chunk=chunk: self._fetch_names(chunk, stale))
+            for chunk in chunks
+        ))
+        for found in results:
+            names.update(found)
+        return names
+
+    async def _fetch_names(self, chunk: tuple, stale: Dict[int, str]) -> Dict[int, str]:
+        j = await self._get_json(GAMES_URL, {"universeIds": ",".join(str(u) for u in chunk)})
+        found: Dict[int, str] = {}
+        data = j.get("data") if isinstance(j, dict) else None
+        for g in data or []:
+            name = g.get("name") if isinstance(g, dict) else None
+            if isinstance(name, str) and name.strip() and g.get("id") in chunk:
+                found[int(g["id"])] = name.strip()
+        if found:
+            await self._db(self.store.roblox_cache.put_meta, found)
+
+        result: Dict[int, str] = {}
+        for uid in chunk:
+            if uid in found:
+                self.cache.set(("name", uid), found[uid], ttl=UNIVERSE_META_TTL)
+                result[uid] = found[uid]
+            else:
+                self.cache.set(("name", uid), stale.get(uid), ttl=ROBLOX_NEGATIVE_TTL)
+                if uid in stale:
+                    result[uid] = stale[uid]
+        return result
+
+    # ---------------- lifecycle ----------------
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "db_hits": self.db_hits,
+            "network_calls": self.network_calls,
+            "network_errors": self.network_errors,
+            "inflight": len(self._inflight),
+            "http_client": "httpx" if httpx is not None else "requests",
+        }
+
+
+resolver = RobloxResolver()
+
+
+def stats() -> dict:
+    return resolver.stats()
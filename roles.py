@@ -1,6 +1,9 @@
 
 import os
 import json
+import time
+import zlib
+import threading
 from enum import Enum
 
 
@@ -118,3 +121,97 @@ def load_role_permissions():
 
 
 ROLE_PERMISSIONS = load_role_permissions()
+
+
+# Bit positions for the compact permission mask carried in access tokens.
+# Only ever append: reordering would change what already-issued tokens mean.
+PERMISSION_FLAGS = (
+    "can_view_basic_dashboard",
+    "can_view_game_data",
+    "can_manage_games",
+    "can_view_products",
+    "can_view_brand_campaigns",
+    "can_manage_brand",
+    "can_pay_for_products",
+    "can_admin",
+)
+
+
+def permissions_to_mask(perms: dict) -> int:
+    mask = 0
+    for bit, flag in enumerate(PERMISSION_FLAGS):
+        if perms.get(flag):
+            mask |= 1 << bit
+    return mask
+
+
+def mask_to_permissions(mask: int) -> dict:
+    return {flag: bool(mask & (1 << bit)) for bit, flag in enumerate(PERMISSION_FLAGS)}
+
+
+FLAG_BITS = {flag: 1 << bit for bit, flag in enumerate(PERMISSION_FLAGS)}
+ALL_PERMISSIONS_MASK = (1 << len(PERMISSION_FLAGS)) - 1
+
+
+# ============================================================
+# COMPILED ROLES (hot reload)
+# ============================================================
+# ROLE_PERMISSIONS above is the import-time snapshot. compiled_roles() is the
+# live view: account type -> bitmask, recompiled when roles.json's mtime
+# changes (checked at most every ROLES_RELOAD_SECONDS per worker) and swapped
+# in as a whole. version is a checksum of the masks, so every worker that has
+# loaded the same file agrees on it.
+
+ROLES_RELOAD_SECONDS = float(os.environ.get("ROLES_RELOAD_SECONDS", "2"))
+
+
+class CompiledRoles:
+    __slots__ = ("permissions", "masks", "version", "mtime")
+
+    def __init__(self, permissions: dict, mtime):
+        self.permissions = permissions
+        self.masks = {acct.value: permissions_to_mask(p) for acct, p in permissions.items()}
+        self.version = zlib.crc32(json.dumps(sorted(self.masks.items())).encode("utf-8"))
+        self.mtime = mtime
+
+
+def _roles_mtime():
+    try:
+        return os.stat(ROLES_CONFIG_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
+_compiled = CompiledRoles(ROLE_PERMISSIONS, _roles_mtime())
+_checked_at = time.monotonic()
+_lock = threading.Lock()
+
+
+def compiled_roles() -> CompiledRoles:
+    global _compiled, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < ROLES_RELOAD_SECONDS:
+        return _compiled
+    with _lock:
+        if now - _checked_at < ROLES_RELOAD_SECONDS:
+            return _compiled
+        _checked_at = now
+        mtime = _roles_mtime()
+        if mtime == _compiled.mtime:
+            return _compiled
+        try:
+            new = CompiledRoles(load_role_permissions(), mtime)
+        except (OSError, ValueError) as e:
+            # half-written / broken file: keep serving the last good roles
+            print(f"[CONFIG] roles.json reload failed, keeping previous roles: {e}")
+            return _compiled
+        if new.version != _compiled.version:
+            print(f"[CONFIG] roles.json reloaded (version {new.version})")
+        _compiled = new
+        return _compiled
+
+
+def role_mask(account_type) -> int:
+    """Current permission bitmask for an AccountType (or its string value); 0 if unknown."""
+    key = account_type.value if isinstance(account_type, AccountType) else str(account_type)
+    return compiled_roles().masks.get(key, 0)
@@ -25,6 +25,11 @@ export SMTP_HOST="${SMTP_HOST:-smtp.ionos.co.uk}"
 export SMTP_PORT="${SMTP_PORT:-587}"
 # SMTP_USER / SMTP_PASSWORD should be in .env for security
 
+# ---------------------------
+# Storage backend (sqlite default; postgres needs DATABASE_URL in .env)
+# ---------------------------
+export DREAMBOX_DB_BACKEND="${DREAMBOX_DB_BACKEND:-sqlite}"
+
 # ---------------------------
 # Security
 # ---------------------------
@@ -38,6 +43,7 @@ export PYTHONDONTWRITEBYTECODE=1
 # ---------------------------
 API_PID_FILE=".api.pid"
 CCU_PID_FILE=".ccu.pid"
+META_PID_FILE=".meta.pid"
 
 stop_if_running () {
   local pidfile="$1"
@@ -59,6 +65,7 @@ stop_if_running () {
 
 stop_if_running "$API_PID_FILE"
 stop_if_running "$CCU_PID_FILE"
+stop_if_running "$META_PID_FILE"
 
 # Also clean any stray pycache (FTP deploys can leave it)
 find . -name "__pycache__" -type d -exec rm -rf {} + 2>/dev/null || true
@@ -91,9 +98,17 @@ echo "[run_all] Starting CCU collector..."
 nohup python ccu_collector.py > ccu.log 2>&1 &
 echo $! > "$CCU_PID_FILE"
 
+# ---------------------------
+# Start metadata refresher
+# ---------------------------
+echo "[run_all] Starting metadata refresher..."
+nohup python metadata_refresher.py > meta.log 2>&1 &
+echo $! > "$META_PID_FILE"
+
 echo "[run_all] Running."
 echo "  API logs:  api.log"
 echo "  CCU logs:  ccu.log"
+echo "  Meta logs: meta.log"
 
 # Keep script running in foreground if your host expects it
 wait
@@ -0,0 +1,139 @@
+# settings.py
+"""
+One place for shared settings and the admin allowlist.
+
+Environment settings used by more than one module (JWT secret / algorithm,
+token lifetime, paths) are read here once; modules import them instead of
+calling os.environ themselves. Tunables that belong to a single module
+(mailer, password_hashing, ...) stay next to the code that uses them.
+
+admins.json (config/admins.json, falling back to ./admins.json) is parsed
+once at import into a frozen snapshot. admin_emails() restats the file at
+most every CONFIG_RELOAD_SECONDS; when its mtime changes the file is parsed
+again and the new snapshot replaces the old one in a single assignment, so
+allowlist edits apply without a restart. A file that fails to parse is
+logged and the previous list stays in force.
+
+Format: { "admins": ["a@b.com", ...] }  OR  ["a@b.com", ...]
+"""
+import os
+import json
+import time
+import zlib
+import threading
+from typing import FrozenSet, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.join(BASE_DIR, "config")
+
+# JWT
+SECRET_KEY = os.environ.get("SECRET_KEY", "CHANGE_ME_TO_A_LONG_RANDOM_SECRET")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
+
+CONFIG_RELOAD_SECONDS = float(os.environ.get("CONFIG_RELOAD_SECONDS", "2"))
+
+ADMINS_PATHS = (
+    os.path.join(CONFIG_DIR, "admins.json"),  # preferred
+    os.path.join(BASE_DIR, "admins.json"),    # fallback
+)
+
+
+class AdminList:
+    __slots__ = ("emails", "path", "mtime", "version")
+
+    def __init__(self, emails: FrozenSet[str], path: Optional[str], mtime):
+        self.emails = emails
+        self.path = path
+        self.mtime = mtime
+        # same list -> same number in every worker
+        self.version = zlib.crc32(json.dumps(sorted(emails)).encode("utf-8"))
+
+
+def _admins_file():
+    """(path, mtime) of the admins.json in use, or (None, None)."""
+    for p in ADMINS_PATHS:
+        try:
+            return p, os.stat(p).st_mtime_ns
+        except OSError:
+            continue
+    return None, None
+
+
+def _parse_admins(path: str) -> FrozenSet[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        admins = data.get("admins", [])
+    elif isinstance(data, list):
+        admins = data
+    else:
+        admins = []
+    return frozenset(str(e).strip().lower() for e in admins if str(e).strip())
+
+
+def _load_admins() -> AdminList:
+    path, mtime = _admins_file()
+    if path is None:
+        print("[CONFIG] No admins.json found. Admin list empty.")
+        return AdminList(frozenset(), None, None)
+    try:
+        emails = _parse_admins(path)
+    except (OSError, ValueError) as e:
+        print(f"[CONFIG] Failed reading {path}: {e}")
+        return AdminList(frozenset(), path, None)
+    print(f"[CONFIG] Loaded {len(emails)} admin emails from {path}")
+    return AdminList(emails, path, mtime)
+
+
+_admins = _load_admins()
+_checked_at = time.monotonic()
+_lock = threading.Lock()
+
+
+def _current_admins() -> AdminList:
+    global _admins, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < CONFIG_RELOAD_SECONDS:
+        return _admins
+    with _lock:
+        if now - _checked_at < CONFIG_RELOAD_SECONDS:
+            return _admins
+        _checked_at = now
+        path, mtime = _admins_file()
+        if path == _admins.path and mtime == _admins.mtime:
+            return _admins
+        if path is None:
+            _admins = AdminList(frozenset(), None, None)
+            print("[CONFIG] admins.json removed. Admin list empty.")
+            return _admins
+        try:
+            emails = _parse_admins(path)
+        except (OSError, ValueError) as e:
+            # half-written / broken file: keep the last good list
+            print(f"[CONFIG] admins.json reload failed, keeping previous list: {e}")
+            return _admins
+        _admins = AdminList(emails, path, mtime)
+        print(f"[CONFIG] Reloaded {len(emails)} admin emails from {path}")
+        return _admins
+
+
+def admin_emails() -> FrozenSet[str]:
+    return _current_admins().emails
+
+
+def admins_version() -> int:
+    return _current_admins().version
+
+
+def is_admin_email(email: str) -> bool:
+    return (email or "").strip().lower() in _current_admins().emails
+
+
+def stats() -> dict:
+    admins = _current_admins()
+    return {
+        "admins_path": admins.path,
+        "admins_loaded": len(admins.emails),
+        "admins_version": admins.version,
+    }
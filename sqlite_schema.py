@@ -0,0 +1,376 @@
+# sqlite_schema.py
+"""
+SQLite DDL for dreambox.db, games.db and campaigns.db.
+
+Each create_*_schema(conn) creates missing tables, adds columns that older
+files lack and applies the db_indexes pack. It does not commit. The callers
+are app.init_db, Dashboard.games.ensure_games_schema and
+Dashboard.db.init_campaigns_db, which run it against the files. db_indexes
+runs it against an in-memory DB for the query advisor. storage.POSTGRES_SCHEMA
+is the postgres equivalent.
+"""
+import sqlite3
+
+from db_indexes import apply_index_migrations
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    row = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+        (table,),
+    ).fetchone()
+    return row is not None
+
+
+def _column_exists(conn: sqlite3.Connection, table: str, col: str) -> bool:
+    # NOTE: PRAGMA table_info returns rows like: (cid, name, type, notnull, dflt_value, pk)
+    cur = conn.execute(f"PRAGMA table_info({table})")
+    return any(r[1] == col for r in cur.fetchall())
+
+
+# ============================================================
+# dreambox.db
+# ============================================================
+
+def create_dreambox_schema(conn: sqlite3.Connection):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS users ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "email TEXT UNIQUE NOT NULL,"
+        "password_hash TEXT NOT NULL,"
+        "account_type TEXT NOT NULL DEFAULT 'AccountPending',"
+        "is_email_verified INTEGER NOT NULL DEFAULT 0,"
+        "twofa_code TEXT,"
+        "twofa_expires_at TEXT"
+        ");"
+    )
+
+    if not _column_exists(conn, "users", "password_reset_token"):
+        conn.execute("ALTER TABLE users ADD COLUMN password_reset_token TEXT;")
+    if not _column_exists(conn, "users", "password_reset_expires_at"):
+        conn.execute("ALTER TABLE users ADD COLUMN password_reset_expires_at TEXT;")
+    if not _column_exists(conn, "users", "authz_version"):
+        conn.execute("ALTER TABLE users ADD COLUMN authz_version INTEGER NOT NULL DEFAULT 0;")
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS games ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "owner_user_id INTEGER NOT NULL,"
+        "universe_id INTEGER NOT NULL,"
+        "name TEXT,"
+        "created_at TEXT NOT NULL,"
+        "FOREIGN KEY(owner_user_id) REFERENCES users(id)"
+        ");"
+    )
+
+    # legacy copy; storage.GameRepository keeps game rows in games.db
+    if not _column_exists(conn, "games", "game_url"):
+        conn.execute("ALTER TABLE games ADD COLUMN game_url TEXT;")
+    if not _column_exists(conn, "games", "is_favorite"):
+        conn.execute("ALTER TABLE games ADD COLUMN is_favorite INTEGER NOT NULL DEFAULT 0;")
+    if not _column_exists(conn, "games", "delete_requested"):
+        conn.execute("ALTER TABLE games ADD COLUMN delete_requested INTEGER NOT NULL DEFAULT 0;")
+    if not _column_exists(conn, "games", "delete_requested_at"):
+        conn.execute("ALTER TABLE games ADD COLUMN delete_requested_at TEXT;")
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS brands ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "name TEXT NOT NULL,"
+        "owner_user_id INTEGER NOT NULL,"
+        "created_at TEXT NOT NULL,"
+        "FOREIGN KEY(owner_user_id) REFERENCES users(id)"
+        ");"
+    )
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS campaigns ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "brand_id INTEGER NOT NULL,"
+        "name TEXT NOT NULL,"
+        "status TEXT NOT NULL DEFAULT 'draft',"
+        "created_at TEXT NOT NULL,"
+        "FOREIGN KEY(brand_id) REFERENCES brands(id)"
+        ");"
+    )
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS stats_snapshots ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "universe_id INTEGER NOT NULL,"
+        "timestamp TEXT NOT NULL,"
+        "playing INTEGER,"
+        "visits INTEGER"
+        ");"
+    )
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS survey_submissions ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "user_id INTEGER NOT NULL,"
+        "name TEXT,"
+        "company TEXT,"
+        "role TEXT,"
+        "goals TEXT,"
+        "budget_range TEXT,"
+        "timeline TEXT,"
+        "extra_notes TEXT,"
+        "preferred_time TEXT,"
+        "created_at TEXT NOT NULL,"
+        "FOREIGN KEY(user_id) REFERENCES users(id)"
+        ");"
+    )
+
+    # survey retries carry the same key; the unique index turns them into no-ops
+    if not _column_exists(conn, "survey_submissions", "idempotency_key"):
+        conn.execute("ALTER TABLE survey_submissions ADD COLUMN idempotency_key TEXT;")
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS zoom_meetings ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "user_id INTEGER NOT NULL,"
+        "email TEXT NOT NULL,"
+        "preferred_time TEXT NOT NULL,"
+        "status TEXT NOT NULL DEFAULT 'requested',"
+        "zoom_join_url TEXT,"
+        "created_at TEXT NOT NULL,"
+        "FOREIGN KEY(user_id) REFERENCES users(id)"
+        ");"
+    )
+
+    # bumped when a user's identity changes so other workers drop cached rows
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cache_versions ("
+        "name TEXT PRIMARY KEY,"
+        "version INTEGER NOT NULL DEFAULT 0"
+        ");"
+    )
+
+    # password reset links, keyed by sha256(token) (expires_at is unix seconds)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS password_reset_tokens ("
+        "token_hash TEXT PRIMARY KEY,"
+        "user_id INTEGER NOT NULL,"
+        "expires_at REAL NOT NULL,"
+        "created_at TEXT NOT NULL"
+        ");"
+    )
+
+    # twofa_store.DBTwoFAStore (expires_at is unix seconds)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS twofa_challenges ("
+        "user_id INTEGER PRIMARY KEY,"
+        "code TEXT NOT NULL,"
+        "expires_at REAL NOT NULL,"
+        "attempts INTEGER NOT NULL DEFAULT 0"
+        ");"
+    )
+
+    # mailer.py outbox (next_attempt_at is unix seconds)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS email_outbox ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "to_email TEXT NOT NULL,"
+        "subject TEXT NOT NULL,"
+        "body TEXT NOT NULL,"
+        "status TEXT NOT NULL DEFAULT 'pending',"
+        "attempts INTEGER NOT NULL DEFAULT 0,"
+        "next_attempt_at REAL NOT NULL,"
+        "claim_token TEXT,"
+        "last_error TEXT,"
+        "created_at TEXT NOT NULL,"
+        "sent_at TEXT"
+        ");"
+    )
+
+    # token_cache.revoke_token / revoke_user_tokens (times are unix seconds)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS token_revocations ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "token_digest TEXT,"
+        "user_id INTEGER,"
+        "revoked_before REAL,"
+        "expires_at REAL NOT NULL"
+        ");"
+    )
+
+    # login_limiter.DBFailureStore (ts is unix seconds)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS auth_failures ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "key TEXT NOT NULL,"
+        "ts REAL NOT NULL"
+        ");"
+    )
+
+    apply_index_migrations(conn, "dreambox")
+
+
+# ============================================================
+# games.db
+# ============================================================
+
+def create_games_schema(conn: sqlite3.Connection):
+    # Create base table
+    if not _table_exists(conn, "games"):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS games (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                owner_user_id INTEGER NOT NULL,
+                universe_id INTEGER NOT NULL,
+                name TEXT,
+                created_at TEXT,
+                game_url TEXT,
+                is_favorite INTEGER NOT NULL DEFAULT 0,
+                delete_requested INTEGER NOT NULL DEFAULT 0,
+                delete_requested_at TEXT
+            );
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_games_owner ON games(owner_user_id);")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_games_universe ON games(universe_id);")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_games_owner_universe ON games(owner_user_id, universe_id);")
+
+    # Older installs: add columns if missing (all aligned at same indentation)
+    if not _column_exists(conn, "games", "game_url"):
+        try:
+            conn.execute("ALTER TABLE games ADD COLUMN game_url TEXT;")
+        except Exception:
+            pass
+
+    if not _column_exists(conn, "games", "is_favorite"):
+        try:
+            conn.execute("ALTER TABLE games ADD COLUMN is_favorite INTEGER NOT NULL DEFAULT 0;")
+        except Exception:
+            pass
+
+    if not _column_exists(conn, "games", "delete_requested"):
+        try:
+            conn.execute("ALTER TABLE games ADD COLUMN delete_requested INTEGER NOT NULL DEFAULT 0;")
+        except Exception:
+            pass
+
+    if not _column_exists(conn, "games", "delete_requested_at"):
+        try:
+            conn.execute("ALTER TABLE games ADD COLUMN delete_requested_at TEXT;")
+        except Exception:
+            pass
+
+    # Optional analytics table
+    if not _table_exists(conn, "stats_snapshots"):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS stats_snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                universe_id INTEGER NOT NULL,
+                timestamp TEXT NOT NULL,
+                playing INTEGER NOT NULL DEFAULT 0,
+                visits INTEGER NOT NULL DEFAULT 0,
+                favorites INTEGER NOT NULL DEFAULT 0,
+                upvotes INTEGER NOT NULL DEFAULT 0,
+                downvotes INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_u_ts ON stats_snapshots(universe_id, timestamp);")
+
+    # Roblox lookups shared across workers (roblox_api.py)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS place_universe_cache (
+            place_id INTEGER PRIMARY KEY,
+            universe_id INTEGER NOT NULL,
+            fetched_at REAL NOT NULL
+        );
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS universe_meta_cache (
+            universe_id INTEGER PRIMARY KEY,
+            name TEXT,
+            fetched_at REAL NOT NULL,
+            description TEXT,
+            creator_id INTEGER,
+            creator_name TEXT,
+            creator_type TEXT,
+            thumbnail_url TEXT,
+            changed_at REAL
+        );
+    """)
+    # metadata columns (metadata_refresher.py) on tables created before them
+    for col, typ in (("description", "TEXT"), ("creator_id", "INTEGER"), ("creator_name", "TEXT"),
+                     ("creator_type", "TEXT"), ("thumbnail_url", "TEXT"), ("changed_at", "REAL")):
+        if not _column_exists(conn, "universe_meta_cache", col):
+            conn.execute(f"ALTER TABLE universe_meta_cache ADD COLUMN {col} {typ};")
+
+    apply_index_migrations(conn, "games")
+
+
+# ============================================================
+# campaigns.db
+# ============================================================
+
+def create_campaigns_schema(conn: sqlite3.Connection):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS projects (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      brand_email TEXT NOT NULL,
+      title TEXT NOT NULL,
+      status TEXT DEFAULT 'draft',
+      budget REAL DEFAULT 0,
+      currency TEXT DEFAULT 'EUR',
+      targets_json TEXT DEFAULT '{}',
+      algorithm_version TEXT DEFAULT 'v1',
+      created_by_email TEXT NOT NULL,
+      created_at TEXT DEFAULT (datetime('now'))
+    );
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS project_access (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      project_id INTEGER NOT NULL,
+      user_email TEXT NOT NULL,
+      access_role TEXT DEFAULT 'viewer',
+      created_at TEXT DEFAULT (datetime('now')),
+      UNIQUE(project_id, user_email),
+      FOREIGN KEY(project_id) REFERENCES projects(id)
+    );
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS project_games (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      project_id INTEGER NOT NULL,
+      game_id INTEGER NOT NULL,
+      UNIQUE(project_id, game_id)
+    );
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS quotes (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      project_id INTEGER NOT NULL,
+      amount REAL NOT NULL,
+      currency TEXT DEFAULT 'EUR',
+      notes TEXT DEFAULT '',
+      status TEXT DEFAULT 'sent',
+      created_at TEXT DEFAULT (datetime('now'))
+    );
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS invoices (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      project_id INTEGER NOT NULL,
+      quote_id INTEGER,
+      billing_type TEXT NOT NULL, -- 'one_off' or 'subscription'
+      amount REAL NOT NULL,
+      currency TEXT DEFAULT 'EUR',
+      status TEXT DEFAULT 'issued', -- issued/paid/void/uncollectible
+      stripe_customer_id TEXT,
+      stripe_invoice_id TEXT,
+      stripe_subscription_id TEXT,
+      issued_at TEXT DEFAULT (datetime('now')),
+      paid_at TEXT
+    );
+    """)
+    apply_index_migrations(conn, "campaigns")
+
+
+SCHEMAS = {
+    "dreambox": create_dreambox_schema,
+    "games": create_games_schema,
+    "campaigns": create_campaigns_schema,
+}
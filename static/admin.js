@@ -0,0 +1,62 @@
+const token = localStorage.getItem("dreambox_token");
+if(!token) window.location.href = "/portal";
+
+async function me(){
+  const r = await fetch("__ME_ENDPOINT__", {
+    headers: { "Authorization": "Bearer " + token }
+  });
+  if(!r.ok) {
+    localStorage.removeItem("dreambox_token");
+    window.location.href = "/portal";
+    return null;
+  }
+  return await r.json();
+}
+
+async function requireAdmin(){
+  return adminGate(await me());
+}
+
+// user (from me() or bootstrap().me) if it is an admin; otherwise off to /portal-home
+function adminGate(user){
+  if(!user) return null;
+  const acct = (user.account_type || "").toLowerCase();
+  if(!acct.includes("administrator")){
+    window.location.href = "/portal-home";
+    return null;
+  }
+  const el = document.getElementById("adminEmailLine");
+  if(el) el.textContent = "Signed in as: " + (user.email || "—");
+  return user;
+}
+
+// identity + the view's first data in one request (Dashboard/bootstrap.py)
+async function bootstrap(view){
+  const r = await fetch("/portal/bootstrap?view=" + encodeURIComponent(view), {
+    headers: { "Authorization": "Bearer " + token }
+  });
+  if(!r.ok){
+    localStorage.removeItem("dreambox_token");
+    window.location.href = "/portal";
+    return null;
+  }
+  return await r.json();
+}
+
+async function api(path, opts={}){
+  opts.headers = Object.assign({}, opts.headers || {}, {
+    "Authorization": "Bearer " + token,
+    "Content-Type": "application/json"
+  });
+  const r = await fetch(path, opts);
+  const text = await r.text();
+  let data = null;
+  try { data = JSON.parse(text); } catch(e){}
+  if(!r.ok) throw new Error((data && data.detail) || text || ("HTTP " + r.status));
+  return data;
+}
+
+function logout(){
+  localStorage.removeItem("dreambox_token");
+  window.location.href = "/portal";
+}
@@ -0,0 +1,59 @@
+(function(){
+  const params = new URLSearchParams(window.location.search);
+  const t = params.get("token");
+  if(t && t.length > 20){
+    localStorage.setItem("dreambox_token", t);
+    params.delete("token");
+    const newUrl = window.location.pathname + (params.toString() ? ("?" + params.toString()) : "");
+    window.history.replaceState({}, "", newUrl);
+  }
+})();
+
+const token = localStorage.getItem("dreambox_token");
+if(!token) window.location.href = "/portal";
+
+async function me(){
+  const r = await fetch("__ME_ENDPOINT__", {
+    headers: { "Authorization": "Bearer " + token }
+  });
+  if(!r.ok){
+    localStorage.removeItem("dreambox_token");
+    window.location.href = "/portal";
+    return null;
+  }
+  return await r.json();
+}
+
+// identity + the view's first data in one request (Dashboard/bootstrap.py);
+// params go to the view's loader too (list filters, page size)
+async function bootstrap(view, params){
+  const q = new URLSearchParams(params || {});
+  q.set("view", view);
+  const r = await fetch("/portal/bootstrap?" + q, {
+    headers: { "Authorization": "Bearer " + token }
+  });
+  if(!r.ok){
+    localStorage.removeItem("dreambox_token");
+    window.location.href = "/portal";
+    return null;
+  }
+  return await r.json();
+}
+
+async function api(path, opts={}){
+  opts.headers = Object.assign({}, opts.headers || {}, {
+    "Authorization": "Bearer " + token,
+    "Content-Type": "application/json"
+  });
+  const r = await fetch(path, opts);
+  const text = await r.text();
+  let data = null;
+  try { data = JSON.parse(text); } catch(e){}
+  if(!r.ok) throw new Error((data && data.detail) || text || ("HTTP " + r.status));
+  return data;
+}
+
+function logout(){
+  localStorage.removeItem("dreambox_token");
+  window.location.href = "/portal";
+}
@@ -0,0 +1,123 @@
+# static_assets.py
+"""
+Shared CSS / JS, served as fingerprinted files.
+
+The sources live in ./static (base.css, auth.css, portal.js, admin.js).
+asset(name) reads one at startup, fills in __PLACEHOLDER__ substitutions,
+minifies it and names it after its content hash:
+
+  asset("base.css").url   -> /static/base.3f9c1a2b7d4e.css
+  asset("base.css").tag() -> <link rel="stylesheet" href="/static/base.3f9c1a2b7d4e.css">
+
+Pages embed tag() instead of the CSS / JS itself, so their payload is markup
+only and the browser fetches each asset once. Because the name changes
+whenever the content does, assets are served Cache-Control: immutable for a
+year; a deploy with edited CSS simply links a new URL. Old or unknown names
+are 404.
+
+Minification is whitespace-level and dependency-free: CSS loses comments and
+insignificant whitespace, JS loses indentation, blank lines and whole-line //
+comments (line breaks stay, so automatic semicolon insertion is unaffected).
+"""
+import os
+import re
+import hashlib
+from typing import Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+from settings import BASE_DIR
+from static_pages import StaticPage
+
+ASSETS_DIR = os.path.join(BASE_DIR, "static")
+ASSETS_URL = "/static"
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+MEDIA_TYPES = {
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+}
+
+router = APIRouter()
+
+
+# ============================================================
+# MINIFY
+# ============================================================
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE = re.compile(r"\s+")
+_CSS_PUNCT = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(css: str) -> str:
+    css = _CSS_COMMENT.sub("", css)
+    css = _CSS_SPACE.sub(" ", css)
+    css = _CSS_PUNCT.sub(r"\1", css)
+    css = css.replace(": ", ":").replace(";}", "}")
+    return css.strip()
+
+
+def minify_js(js: str) -> str:
+    lines = (line.strip() for line in js.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+_MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+# ============================================================
+# ASSETS
+# ============================================================
+
+class Asset:
+    def __init__(self, name: str, text: str):
+        stem, ext = os.path.splitext(name)
+        self.name = name
+        self.ext = ext
+        self.source_bytes = len(text.encode("utf-8"))
+        body = _MINIFIERS[ext](text)
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()[:12]
+        self.filename = f"{stem}.{digest}{ext}"
+        self.url = f"{ASSETS_URL}/{self.filename}"
+        self.page = StaticPage(body, media_type=MEDIA_TYPES[ext], cache_control=ASSET_CACHE_CONTROL)
+
+    def tag(self) -> str:
+        if self.ext == ".css":
+            return f'<link rel="stylesheet" href="{self.url}">'
+        return f'<script src="{self.url}"></script>'
+
+
+# logical name -> asset; fingerprinted filename -> asset
+ASSETS: Dict[str, Asset] = {}
+_BY_FILENAME: Dict[str, Asset] = {}
+
+
+def asset(name: str, replace: Optional[Dict[str, str]] = None) -> Asset:
+    """Load, minify and fingerprint ./static/<name> (once per name)."""
+    if name in ASSETS:
+        return ASSETS[name]
+    with open(os.path.join(ASSETS_DIR, name), "r", encoding="utf-8") as f:
+        text = f.read()
+    for placeholder, value in (replace or {}).items():
+        text = text.replace(placeholder, value)
+    a = Asset(name, text)
+    ASSETS[name] = _BY_FILENAME[a.filename] = a
+    print(f"[ASSETS] {name} -> {a.url} ({a.source_bytes} -> {a.page.sizes()['identity']} bytes)")
+    return a
+
+
+@router.get(ASSETS_URL + "/{filename}")
+def static_asset(filename: str, request: Request) -> Response:
+    a = _BY_FILENAME.get(filename)
+    if a is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return a.page.response(request)
+
+
+def stats() -> dict:
+    return {
+        name: {"url": a.url, "source_bytes": a.source_bytes, **a.page.sizes()}
+        for name, a in ASSETS.items()
+    }
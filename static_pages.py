@@ -0,0 +1,107 @@
+# static_pages.py
+"""
+Constant HTML pages, encoded once.
+
+static_page(name, html) builds the utf-8 bytes plus gzip (and brotli, when the
+optional `brotli` package is installed) variants and a strong ETag per
+variant at import time. StaticPage.response(request) picks the smallest
+encoding the client accepts, sets Content-Encoding / Vary / ETag, and answers
+a matching If-None-Match with an empty 304.
+
+Pages are Cache-Control: no-cache, i.e. the browser keeps them but
+revalidates, so a repeat visit costs one header exchange and a deploy is
+picked up immediately.
+"""
+import gzip
+import hashlib
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli  # optional
+except ImportError:
+    brotli = None
+
+PAGE_CACHE_CONTROL = "no-cache"
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+class StaticPage:
+    def __init__(self, html: str, media_type: str = "text/html; charset=utf-8",
+                 cache_control: str = PAGE_CACHE_CONTROL):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        raw = html.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()[:32]
+        # encoding -> (body, etag); each representation gets its own strong ETag
+        self.variants: Dict[str, tuple] = {"identity": (raw, f'"{digest}"')}
+        self.variants["gzip"] = (gzip.compress(raw, compresslevel=9, mtime=0), f'"{digest}-gz"')
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(raw, quality=11), f'"{digest}-br"')
+        self._etags = {etag for _, etag in self.variants.values()}
+
+    def _choose(self, accept_encoding: str) -> str:
+        accepted = _accepted_encodings(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        for enc in ("br", "gzip"):
+            if enc in self.variants and accepted.get(enc, wildcard) > 0:
+                return enc
+        return "identity"
+
+    def _not_modified(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag in self._etags:
+                return True
+        return False
+
+    def response(self, request: Request) -> Response:
+        encoding = self._choose(request.headers.get("accept-encoding", ""))
+        body, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": self.cache_control}
+        if self._not_modified(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+    def sizes(self) -> Dict[str, int]:
+        return {enc: len(body) for enc, (body, _) in self.variants.items()}
+
+
+# name -> page, for /admin/api/health
+PAGES: Dict[str, StaticPage] = {}
+
+
+def static_page(name: str, html: str) -> StaticPage:
+    page = PAGES[name] = StaticPage(html)
+    return page
+
+
+def stats() -> dict:
+    return {"brotli": brotli is not None, "pages": {name: p.sizes() for name, p in PAGES.items()}}
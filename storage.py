@@ -0,0 +1,1377 @@
+# storage.py
+"""
+Storage backends + repositories for users, games, snapshots, Roblox lookups, projects and invoices.
+
+The backend is picked from the environment:
+  DREAMBOX_DB_BACKEND=sqlite     (default) dreambox.db / games.db / campaigns.db next to app.py
+  DREAMBOX_DB_BACKEND=postgres   one database for everything, DATABASE_URL=postgresql://...
+  DB_POOL_MIN / DB_POOL_MAX      postgres connection pool size (default 1 / 10)
+  USER_CACHE_SIZE / USER_CACHE_TTL / USER_CACHE_VERSION_CHECK
+                                 identity cache size, entry lifetime and how often
+                                 (seconds) workers poll cache_versions
+
+SQL is written once with "?" placeholders; the postgres session rewrites them.
+SQLite keeps its three files (db key -> file); postgres ignores the db key.
+Every session statement is timed by query_stats (see /admin/api/health).
+
+  python storage.py --smoke      # round-trip every repository against the configured backend
+"""
+import os
+import io
+import csv
+import sys
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import query_stats
+from cache import TTLCache
+from db_indexes import register_query
+from query_stats import TimedCursor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SQLITE_PATHS = {
+    "dreambox": os.path.join(BASE_DIR, "dreambox.db"),
+    "games": os.path.join(BASE_DIR, "games.db"),
+    "campaigns": os.path.join(BASE_DIR, "campaigns.db"),
+}
+
+DB_BACKEND = os.environ.get("DREAMBOX_DB_BACKEND", "sqlite").strip().lower()
+DATABASE_URL = os.environ.get("DATABASE_URL", "")
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+
+# identity cache for the auth path (see UserRepository.get_identity)
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "4096"))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "60"))
+USER_CACHE_VERSION_CHECK = float(os.environ.get("USER_CACHE_VERSION_CHECK", "2"))
+
+
+# ============================================================
+# SESSIONS (one connection, "?" placeholders on both backends)
+# ============================================================
+
+class SQLiteSession:
+    dialect = "sqlite"
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+
+    def _explain(self, sql: str, params: tuple) -> List[str]:
+        return [r[3] for r in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+    def execute(self, sql: str, params: Sequence = ()):
+        params = tuple(params)
+        started = time.perf_counter()
+        cur = self.conn.execute(sql, params)
+        return TimedCursor(cur, sql, started, lambda: self._explain(sql, params))
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence]):
+        started = time.perf_counter()
+        cur = self.conn.executemany(sql, seq_of_params)
+        return TimedCursor(cur, sql, started, lambda: ["executemany: not explained"])
+
+    def insert(self, sql: str, params: Sequence = ()) -> int:
+        return self.execute(sql, params).lastrowid
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+@lru_cache(maxsize=512)
+def _pg_sql(sql: str) -> str:
+    # psycopg2 uses %s and treats a literal % as a format char
+    return sql.replace("%", "%%").replace("?", "%s")
+
+
+class PostgresSession:
+    dialect = "postgres"
+
+    def __init__(self, pool):
+        from psycopg2.extras import RealDictCursor  # type: ignore
+        self._cursor_factory = RealDictCursor
+        self.pool = pool
+        self.conn = pool.getconn()
+
+    def _explain(self, sql: str, params: tuple) -> List[str]:
+        with self.conn.cursor() as cur:
+            cur.execute("EXPLAIN " + _pg_sql(sql), params)
+            return [r[0] for r in cur.fetchall()]
+
+    def execute(self, sql: str, params: Sequence = ()):
+        params = tuple(params)
+        started = time.perf_counter()
+        cur = self.conn.cursor(cursor_factory=self._cursor_factory)
+        cur.execute(_pg_sql(sql), params)
+        return TimedCursor(cur, sql, started, lambda: self._explain(sql, params))
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence]):
+        started = time.perf_counter()
+        cur = self.conn.cursor(cursor_factory=self._cursor_factory)
+        cur.executemany(_pg_sql(sql), [tuple(p) for p in seq_of_params])
+        return TimedCursor(cur, sql, started, lambda: ["executemany: not explained"])
+
+    def insert(self, sql: str, params: Sequence = ()) -> int:
+        cur = self.execute(sql.rstrip().rstrip(";") + " RETURNING id", params)
+        return int(cur.fetchone()["id"])
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.pool.putconn(self.conn)
+
+
+# ============================================================
+# BACKENDS
+# ============================================================
+
+class SQLiteBackend:
+    dialect = "sqlite"
+
+    def __init__(self, paths: Dict[str, str]):
+        self.paths = dict(paths)
+
+    def session(self, db_key: str) -> SQLiteSession:
+        return SQLiteSession(self.paths[db_key])
+
+    def iter_rows(self, db_key: str, sql: str, params: Sequence = (), batch: int = 1000) -> Iterator:
+        s = self.session(db_key)
+        try:
+            cur = s.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(batch)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            s.close()
+
+    def copy_rows(self, db_key: str, table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+        marks = ", ".join("?" for _ in columns)
+        s = self.session(db_key)
+        try:
+            cur = s.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({marks})", rows)
+            s.commit()
+            return cur.rowcount
+        finally:
+            s.close()
+
+    def init_schema(self):
+        # sqlite_schema.py holds the SQLite DDL (app.init_db / games.ensure_games_schema / Dashboard.db run it)
+        pass
+
+
+POSTGRES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+  id BIGSERIAL PRIMARY KEY,
+  email TEXT UNIQUE NOT NULL,
+  password_hash TEXT NOT NULL,
+  account_type TEXT NOT NULL DEFAULT 'AccountPending',
+  is_email_verified INTEGER NOT NULL DEFAULT 0,
+  authz_version INTEGER NOT NULL DEFAULT 0,
+  twofa_code TEXT,
+  twofa_expires_at TEXT,
+  password_reset_token TEXT,
+  password_reset_expires_at TEXT
+);
+ALTER TABLE users ADD COLUMN IF NOT EXISTS authz_version INTEGER NOT NULL DEFAULT 0;
+DROP INDEX IF EXISTS idx_users_password_reset_token;
+CREATE INDEX IF NOT EXISTS idx_users_email_prefix ON users(email text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_users_account_type ON users(account_type);
+
+CREATE TABLE IF NOT EXISTS cache_versions (
+  name TEXT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS password_reset_tokens (
+  token_hash TEXT PRIMARY KEY,
+  user_id BIGINT NOT NULL,
+  expires_at DOUBLE PRECISION NOT NULL,
+  created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_password_reset_tokens_expires ON password_reset_tokens(expires_at);
+CREATE INDEX IF NOT EXISTS idx_password_reset_tokens_user ON password_reset_tokens(user_id);
+
+CREATE TABLE IF NOT EXISTS twofa_challenges (
+  user_id BIGINT PRIMARY KEY,
+  code TEXT NOT NULL,
+  expires_at DOUBLE PRECISION NOT NULL,
+  attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_twofa_challenges_expires ON twofa_challenges(expires_at);
+
+CREATE TABLE IF NOT EXISTS email_outbox (
+  id BIGSERIAL PRIMARY KEY,
+  to_email TEXT NOT NULL,
+  subject TEXT NOT NULL,
+  body TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'pending',
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at DOUBLE PRECISION NOT NULL,
+  claim_token TEXT,
+  last_error TEXT,
+  created_at TEXT NOT NULL,
+  sent_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_email_outbox_claim ON email_outbox(claim_token) WHERE claim_token IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS token_revocations (
+  id BIGSERIAL PRIMARY KEY,
+  token_digest TEXT,
+  user_id BIGINT,
+  revoked_before DOUBLE PRECISION,
+  expires_at DOUBLE PRECISION NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_token_revocations_expires ON token_revocations(expires_at);
+
+CREATE TABLE IF NOT EXISTS auth_failures (
+  id BIGSERIAL PRIMARY KEY,
+  key TEXT NOT NULL,
+  ts DOUBLE PRECISION NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_auth_failures_key_ts ON auth_failures(key, ts);
+CREATE INDEX IF NOT EXISTS idx_auth_failures_ts ON auth_failures(ts);
+
+CREATE TABLE IF NOT EXISTS games (
+  id BIGSERIAL PRIMARY KEY,
+  owner_user_id BIGINT NOT NULL,
+  universe_id BIGINT NOT NULL,
+  name TEXT,
+  created_at TEXT,
+  game_url TEXT,
+  is_favorite INTEGER NOT NULL DEFAULT 0,
+  delete_requested INTEGER NOT NULL DEFAULT 0,
+  delete_requested_at TEXT,
+  UNIQUE(owner_user_id, universe_id)
+);
+CREATE INDEX IF NOT EXISTS idx_games_universe ON games(universe_id);
+CREATE INDEX IF NOT EXISTS idx_games_owner_fav_id ON games(owner_user_id, is_favorite DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_games_delete_requested ON games(delete_requested) WHERE delete_requested = 1;
+
+CREATE TABLE IF NOT EXISTS stats_snapshots (
+  id BIGSERIAL PRIMARY KEY,
+  universe_id BIGINT NOT NULL,
+  timestamp TEXT NOT NULL,
+  playing INTEGER NOT NULL DEFAULT 0,
+  visits BIGINT NOT NULL DEFAULT 0,
+  favorites BIGINT NOT NULL DEFAULT 0,
+  upvotes BIGINT NOT NULL DEFAULT 0,
+  downvotes BIGINT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_u_ts ON stats_snapshots(universe_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS place_universe_cache (
+  place_id BIGINT PRIMARY KEY,
+  universe_id BIGINT NOT NULL,
+  fetched_at DOUBLE PRECISION NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS universe_meta_cache (
+  universe_id BIGINT PRIMARY KEY,
+  name TEXT,
+  fetched_at DOUBLE PRECISION NOT NULL,
+  description TEXT,
+  creator_id BIGINT,
+  creator_name TEXT,
+  creator_type TEXT,
+  thumbnail_url TEXT,
+  changed_at DOUBLE PRECISION
+);
+ALTER TABLE universe_meta_cache ADD COLUMN IF NOT EXISTS description TEXT;
+ALTER TABLE universe_meta_cache ADD COLUMN IF NOT EXISTS creator_id BIGINT;
+ALTER TABLE universe_meta_cache ADD COLUMN IF NOT EXISTS creator_name TEXT;
+ALTER TABLE universe_meta_cache ADD COLUMN IF NOT EXISTS creator_type TEXT;
+ALTER TABLE universe_meta_cache ADD COLUMN IF NOT EXISTS thumbnail_url TEXT;
+ALTER TABLE universe_meta_cache ADD COLUMN IF NOT EXISTS changed_at DOUBLE PRECISION;
+
+CREATE TABLE IF NOT EXISTS brands (
+  id BIGSERIAL PRIMARY KEY,
+  name TEXT NOT NULL,
+  owner_user_id BIGINT NOT NULL,
+  created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_brands_owner ON brands(owner_user_id);
+
+CREATE TABLE IF NOT EXISTS campaigns (
+  id BIGSERIAL PRIMARY KEY,
+  brand_id BIGINT NOT NULL,
+  name TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'draft',
+  created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS survey_submissions (
+  id BIGSERIAL PRIMARY KEY,
+  user_id BIGINT NOT NULL,
+  name TEXT,
+  company TEXT,
+  role TEXT,
+  goals TEXT,
+  budget_range TEXT,
+  timeline TEXT,
+  extra_notes TEXT,
+  preferred_time TEXT,
+  created_at TEXT NOT NULL,
+  idempotency_key TEXT
+);
+ALTER TABLE survey_submissions ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+CREATE INDEX IF NOT EXISTS idx_survey_submissions_user ON survey_submissions(user_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_survey_submissions_idempotency ON survey_submissions(idempotency_key);
+
+CREATE TABLE IF NOT EXISTS zoom_meetings (
+  id BIGSERIAL PRIMARY KEY,
+  user_id BIGINT NOT NULL,
+  email TEXT NOT NULL,
+  preferred_time TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'requested',
+  zoom_join_url TEXT,
+  created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_zoom_meetings_user ON zoom_meetings(user_id);
+
+CREATE TABLE IF NOT EXISTS projects (
+  id BIGSERIAL PRIMARY KEY,
+  brand_email TEXT NOT NULL,
+  title TEXT NOT NULL,
+  status TEXT DEFAULT 'draft',
+  budget DOUBLE PRECISION DEFAULT 0,
+  currency TEXT DEFAULT 'EUR',
+  targets_json TEXT DEFAULT '{}',
+  algorithm_version TEXT DEFAULT 'v1',
+  created_by_email TEXT NOT NULL,
+  created_at TEXT DEFAULT to_char(now() AT TIME ZONE 'utc', 'YYYY-MM-DD HH24:MI:SS')
+);
+
+CREATE TABLE IF NOT EXISTS project_access (
+  id BIGSERIAL PRIMARY KEY,
+  project_id BIGINT NOT NULL,
+  user_email TEXT NOT NULL,
+  access_role TEXT DEFAULT 'viewer',
+  created_at TEXT DEFAULT to_char(now() AT TIME ZONE 'utc', 'YYYY-MM-DD HH24:MI:SS'),
+  UNIQUE(project_id, user_email)
+);
+CREATE INDEX IF NOT EXISTS idx_project_access_user_email ON project_access(user_email, project_id);
+
+CREATE TABLE IF NOT EXISTS project_games (
+  id BIGSERIAL PRIMARY KEY,
+  project_id BIGINT NOT NULL,
+  game_id BIGINT NOT NULL,
+  UNIQUE(project_id, game_id)
+);
+
+CREATE TABLE IF NOT EXISTS quotes (
+  id BIGSERIAL PRIMARY KEY,
+  project_id BIGINT NOT NULL,
+  amount DOUBLE PRECISION NOT NULL,
+  currency TEXT DEFAULT 'EUR',
+  notes TEXT DEFAULT '',
+  status TEXT DEFAULT 'sent',
+  created_at TEXT DEFAULT to_char(now() AT TIME ZONE 'utc', 'YYYY-MM-DD HH24:MI:SS')
+);
+
+CREATE TABLE IF NOT EXISTS invoices (
+  id BIGSERIAL PRIMARY KEY,
+  project_id BIGINT NOT NULL,
+  quote_id BIGINT,
+  billing_type TEXT NOT NULL,
+  amount DOUBLE PRECISION NOT NULL,
+  currency TEXT DEFAULT 'EUR',
+  status TEXT DEFAULT 'issued',
+  stripe_customer_id TEXT,
+  stripe_invoice_id TEXT,
+  stripe_subscription_id TEXT,
+  issued_at TEXT DEFAULT to_char(now() AT TIME ZONE 'utc', 'YYYY-MM-DD HH24:MI:SS'),
+  paid_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_invoices_project_id ON invoices(project_id);
+"""
+
+
+class PostgresBackend:
+    dialect = "postgres"
+
+    def __init__(self, dsn: str, minconn: int = 1, maxconn: int = 10):
+        try:
+            from psycopg2.pool import ThreadedConnectionPool  # type: ignore
+        except Exception:
+            raise RuntimeError("DREAMBOX_DB_BACKEND=postgres needs psycopg2 (pip install psycopg2-binary)")
+        if not dsn:
+            raise RuntimeError("DREAMBOX_DB_BACKEND=postgres needs DATABASE_URL")
+        self.pool = ThreadedConnectionPool(minconn, maxconn, dsn)
+
+    def session(self, db_key: str) -> PostgresSession:
+        return PostgresSession(self.pool)
+
+    def iter_rows(self, db_key: str, sql: str, params: Sequence = (), batch: int = 1000) -> Iterator:
+        # named cursor = server-side cursor; rows stream in batches instead of all at once
+        from psycopg2.extras import RealDictCursor  # type: ignore
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor(name=f"iter_{id(conn)}", cursor_factory=RealDictCursor) as cur:
+                cur.itersize = batch
+                cur.execute(_pg_sql(sql), tuple(params))
+                yield from cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def copy_rows(self, db_key: str, table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        n = 0
+        for r in rows:
+            writer.writerow(["" if v is None else v for v in r])
+            n += 1
+        if not n:
+            return 0
+        buf.seek(0)
+        started = time.perf_counter()
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+        query_stats.record(f"copy: {table}", (time.perf_counter() - started) * 1000.0, n)
+        return n
+
+    def init_schema(self):
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(POSTGRES_SCHEMA)
+            conn.commit()
+        finally:
+            self.pool.putconn(conn)
+
+
+# ============================================================
+# REPOSITORIES
+# ============================================================
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class CacheVersion:
+    """
+    A cache_versions counter in the dreambox db, for caches to key on. Writers
+    bump() it once their change commits (or inside their transaction, passing
+    db); current() re-reads it at most every `interval` seconds, so readers
+    normally run no query.
+    """
+
+    # one statement per counter, so query_stats and the advisor report each on its own
+    READ_SQL = {
+        name: register_query(
+            f"cache_version.{name}", "dreambox", f"SELECT version FROM cache_versions WHERE name = '{name}'",
+        )
+        for name in ("users", "games", "tokens")
+    }
+    BUMP_SQL = (
+        "INSERT INTO cache_versions(name, version) VALUES(?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET version = cache_versions.version + 1"
+    )
+
+    def __init__(self, storage: "Storage", name: str, interval: float = USER_CACHE_VERSION_CHECK):
+        self.storage = storage
+        self.name = name
+        self.interval = interval
+        self._read_sql = self.READ_SQL[name]
+        self._value = 0
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        now = time.monotonic()
+        if now - self._checked_at < self.interval:
+            return self._value
+        with self._lock:
+            if now - self._checked_at < self.interval:
+                return self._value
+            self._checked_at = now
+            try:
+                with self.storage.connect("dreambox") as db:
+                    row = db.execute(self._read_sql).fetchone()
+                self._value = int(row["version"]) if row else 0
+            except Exception as e:
+                # keep the last value; the next poll retries
+                print(f"[STORAGE] cache_versions({self.name}) read failed: {e}")
+            return self._value
+
+    def bump(self, db=None):
+        if db is not None:
+            db.execute(self.BUMP_SQL, (self.name,))
+        else:
+            with self.storage.connect("dreambox") as db:
+                db.execute(self.BUMP_SQL, (self.name,))
+        # this worker sees its own write on the next read
+        self._checked_at = float("-inf")
+
+
+class UserRepository:
+    IDENTITY_COLUMNS = "id, email, account_type, is_email_verified, authz_version"
+
+    def __init__(self, storage: "Storage"):
+        self.storage = storage
+        self.cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+        self.cache_version = CacheVersion(storage, "users")
+        self._version: Optional[int] = None
+
+    # --- identity cache ---
+    # Writes that change identity bump cache_versions('users') in the same
+    # transaction. Every worker polls that row at most once per
+    # USER_CACHE_VERSION_CHECK seconds and drops its cache when it moves, so
+    # the auth path normally runs no query at all.
+
+    def _sync_cache_version(self):
+        version = self.cache_version.current()
+        if version != self._version:
+            self.cache.clear()
+            self._version = version
+
+    IDENTITY_BY_ID_SQL = register_query(
+        "users.identity_by_id", "dreambox",
+        f"SELECT {IDENTITY_COLUMNS} FROM users WHERE id = ?", (1,),
+    )
+
+    def get_identity(self, user_id: int) -> Optional[dict]:
+        """id/email/account_type/is_email_verified/authz_version for user_id (cached), or None."""
+        self._sync_cache_version()
+        ident = self.cache.get(user_id)
+        if ident is None:
+            with self.storage.connect("dreambox") as db:
+                row = db.execute(self.IDENTITY_BY_ID_SQL, (user_id,)).fetchone()
+            if row is None:
+                return None
+            ident = dict(row)
+            self.cache.set(user_id, ident)
+        return dict(ident)
+
+    def get_authz_version(self, user_id: int) -> Optional[int]:
+        """Current authz_version (None if the user is gone); tokens carrying an older one are stale."""
+        ident = self.get_identity(user_id)
+        return None if ident is None else int(ident["authz_version"])
+
+    BY_ID_SQL = register_query("users.by_id", "dreambox", "SELECT * FROM users WHERE id = ?", (1,))
+
+    def get_by_id(self, user_id: int):
+        with self.storage.connect("dreambox") as db:
+            return db.execute(self.BY_ID_SQL, (user_id,)).fetchone()
+
+    BY_EMAIL_SQL = register_query("users.by_email", "dreambox", "SELECT * FROM users WHERE email = ?", ("a@b.com",))
+
+    def get_by_email(self, email: str):
+        with self.storage.connect("dreambox") as db:
+            return db.execute(self.BY_EMAIL_SQL, (email.lower(),)).fetchone()
+
+    def create(self, email: str, password_hash: str, account_type: str) -> int:
+        with self.storage.connect("dreambox") as db:
+            return db.insert(
+                "INSERT INTO users (email, password_hash, account_type, is_email_verified) "
+                "VALUES (?, ?, ?, 0);",
+                (email.lower(), password_hash, account_type),
+            )
+
+    ID_BY_EMAIL_SQL = register_query("users.id_by_email", "dreambox", "SELECT id FROM users WHERE email = ?", ("a@b.com",))
+
+    def get_or_create(self, db, email: str, password_hash: str, account_type: str) -> int:
+        """
+        id for email inside the caller's transaction, inserting the user if missing.
+        ON CONFLICT keeps two concurrent sign-ups for one email from failing on the UNIQUE.
+        """
+        db.execute(
+            "INSERT INTO users (email, password_hash, account_type, is_email_verified) VALUES (?, ?, ?, 0) "
+            "ON CONFLICT(email) DO NOTHING",
+            (email.lower(), password_hash, account_type),
+        )
+        return int(db.execute(self.ID_BY_EMAIL_SQL, (email.lower(),)).fetchone()["id"])
+
+    def set_password_hash(self, user_id: int, password_hash: str):
+        with self.storage.connect("dreambox") as db:
+            db.execute("UPDATE users SET password_hash=? WHERE id=?;", (password_hash, user_id))
+            self.cache_version.bump(db)
+        self.cache.pop(user_id)
+
+    def set_account_type(self, user_id: int, account_type: str):
+        with self.storage.connect("dreambox") as db:
+            # authz_version tells tokens carrying the old permission claims apart
+            db.execute(
+                "UPDATE users SET account_type = ?, authz_version = authz_version + 1 WHERE id = ?",
+                (account_type, user_id),
+            )
+            self.cache_version.bump(db)
+        self.cache.pop(user_id)
+
+    BY_ACCOUNT_TYPE_SQL = register_query(
+        "admin.pending_users", "dreambox",
+        "SELECT id, email, account_type FROM users WHERE account_type = ? ORDER BY id DESC",
+        ("AccountPending",),
+    )
+
+    def list_by_account_type(self, account_type: str) -> List:
+        with self.storage.connect("dreambox") as db:
+            return db.execute(self.BY_ACCOUNT_TYPE_SQL, (account_type,)).fetchall()
+
+    # {match} is CONTAINS_MATCH (the default) or PREFIX_MATCH
+    SEARCH_SQL = "SELECT id, email, account_type FROM users WHERE {match} ESCAPE '\\' ORDER BY id DESC LIMIT ?"
+    CONTAINS_MATCH = "lower(email) LIKE ?"
+    PREFIX_MATCH = "email LIKE ?"
+    register_query(
+        "admin.search_users", "dreambox", SEARCH_SQL.format(match=CONTAINS_MATCH), ("%abc%", 200),
+        allow_scan="substring match; a leading % can't seek an index, newest first stops at LIMIT",
+    )
+    register_query("admin.search_users_prefix", "dreambox", SEARCH_SQL.format(match=PREFIX_MATCH), ("abc%", 200))
+
+    def search_by_email(self, text: str, limit: int = 200, prefix: bool = False) -> List:
+        """Users whose email contains text (or starts with it, when prefix=True), newest first."""
+        like = text.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        if not prefix:
+            like = "%" + like
+        match = self.PREFIX_MATCH if prefix else self.CONTAINS_MATCH
+        with self.storage.connect("dreambox") as db:
+            return db.execute(self.SEARCH_SQL.format(match=match), (like, limit)).fetchall()
+
+    RECENT_SQL = register_query(
+        "admin.list_users", "dreambox",
+        "SELECT id, email, account_type FROM users ORDER BY id DESC LIMIT ?", (200,),
+        allow_scan="newest 200 users; reverse rowid walk stops at LIMIT",
+    )
+
+    def list_recent(self, limit: int = 200) -> List:
+        with self.storage.connect("dreambox") as db:
+            return db.execute(self.RECENT_SQL, (limit,)).fetchall()
+
+    COUNT_SQL = register_query(
+        "admin.health_user_count", "dreambox",
+        "SELECT COUNT(*) AS n FROM users", (),
+        allow_scan="COUNT(*) over the smallest covering index",
+    )
+    COUNT_BY_TYPE_SQL = register_query(
+        "admin.health_pending_count", "dreambox",
+        "SELECT COUNT(*) AS n FROM users WHERE account_type=?", ("AccountPending",),
+    )
+
+    def count(self, account_type: Optional[str] = None) -> int:
+        with self.storage.connect("dreambox") as db:
+            if account_type is None:
+                row = db.execute(self.COUNT_SQL).fetchone()
+            else:
+                row = db.execute(self.COUNT_BY_TYPE_SQL, (account_type,)).fetchone()
+        return int(row["n"])
+
+    EMAILS_FOR_IDS_SQL = register_query(
+        "users.emails_for_ids", "dreambox",
+        "SELECT id, email FROM users WHERE id IN ({marks})", (1, 2, 3),
+    )
+
+    def emails_for_ids(self, user_ids: Iterable[int]) -> Dict[int, str]:
+        ids = sorted({int(i) for i in user_ids})
+        if not ids:
+            return {}
+        marks = ", ".join("?" for _ in ids)
+        with self.storage.connect("dreambox") as db:
+            rows = db.execute(self.EMAILS_FOR_IDS_SQL.format(marks=marks), ids).fetchall()
+        return {int(r["id"]): r["email"] for r in rows}
+
+    DELETE_BRANDS_SQL = register_query(
+        "admin.delete_user_brands", "dreambox", "DELETE FROM brands WHERE owner_user_id=?", (1,),
+    )
+    DELETE_SURVEYS_SQL = register_query(
+        "admin.delete_user_surveys", "dreambox", "DELETE FROM survey_submissions WHERE user_id=?", (1,),
+    )
+    DELETE_ZOOM_SQL = register_query(
+        "admin.delete_user_zoom", "dreambox", "DELETE FROM zoom_meetings WHERE user_id=?", (1,),
+    )
+
+    def delete(self, user_id: int):
+        """Delete the user, their games (games db) and rows in the user DB that point at them."""
+        self.storage.games.delete_for_owner(user_id)
+        with self.storage.connect("dreambox") as db:
+            db.execute(self.DELETE_BRANDS_SQL, (user_id,))
+            db.execute(self.DELETE_SURVEYS_SQL, (user_id,))
+            db.execute(self.DELETE_ZOOM_SQL, (user_id,))
+            db.execute("DELETE FROM campaigns WHERE brand_id NOT IN (SELECT id FROM brands)")
+            db.execute("DELETE FROM users WHERE id=?", (user_id,))
+            self.cache_version.bump(db)
+        self.cache.pop(user_id)
+
+
+class ResetTokenRepository:
+    """
+    password_reset_tokens: one row per outstanding link, keyed by sha256(token)
+    so the raw token never hits the database. Expired rows are purged in
+    batches at most every PURGE_EVERY_SECONDS, piggybacking on create().
+    """
+    PURGE_EVERY_SECONDS = 300
+    PURGE_BATCH = 500
+
+    def __init__(self, storage: "Storage"):
+        self.storage = storage
+        self._purged_at = 0.0
+        # DELETE ... RETURNING needs sqlite >= 3.35
+        self._returning = storage.dialect != "sqlite" or sqlite3.sqlite_version_info >= (3, 35, 0)
+
+    @staticmethod
+    def hash_token(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def create(self, user_id: int, token: str, expires_at: float, db=None):
+        """
+        Store a new link for user_id; any older link for that user stops working.
+        Pass db to write inside the caller's transaction (the purge then waits
+        for the next standalone create, since it uses its own connections).
+        """
+        if db is not None:
+            self._insert(db, user_id, token, expires_at)
+            return
+        with self.storage.connect("dreambox") as db:
+            self._insert(db, user_id, token, expires_at)
+        if time.time() - self._purged_at > self.PURGE_EVERY_SECONDS:
+            self._purged_at = time.time()
+            self.purge_expired()
+
+    DELETE_FOR_USER_SQL = register_query(
+        "reset.delete_for_user", "dreambox", "DELETE FROM password_reset_tokens WHERE user_id = ?", (1,),
+    )
+
+    def _insert(self, db, user_id: int, token: str, expires_at: float):
+        db.execute(self.DELETE_FOR_USER_SQL, (user_id,))
+        db.execute(
+            "INSERT INTO password_reset_tokens (token_hash, user_id, expires_at, created_at) VALUES (?, ?, ?, ?)",
+            (self.hash_token(token), user_id, expires_at, _now()),
+        )
+
+    CONSUME_SQL = register_query(
+        "reset.consume", "dreambox",
+        "DELETE FROM password_reset_tokens WHERE token_hash = ? RETURNING user_id, expires_at", ("h",),
+    )
+    BY_HASH_SQL = register_query(
+        "reset.by_hash", "dreambox",
+        "SELECT user_id, expires_at FROM password_reset_tokens WHERE token_hash = ?", ("h",),
+    )
+
+    def consume(self, token: str):
+        """Delete the row for token and return it (user_id, expires_at), or None. Expired rows are consumed too."""
+        token_hash = self.hash_token(token)
+        with self.storage.connect("dreambox") as db:
+            if self._returning:
+                rows = db.execute(self.CONSUME_SQL, (token_hash,)).fetchall()
+                return rows[0] if rows else None
+            row = db.execute(self.BY_HASH_SQL, (token_hash,)).fetchone()
+            if row is None:
+                return None
+            cur = db.execute("DELETE FROM password_reset_tokens WHERE token_hash = ?", (token_hash,))
+            return row if cur.rowcount > 0 else None
+
+    PURGE_SQL = register_query(
+        "reset.purge_expired", "dreambox",
+        "DELETE FROM password_reset_tokens WHERE expires_at <= ? AND token_hash IN ("
+        "  SELECT token_hash FROM password_reset_tokens WHERE expires_at <= ? LIMIT ?"
+        ")",
+        (1.0, 1.0, 500),
+    )
+
+    def purge_expired(self) -> int:
+        total = 0
+        now = time.time()
+        while True:
+            with self.storage.connect("dreambox") as db:
+                n = db.execute(self.PURGE_SQL, (now, now, self.PURGE_BATCH)).rowcount
+            total += max(n, 0)
+            if n < self.PURGE_BATCH:
+                return total
+
+
+class GameRepository:
+    COLUMNS = "id, owner_user_id, universe_id, name, game_url, is_favorite, delete_requested, delete_requested_at"
+    # ids per IN (...) list; stays under SQLite's default 999 parameters
+    IN_BATCH = 500
+
+    def __init__(self, storage: "Storage"):
+        self.storage = storage
+        # bumped by every write below; games may live in another db, so it is
+        # bumped after the write commits rather than inside its transaction
+        self.data_version = CacheVersion(storage, "games")
+
+    # one keyset segment; {filters} is any of the *_FILTER fragments below
+    PAGE_SQL = f"SELECT {COLUMNS} FROM games WHERE owner_user_id=? AND is_favorite=?{{filters}} ORDER BY id DESC LIMIT ?"
+    DELETE_REQUESTED_FILTER = " AND delete_requested = 1"
+    NAME_PREFIX_FILTER = " AND LOWER(name) LIKE ? ESCAPE '\\'"
+    AFTER_FILTER = " AND id < ?"
+    register_query("games.page_for_owner", "games", PAGE_SQL.format(filters=""), (1, 1, 51))
+    register_query(
+        "games.page_for_owner_after", "games",
+        PAGE_SQL.format(filters=NAME_PREFIX_FILTER + AFTER_FILTER), (1, 0, "a%", 1000, 51),
+    )
+
+    def page_for_owner(self, owner_user_id: int, limit: int, after: Optional[tuple] = None,
+                       favorites_only: bool = False, delete_requested_only: bool = False,
+                       name_prefix: str = "") -> List:
+        """
+        Up to `limit` games in list order (is_favorite DESC, id DESC), after the
+        (is_favorite, id) of the previous page's last row. is_favorite is 0/1,
+        so a page is at most two seeks on idx_games_owner_fav_id
+        (owner, is_favorite = f, id < cursor) and costs the same at any depth;
+        an OR / row-value keyset predicate walks everything before the cursor.
+        """
+        filters, filter_params = "", []
+        if delete_requested_only:
+            filters += self.DELETE_REQUESTED_FILTER
+        if name_prefix:
+            like = name_prefix.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            filters += self.NAME_PREFIX_FILTER
+            filter_params.append(like)
+
+        rows: list = []
+        with self.storage.connect("games") as db:
+            for fav in ((1,) if favorites_only else (1, 0)):
+                if after is not None and fav > after[0]:
+                    continue  # the cursor is already past this segment
+                segment, params = filters, [owner_user_id, fav, *filter_params]
+                if after is not None and fav == after[0]:
+                    segment += self.AFTER_FILTER
+                    params.append(after[1])
+                params.append(limit - len(rows))
+                rows.extend(db.execute(self.PAGE_SQL.format(filters=segment), params).fetchall())
+                if len(rows) >= limit:
+                    break
+        return rows
+
+    def get(self, game_id: int, owner_user_id: Optional[int] = None):
+        with self.storage.connect("games") as db:
+            if owner_user_id is None:
+                return db.execute(f"SELECT {self.COLUMNS} FROM games WHERE id=?", (game_id,)).fetchone()
+            return db.execute(
+                f"SELECT {self.COLUMNS} FROM games WHERE id=? AND owner_user_id=?",
+                (game_id, owner_user_id),
+            ).fetchone()
+
+    OWNER_UNIVERSE_SQL = register_query(
+        "games.owner_universe_exists", "games",
+        "SELECT id FROM games WHERE owner_user_id=? AND universe_id=?", (1, 1),
+    )
+
+    def exists_for_owner(self, owner_user_id: int, universe_id: int) -> bool:
+        with self.storage.connect("games") as db:
+            row = db.execute(self.OWNER_UNIVERSE_SQL, (owner_user_id, universe_id)).fetchone()
+        return row is not None
+
+    def add(self, owner_user_id: int, universe_id: int, name: Optional[str], game_url: str) -> int:
+        with self.storage.connect("games") as db:
+            game_id = db.insert(
+                "INSERT INTO games (owner_user_id, universe_id, name, created_at, game_url, is_favorite, delete_requested, delete_requested_at) "
+                "VALUES (?, ?, ?, ?, ?, 0, 0, NULL)",
+                (owner_user_id, universe_id, name, _now(), game_url),
+            )
+        self.data_version.bump()
+        return game_id
+
+    OWNER_UNIVERSES_IN_SQL = register_query(
+        "games.owner_universes_in", "games",
+        "SELECT universe_id FROM games WHERE owner_user_id=? AND universe_id IN ({marks})", (1, 1, 2, 3),
+    )
+
+    def _existing_universe_ids(self, db, owner_user_id: int, universe_ids: Sequence[int]) -> set:
+        found = set()
+        ids = list(universe_ids)
+        for i in range(0, len(ids), self.IN_BATCH):
+            chunk = ids[i:i + self.IN_BATCH]
+            marks = ", ".join("?" for _ in chunk)
+            rows = db.execute(self.OWNER_UNIVERSES_IN_SQL.format(marks=marks), (owner_user_id, *chunk)).fetchall()
+            found.update(int(r["universe_id"]) for r in rows)
+        return found
+
+    def existing_universe_ids(self, owner_user_id: int, universe_ids: Sequence[int]) -> set:
+        """The subset of universe_ids this owner already tracks."""
+        with self.storage.connect("games") as db:
+            return self._existing_universe_ids(db, owner_user_id, universe_ids)
+
+    def add_many(self, owner_user_id: int, games: Sequence[tuple]) -> Dict[int, Optional[int]]:
+        """
+        games: (universe_id, name, game_url). One transaction; universes the
+        owner already tracks are skipped. Returns universe_id -> new game id,
+        or None where it already existed.
+        """
+        result: Dict[int, Optional[int]] = {}
+        with self.storage.connect("games") as db:
+            existing = self._existing_universe_ids(db, owner_user_id, [g[0] for g in games])
+            now = _now()
+            for universe_id, name, game_url in games:
+                if universe_id in existing or universe_id in result:
+                    result.setdefault(universe_id, None)
+                    continue
+                result[universe_id] = db.insert(
+                    "INSERT INTO games (owner_user_id, universe_id, name, created_at, game_url, is_favorite, delete_requested, delete_requested_at) "
+                    "VALUES (?, ?, ?, ?, ?, 0, 0, NULL)",
+                    (owner_user_id, universe_id, name, now, game_url),
+                )
+        if any(v is not None for v in result.values()):
+            self.data_version.bump()
+        return result
+
+    BY_UNIVERSES_SQL = register_query(
+        "games.by_universes", "games",
+        "SELECT id, universe_id, name FROM games WHERE universe_id IN ({marks})", (1, 2, 3),
+    )
+
+    def sync_names(self, names: Dict[int, str]) -> int:
+        """Set games.name from universe_id -> name, writing only rows whose name differs."""
+        if not names:
+            return 0
+        changed = []
+        with self.storage.connect("games") as db:
+            ids = list(names)
+            for i in range(0, len(ids), self.IN_BATCH):
+                chunk = ids[i:i + self.IN_BATCH]
+                marks = ", ".join("?" for _ in chunk)
+                rows = db.execute(self.BY_UNIVERSES_SQL.format(marks=marks), tuple(chunk)).fetchall()
+                changed.extend(
+                    (names[int(r["universe_id"])], r["id"]) for r in rows
+                    if r["name"] != names[int(r["universe_id"])]
+                )
+            if changed:
+                db.executemany("UPDATE games SET name=? WHERE id=?", changed)
+        if changed:
+            self.data_version.bump()
+        return len(changed)
+
+    def set_favorite(self, game_id: int, value: int):
+        with self.storage.connect("games") as db:
+            db.execute("UPDATE games SET is_favorite=? WHERE id=?", (value, game_id))
+        self.data_version.bump()
+
+    def request_delete(self, game_id: int):
+        with self.storage.connect("games") as db:
+            db.execute(
+                "UPDATE games SET delete_requested=1, delete_requested_at=? WHERE id=?",
+                (_now(), game_id),
+            )
+        self.data_version.bump()
+
+    def clear_delete_request(self, game_id: int) -> bool:
+        with self.storage.connect("games") as db:
+            cur = db.execute(
+                "UPDATE games SET delete_requested=0, delete_requested_at=NULL WHERE id=? AND delete_requested=1",
+                (game_id,),
+            )
+            changed = cur.rowcount > 0
+        if changed:
+            self.data_version.bump()
+        return changed
+
+    def delete(self, game_id: int, only_if_requested: bool = False) -> bool:
+        with self.storage.connect("games") as db:
+            if only_if_requested:
+                cur = db.execute("DELETE FROM games WHERE id=? AND delete_requested=1", (game_id,))
+            else:
+                cur = db.execute("DELETE FROM games WHERE id=?", (game_id,))
+            changed = cur.rowcount > 0
+        if changed:
+            self.data_version.bump()
+        return changed
+
+    def delete_for_owner(self, owner_user_id: int) -> int:
+        with self.storage.connect("games") as db:
+            n = db.execute("DELETE FROM games WHERE owner_user_id=?", (owner_user_id,)).rowcount
+        if n:
+            self.data_version.bump()
+        return n
+
+    DELETE_REQUESTS_SQL = register_query(
+        "admin.game_delete_requests", "games",
+        "SELECT id, universe_id, name, game_url, delete_requested_at, owner_user_id "
+        "FROM games WHERE delete_requested = 1 ORDER BY id DESC",
+    )
+
+    def delete_requests(self) -> List:
+        with self.storage.connect("games") as db:
+            return db.execute(self.DELETE_REQUESTS_SQL).fetchall()
+
+    TRACKED_UNIVERSES_SQL = register_query(
+        "games.tracked_universes", "games",
+        "SELECT DISTINCT universe_id FROM games", (),
+        allow_scan="collector needs every tracked universe; walks idx_games_universe",
+    )
+
+    def tracked_universe_ids(self) -> List[int]:
+        with self.storage.connect("games") as db:
+            rows = db.execute(self.TRACKED_UNIVERSES_SQL).fetchall()
+        return [int(r["universe_id"]) for r in rows]
+
+
+class SnapshotRepository:
+    COLUMNS = ("universe_id", "timestamp", "playing", "visits", "favorites")
+
+    def __init__(self, storage: "Storage"):
+        self.storage = storage
+
+    def insert_many(self, rows: Iterable[Sequence]) -> int:
+        """rows: (universe_id, timestamp, playing, visits, favorites). Uses COPY on postgres."""
+        return self.storage.backend.copy_rows("games", "stats_snapshots", self.COLUMNS, rows)
+
+    def latest(self, universe_id: int):
+        with self.storage.connect("games") as db:
+            return db.execute(
+                "SELECT universe_id, timestamp, playing, visits, favorites FROM stats_snapshots "
+                "WHERE universe_id=? ORDER BY timestamp DESC LIMIT 1",
+                (universe_id,),
+            ).fetchone()
+
+    LATEST_MANY_SQL = register_query(
+        "snapshots.latest_many", "games",
+        "SELECT universe_id, timestamp, playing, visits, favorites FROM stats_snapshots s "
+        "WHERE universe_id IN ({marks}) AND timestamp = "
+        "(SELECT MAX(timestamp) FROM stats_snapshots WHERE universe_id = s.universe_id)",
+        (1, 2, 3),
+    )
+
+    def latest_many(self, universe_ids: Sequence[int]) -> Dict[int, object]:
+        """universe_id -> newest snapshot row, for the ids that have one (one query)."""
+        if not universe_ids:
+            return {}
+        marks = ", ".join("?" for _ in universe_ids)
+        with self.storage.connect("games") as db:
+            rows = db.execute(self.LATEST_MANY_SQL.format(marks=marks), tuple(universe_ids)).fetchall()
+        return {int(r["universe_id"]): r for r in rows}
+
+    def iter_for_universe(self, universe_id: int, since: Optional[str] = None) -> Iterator:
+        """Stream snapshots for one universe (server-side cursor on postgres)."""
+        sql = "SELECT universe_id, timestamp, playing, visits, favorites FROM stats_snapshots WHERE universe_id=?"
+        params: list = [universe_id]
+        if since:
+            sql += " AND timestamp >= ?"
+            params.append(since)
+        sql += " ORDER BY timestamp"
+        return self.storage.backend.iter_rows("games", sql, params)
+
+
+class RobloxCacheRepository:
+    """
+    Persistent Roblox lookups (games db), shared by every worker and kept
+    across restarts. Rows carry fetched_at (epoch seconds); callers decide
+    how old is too old. See roblox_api.py. universe_meta_cache also holds
+    the metadata metadata_refresher.py keeps current, with changed_at set
+    whenever any of it changes.
+    """
+
+    METADATA_FIELDS = ("name", "description", "creator_id", "creator_name", "creator_type", "thumbnail_url")
+
+    def __init__(self, storage: "Storage"):
+        self.storage = storage
+
+    UNIVERSE_SQL = register_query(
+        "roblox.place_universe", "games",
+        "SELECT universe_id, fetched_at FROM place_universe_cache WHERE place_id=?", (1,),
+    )
+
+    def get_universe(self, place_id: int):
+        with self.storage.connect("games") as db:
+            return db.execute(self.UNIVERSE_SQL, (place_id,)).fetchone()
+
+    def put_universe(self, place_id: int, universe_id: int):
+        with self.storage.connect("games") as db:
+            db.execute(
+                "INSERT INTO place_universe_cache(place_id, universe_id, fetched_at) VALUES(?, ?, ?) "
+                "ON CONFLICT(place_id) DO UPDATE SET universe_id=excluded.universe_id, fetched_at=excluded.fetched_at",
+                (place_id, universe_id, time.time()),
+            )
+
+    META_SQL = register_query(
+        "roblox.universe_meta", "games",
+        "SELECT universe_id, name, fetched_at FROM universe_meta_cache WHERE universe_id IN ({marks})", (1, 2, 3),
+    )
+
+    def get_meta(self, universe_ids: Sequence[int]) -> Dict[int, tuple]:
+        """universe_id -> (name, fetched_at) for the ids that have a row."""
+        if not universe_ids:
+            return {}
+        marks = ", ".join("?" for _ in universe_ids)
+        with self.storage.connect("games") as db:
+            rows = db.execute(self.META_SQL.format(marks=marks), tuple(universe_ids)).fetchall()
+        return {int(r["universe_id"]): (r["name"], float(r["fetched_at"])) for r in rows}
+
+    def put_meta(self, names: Dict[int, Optional[str]]):
+        if not names:
+            return
+        now = time.time()
+        with self.storage.connect("games") as db:
+            db.executemany(
+                "INSERT INTO universe_meta_cache(universe_id, name, fetched_at) VALUES(?, ?, ?) "
+                "ON CONFLICT(universe_id) DO UPDATE SET name=excluded.name, fetched_at=excluded.fetched_at",
+                [(uid, name, now) for uid, name in names.items()],
+            )
+
+    METADATA_SQL = register_query(
+        "roblox.universe_metadata", "games",
+        f"SELECT universe_id, {', '.join(METADATA_FIELDS)}, changed_at "
+        "FROM universe_meta_cache WHERE universe_id IN ({marks})", (1, 2, 3),
+    )
+
+    def get_metadata(self, universe_ids: Sequence[int]) -> Dict[int, dict]:
+        """universe_id -> {METADATA_FIELDS..., changed_at} for the ids that have a row."""
+        if not universe_ids:
+            return {}
+        marks = ", ".join("?" for _ in universe_ids)
+        with self.storage.connect("games") as db:
+            rows = db.execute(self.METADATA_SQL.format(marks=marks), tuple(universe_ids)).fetchall()
+        return {int(r["universe_id"]): dict(r) for r in rows}
+
+    def save_metadata(self, metadata: Dict[int, dict]) -> int:
+        """Upsert full metadata rows (the caller passes only changed ones); stamps changed_at."""
+        if not metadata:
+            return 0
+        now = time.time()
+        columns = ", ".join(self.METADATA_FIELDS)
+        updates = ", ".join(f"{c}=excluded.{c}" for c in self.METADATA_FIELDS)
+        with self.storage.connect("games") as db:
+            db.executemany(
+                f"INSERT INTO universe_meta_cache(universe_id, {columns}, fetched_at, changed_at) "
+                f"VALUES(?, {', '.join('?' for _ in self.METADATA_FIELDS)}, ?, ?) "
+                f"ON CONFLICT(universe_id) DO UPDATE SET {updates}, "
+                "fetched_at=excluded.fetched_at, changed_at=excluded.changed_at",
+                [(uid, *(m.get(c) for c in self.METADATA_FIELDS), now, now) for uid, m in metadata.items()],
+            )
+        return len(metadata)
+
+
+class ProjectRepository:
+    def __init__(self, storage: "Storage"):
+        self.storage = storage
+
+    ALL_SQL = register_query(
+        "campaigns.all_projects", "campaigns",
+        "SELECT * FROM projects ORDER BY id DESC", (),
+        allow_scan="admin listing of every project",
+    )
+
+    def list_all(self) -> List:
+        with self.storage.connect("campaigns") as db:
+            return db.execute(self.ALL_SQL).fetchall()
+
+    FOR_USER_SQL = register_query(
+        "campaigns.projects_for_user", "campaigns",
+        """
+        SELECT p.* FROM projects p
+        JOIN project_access a ON a.project_id = p.id
+        WHERE a.user_email = ?
+        ORDER BY p.id DESC
+        """,
+        ("a@b.com",),
+    )
+
+    def list_for_user(self, email: str) -> List:
+        with self.storage.connect("campaigns") as db:
+            return db.execute(self.FOR_USER_SQL, (email,)).fetchall()
+
+    HAS_ACCESS_SQL = register_query(
+        "campaigns.has_project_access", "campaigns",
+        "SELECT 1 FROM project_access WHERE project_id=? AND user_email=?", (1, "a@b.com"),
+    )
+
+    def has_access(self, project_id: int, email: str) -> bool:
+        with self.storage.connect("campaigns") as db:
+            row = db.execute(self.HAS_ACCESS_SQL, (project_id, email)).fetchone()
+        return row is not None
+
+    def create(self, brand_email: str, title: str, budget: float, currency: str,
+               targets_json: str, algorithm_version: str, created_by_email: str) -> int:
+        with self.storage.connect("campaigns") as db:
+            project_id = db.insert(
+                """
+                INSERT INTO projects(brand_email, title, budget, currency, targets_json, algorithm_version, created_by_email)
+                VALUES(?,?,?,?,?,?,?)
+                """,
+                (brand_email, title, budget, currency, targets_json, algorithm_version, created_by_email),
+            )
+            # Grant the brand account access by default
+            db.execute(
+                "INSERT INTO project_access(project_id, user_email, access_role) VALUES(?,?,?) "
+                "ON CONFLICT(project_id, user_email) DO NOTHING",
+                (project_id, brand_email, "owner"),
+            )
+        return project_id
+
+    def grant_access(self, project_id: int, user_email: str, access_role: str = "viewer"):
+        with self.storage.connect("campaigns") as db:
+            db.execute(
+                "INSERT INTO project_access(project_id, user_email, access_role) VALUES(?,?,?) "
+                "ON CONFLICT(project_id, user_email) DO UPDATE SET access_role=excluded.access_role",
+                (project_id, user_email, access_role),
+            )
+
+    def link_game(self, project_id: int, game_id: int):
+        with self.storage.connect("campaigns") as db:
+            db.execute(
+                "INSERT INTO project_games(project_id, game_id) VALUES(?,?) "
+                "ON CONFLICT(project_id, game_id) DO NOTHING",
+                (project_id, game_id),
+            )
+
+
+class InvoiceRepository:
+    def __init__(self, storage: "Storage"):
+        self.storage = storage
+
+    def create(self, project_id: int, billing_type: str, amount: float, currency: str,
+               stripe_customer_id: Optional[str], stripe_invoice_id: Optional[str],
+               stripe_subscription_id: Optional[str]) -> int:
+        with self.storage.connect("campaigns") as db:
+            return db.insert(
+                """
+                INSERT INTO invoices(project_id, billing_type, amount, currency, stripe_customer_id, stripe_invoice_id, stripe_subscription_id)
+                VALUES(?,?,?,?,?,?,?)
+                """,
+                (project_id, billing_type, amount, currency,
+                 stripe_customer_id, stripe_invoice_id, stripe_subscription_id),
+            )
+
+    ALL_SQL = register_query(
+        "billing.all_invoices", "campaigns",
+        "SELECT * FROM invoices ORDER BY id DESC", (),
+        allow_scan="admin listing of every invoice",
+    )
+
+    def list_all(self) -> List:
+        with self.storage.connect("campaigns") as db:
+            return db.execute(self.ALL_SQL).fetchall()
+
+    # Only invoices for projects user can access
+    FOR_USER_SQL = register_query(
+        "billing.invoices_for_user", "campaigns",
+        """
+        SELECT i.* FROM invoices i
+        JOIN project_access a ON a.project_id = i.project_id
+        WHERE a.user_email = ?
+        ORDER BY i.id DESC
+        """,
+        ("a@b.com",),
+    )
+
+    def list_for_user(self, email: str) -> List:
+        with self.storage.connect("campaigns") as db:
+            return db.execute(self.FOR_USER_SQL, (email,)).fetchall()
+
+
+# ============================================================
+# STORAGE (backend + repositories)
+# ============================================================
+
+class Storage:
+    def __init__(self, backend):
+        self.backend = backend
+        self.dialect = backend.dialect
+        self.users = UserRepository(self)
+        self.reset_tokens = ResetTokenRepository(self)
+        self.games = GameRepository(self)
+        self.snapshots = SnapshotRepository(self)
+        self.roblox_cache = RobloxCacheRepository(self)
+        self.projects = ProjectRepository(self)
+        self.invoices = InvoiceRepository(self)
+
+    @contextmanager
+    def connect(self, db_key: str):
+        """One connection/transaction: commits on success, rolls back on error."""
+        s = self.backend.session(db_key)
+        try:
+            yield s
+            s.commit()
+        except Exception:
+            s.rollback()
+            raise
+        finally:
+            s.close()
+
+    def init_schema(self):
+        self.backend.init_schema()
+
+
+_STORAGE: Optional[Storage] = None
+
+
+def create_storage(backend: Optional[str] = None, dsn: Optional[str] = None,
+                   sqlite_paths: Optional[Dict[str, str]] = None) -> Storage:
+    backend = (backend or DB_BACKEND).lower()
+    if backend in ("postgres", "postgresql"):
+        return Storage(PostgresBackend(dsn or DATABASE_URL, DB_POOL_MIN, DB_POOL_MAX))
+    if backend != "sqlite":
+        raise RuntimeError(f"Unknown DREAMBOX_DB_BACKEND: {backend}")
+    return Storage(SQLiteBackend(sqlite_paths or SQLITE_PATHS))
+
+
+def get_storage() -> Storage:
+    global _STORAGE
+    if _STORAGE is None:
+        _STORAGE = create_storage()
+        print(f"[STORAGE] Using {_STORAGE.dialect} backend")
+    return _STORAGE
+
+
+# ============================================================
+# SMOKE TEST (python storage.py --smoke)
+# ============================================================
+
+def _smoke(store: Storage) -> None:
+    store.init_schema()
+    email = f"smoke-{os.getpid()}@example.com"
+    uid = store.users.create(email, "x", "PartnerAccount")
+    assert store.users.get_by_email(email)["id"] == uid
+    assert uid in store.users.emails_for_ids([uid])
+    assert any(r["id"] == uid for r in store.users.search_by_email("smoke-", prefix=True))
+
+    gid = store.games.add(uid, 990000 + os.getpid(), "Smoke Game", "https://www.roblox.com/games/1/x")
+    assert store.games.exists_for_owner(uid, 990000 + os.getpid())
+    store.games.request_delete(gid)
+    assert any(r["id"] == gid for r in store.games.delete_requests())
+
+    n = store.snapshots.insert_many([(990000 + os.getpid(), _now(), i, i * 10, i) for i in range(500)])
+    assert n == 500, n
+    assert sum(1 for _ in store.snapshots.iter_for_universe(990000 + os.getpid())) >= 500
+
+    store.roblox_cache.put_universe(990000 + os.getpid(), 880000 + os.getpid())
+    assert int(store.roblox_cache.get_universe(990000 + os.getpid())["universe_id"]) == 880000 + os.getpid()
+    store.roblox_cache.put_meta({880000 + os.getpid(): "Smoke Game"})
+    assert store.roblox_cache.get_meta([880000 + os.getpid()])[880000 + os.getpid()][0] == "Smoke Game"
+
+    pid = store.projects.create(email, "Smoke", 0.0, "EUR", "{}", "v1", email)
+    store.projects.grant_access(pid, email, "viewer")
+    assert store.projects.has_access(pid, email)
+    store.invoices.create(pid, "one_off", 10.0, "EUR", None, None, None)
+    assert store.invoices.list_for_user(email)
+
+    store.games.delete(gid)
+    store.users.delete(uid)
+    print(f"[STORAGE] smoke ok ({store.dialect})")
+
+
+if __name__ == "__main__":
+    if "--smoke" in sys.argv:
+        _smoke(get_storage())
+    else:
+        print(__doc__)
@@ -0,0 +1,90 @@
+# templates.py
+"""
+Compiled HTML templates with auto-escaping.
+
+Template(source) parses the source once into pre-encoded byte chunks and
+slots:
+
+  {{ name }}        value is str()'d and HTML-escaped (quotes included)
+  {{ name|safe }}   value is inserted as-is; only for trusted markup
+
+  t.partial(**values)  new Template with those slots filled at compile time.
+                       A Template value is spliced in with its own slots
+                       still open, so a page is shell + fragments compiled
+                       once, leaving only the per-request slots.
+  t.stream(**values)   yields the byte chunks with the slots filled
+  t.render(**values)   b"".join(t.stream(...))
+  t.response(**values) HTMLResponse of render()
+
+A missing value raises KeyError instead of rendering an empty hole.
+"""
+import re
+from html import escape
+from typing import Iterator, List, Tuple, Union
+
+from fastapi.responses import HTMLResponse
+
+_SLOT = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*(\|\s*safe\s*)?\}\}")
+
+# a chunk is either literal bytes or a (slot name, is_safe) pair
+Chunk = Union[bytes, Tuple[str, bool]]
+
+
+def _encode(value, safe: bool) -> bytes:
+    text = value if isinstance(value, str) else str(value)
+    return (text if safe else escape(text, quote=True)).encode("utf-8")
+
+
+def _merge(chunks: List[Chunk]) -> List[Chunk]:
+    merged: List[Chunk] = []
+    for c in chunks:
+        if isinstance(c, bytes):
+            if not c:
+                continue
+            if merged and isinstance(merged[-1], bytes):
+                merged[-1] += c
+                continue
+        merged.append(c)
+    return merged
+
+
+class Template:
+    def __init__(self, source: str = "", _chunks: List[Chunk] = None):
+        if _chunks is None:
+            _chunks, pos = [], 0
+            for m in _SLOT.finditer(source):
+                _chunks.append(source[pos:m.start()].encode("utf-8"))
+                _chunks.append((m.group(1), bool(m.group(2))))
+                pos = m.end()
+            _chunks.append(source[pos:].encode("utf-8"))
+        self.chunks = _merge(_chunks)
+        self.slots = frozenset(c[0] for c in self.chunks if not isinstance(c, bytes))
+
+    def partial(self, **values) -> "Template":
+        chunks: List[Chunk] = []
+        for c in self.chunks:
+            if isinstance(c, bytes) or c[0] not in values:
+                chunks.append(c)
+                continue
+            value = values[c[0]]
+            if isinstance(value, Template):
+                chunks.extend(value.chunks)
+            else:
+                chunks.append(_encode(value, c[1]))
+        return Template(_chunks=chunks)
+
+    def stream(self, **values) -> Iterator[bytes]:
+        for c in self.chunks:
+            if isinstance(c, bytes):
+                yield c
+                continue
+            name, safe = c
+            if name not in values:
+                raise KeyError(f"template slot {name!r} has no value")
+            yield _encode(values[name], safe)
+
+    def render(self, **values) -> bytes:
+        return b"".join(self.stream(**values))
+
+    def response(self, status_code: int = 200, **values) -> HTMLResponse:
+        return HTMLResponse(content=self.render(**values), status_code=status_code)
@@ -0,0 +1,101 @@
+"""Outbox claim/send against the local SMTP stand-in: lease expiry and retry backoff."""
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import mailer
+from sqlite_schema import create_dreambox_schema
+from storage import create_storage
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    path = str(tmp_path / "dreambox.db")
+    conn = sqlite3.connect(path)
+    create_dreambox_schema(conn)
+    conn.commit()
+    conn.close()
+    s = create_storage("sqlite", sqlite_paths={"dreambox": path})
+    monkeypatch.setattr(mailer, "get_storage", lambda: s)
+    monkeypatch.setattr(mailer, "MAIL_BACKEND", "smtp")
+    monkeypatch.setattr(mailer, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(mailer, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(mailer, "SMTP_USER", "")
+    return s
+
+
+@pytest.fixture
+def standin(store, monkeypatch):
+    server = mailer.SMTPStandin(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(mailer, "SMTP_PORT", server.server_address[1])
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _row(store, outbox_id):
+    with store.connect("dreambox") as db:
+        return db.execute("SELECT * FROM email_outbox WHERE id = ?", (outbox_id,)).fetchone()
+
+
+def _make_due(store, outbox_id):
+    # what waiting out the lease / the backoff would do
+    with store.connect("dreambox") as db:
+        db.execute("UPDATE email_outbox SET next_attempt_at = ? WHERE id = ?", (time.time() - 1, outbox_id))
+
+
+def test_expired_lease_counts_as_an_attempt(store, standin):
+    outbox_id = mailer.enqueue_email("a@example.com", "Hi", "body")
+    assert [r["id"] for r in mailer._claim_batch(10)] == [outbox_id]
+    assert mailer._claim_batch(10) == []  # leased
+
+    # the worker died mid-batch; the lease runs out and another worker reclaims it
+    _make_due(store, outbox_id)
+    rows = mailer._claim_batch(10)
+    assert [r["attempts"] for r in rows] == [1]
+
+    mailer._send_batch(rows)
+    row = _row(store, outbox_id)
+    assert (row["status"], row["body"]) == ("sent", "")
+    assert standin.received[0]["to"] == ["<a@example.com>"]
+
+
+def test_lease_that_keeps_expiring_ends_failed(store, standin, monkeypatch):
+    monkeypatch.setattr(mailer, "OUTBOX_MAX_ATTEMPTS", 3)
+    outbox_id = mailer.enqueue_email("a@example.com", "Hi", "body")
+    assert mailer._claim_batch(10)
+    for _ in range(2):
+        _make_due(store, outbox_id)
+        assert mailer._claim_batch(10)
+    _make_due(store, outbox_id)
+    assert mailer._claim_batch(10) == []
+
+    row = _row(store, outbox_id)
+    assert (row["status"], row["attempts"]) == ("failed", 3)
+    assert standin.received == []
+
+
+def test_failed_send_backs_off_then_succeeds(store, standin, monkeypatch):
+    outbox_id = mailer.enqueue_email("a@example.com", "Hi", "body")
+    rows = mailer._claim_batch(10)
+
+    # nothing listening on the SMTP port
+    closed = mailer.SMTPStandin(port=0)
+    closed.server_close()
+    monkeypatch.setattr(mailer, "SMTP_PORT", closed.server_address[1])
+    before = time.time()
+    mailer._send_batch(rows)
+    row = _row(store, outbox_id)
+    assert (row["status"], row["attempts"], row["claim_token"]) == ("pending", 1, None)
+    assert row["next_attempt_at"] >= before + mailer.OUTBOX_RETRY_BASE_SECONDS * 0.8
+    assert row["last_error"].startswith("connect:")
+    assert mailer._claim_batch(10) == []  # backing off
+
+    monkeypatch.setattr(mailer, "SMTP_PORT", standin.server_address[1])
+    _make_due(store, outbox_id)
+    mailer._send_batch(mailer._claim_batch(10))
+    assert _row(store, outbox_id)["status"] == "sent"
+    assert len(standin.received) == 1
@@ -0,0 +1,25 @@
+"""EXPLAIN QUERY PLAN checks for db_indexes.QUERY_CATALOGUE (same as `python db_indexes.py --check`)."""
+from db_indexes import QUERY_CATALOGUE, load_catalogue, run_advisor
+from query_stats import query_name
+
+
+def test_catalogued_queries_plan_without_errors_or_unexpected_scans():
+    results = run_advisor()
+    assert len(results) == len(QUERY_CATALOGUE) > 0
+
+    errors = {r["name"]: r["error"] for r in results if r["error"]}
+    assert errors == {}
+
+    scans = {r["name"]: r["scans"] for r in results if r["scans"] and not r["allow_scan"]}
+    assert scans == {}
+
+
+def test_index_pack_fixes_scans_in_the_baseline_schema():
+    # without the pack some catalogued queries scan; otherwise the check above proves nothing
+    results = run_advisor(baseline=True)
+    assert any(r["fixed_by"] for r in results)
+
+
+def test_query_stats_names_every_catalogued_statement():
+    catalogue = load_catalogue()
+    assert {name: query_name(q["sql"]) for name, q in catalogue.items()} == {name: name for name in catalogue}
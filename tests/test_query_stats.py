@@ -0,0 +1,52 @@
+"""TimedCursor timing and the slow-log plan cache."""
+import sqlite3
+import time
+
+import pytest
+
+import query_stats
+from query_stats import TimedCursor
+
+
+@pytest.fixture
+def conn():
+    query_stats.reset()
+    c = sqlite3.connect(":memory:")
+    c.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+    c.executemany("INSERT INTO t (v) VALUES (?)", [(str(i),) for i in range(10)])
+    yield c
+    c.close()
+    query_stats.reset()
+
+
+def _execute(conn, sql, params=()):
+    started = time.perf_counter()
+    return TimedCursor(conn.execute(sql, params), sql, started, lambda: ["plan"])
+
+
+def _stat(sql):
+    name = query_stats.query_name(sql)
+    return next(q for q in query_stats.snapshot()["queries"] if q["name"] == name)
+
+
+def test_select_is_recorded_without_fetching(conn):
+    sql = "SELECT id FROM t WHERE id > ?"
+    _execute(conn, sql, (0,))
+    assert _stat(sql)["calls"] == 1
+
+    cur = _execute(conn, sql, (0,))
+    assert len(cur.fetchmany(4)) == 4
+    assert len(list(cur)) == 6
+    assert _stat(sql)["calls"] == 2
+    assert _stat(sql)["rows"] == 10
+
+
+def test_plan_cache_is_keyed_by_name_and_bounded(conn, monkeypatch):
+    monkeypatch.setattr(query_stats, "SLOW_QUERY_MS", 0.000001)
+    for n in range(1, query_stats.PLAN_CACHE_SIZE + 50):
+        marks = ", ".join("?" for _ in range(n))
+        _execute(conn, f"SELECT id FROM t WHERE id IN ({marks})", range(n)).fetchall()
+        _execute(conn, f"INSERT INTO t (v) VALUES ('{n}')")
+    # every IN-list length is one query name; the literal INSERTs are capped by the LRU
+    assert len(query_stats._plans) == query_stats.PLAN_CACHE_SIZE
+    assert query_stats._plans.get(query_stats.query_name("SELECT id FROM t WHERE id IN (?, ?)")) == ["plan"]
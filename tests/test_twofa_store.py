@@ -0,0 +1,45 @@
+"""Wrong-guess lockout for both 2FA challenge stores."""
+import sqlite3
+
+import pytest
+
+import twofa_store
+from sqlite_schema import create_dreambox_schema
+from storage import create_storage
+
+
+@pytest.fixture(params=["memory", "db"])
+def challenges(request, tmp_path, monkeypatch):
+    if request.param == "memory":
+        return twofa_store.MemoryTwoFAStore()
+    path = str(tmp_path / "dreambox.db")
+    conn = sqlite3.connect(path)
+    create_dreambox_schema(conn)
+    conn.commit()
+    conn.close()
+    store = create_storage("sqlite", sqlite_paths={"dreambox": path})
+    monkeypatch.setattr(twofa_store, "get_storage", lambda: store)
+    return twofa_store.DBTwoFAStore()
+
+
+def test_correct_code_is_consumed(challenges):
+    challenges.issue(1, "123456", 60)
+    assert challenges.check(1, "123456") == twofa_store.OK
+    assert challenges.check(1, "123456") == twofa_store.MISSING
+
+
+def test_wrong_guesses_lock_the_challenge(challenges):
+    challenges.issue(1, "123456", 60)
+    for _ in range(twofa_store.TWOFA_MAX_ATTEMPTS - 1):
+        assert challenges.check(1, "000000") == twofa_store.INVALID
+    assert challenges.check(1, "000000") == twofa_store.LOCKED
+    # locked means dropped: the right code no longer works
+    assert challenges.check(1, "123456") == twofa_store.MISSING
+
+
+def test_non_ascii_code_counts_as_a_wrong_guess(challenges):
+    challenges.issue(1, "123456", 60)
+    assert challenges.check(1, "12345é") == twofa_store.INVALID
+    assert challenges.check(1, "１２３４５６") == twofa_store.INVALID
+    assert challenges.check(1, "123456") == twofa_store.OK
+
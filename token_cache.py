@@ -0,0 +1,184 @@
+# token_cache.py
+"""
+Verified-JWT cache + revocation list.
+
+decode_token() verifies the HS256 signature once per token and keeps the
+decoded claims (keyed by a sha256 digest of the token) until the token's exp,
+so repeated checks of the same bearer token during a page load are dict
+lookups.
+
+Revocations live in the token_revocations table (dreambox db) so every worker
+sees them:
+  - revoke_token(token)        one token (logout)
+  - revoke_user_tokens(uid)    every token for uid issued before now (password reset)
+Writers bump cache_versions('tokens'); workers poll it at most every
+TOKEN_REVOCATION_CHECK seconds and reload the (small, unexpired) list.
+"""
+import os
+import time
+import hashlib
+import threading
+from typing import Dict, Optional, Set
+
+from jose import jwt, JWTError
+
+from cache import TTLCache
+from db_indexes import register_query
+from storage import CacheVersion, get_storage
+
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_REVOCATION_CHECK = float(os.environ.get("TOKEN_REVOCATION_CHECK", "2"))
+# revoke_user_tokens entries outlive any token issued before them
+USER_REVOCATION_TTL_SECONDS = int(os.environ.get("USER_REVOCATION_TTL_SECONDS", str(60 * 60 * 24 * 2)))
+
+_verified = TTLCache(TOKEN_CACHE_SIZE, ttl=60 * 60 * 24)
+
+_revoked_digests: Set[str] = set()
+_revoked_before: Dict[int, float] = {}  # user_id -> tokens with iat <= this are revoked
+_version: Optional[int] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+# ============================================================
+# REVOCATION LIST
+# ============================================================
+
+def _bump(db):
+    db.execute(CacheVersion.BUMP_SQL, ("tokens",))
+
+
+REVOCATIONS_SQL = register_query(
+    "auth.token_revocations", "dreambox",
+    "SELECT token_digest, user_id, revoked_before FROM token_revocations WHERE expires_at > ?", (0.0,),
+)
+PURGE_REVOCATIONS_SQL = register_query(
+    "auth.purge_token_revocations", "dreambox",
+    "DELETE FROM token_revocations WHERE expires_at <= ?", (0.0,),
+)
+
+
+def _sync_revocations():
+    global _version, _checked_at, _revoked_digests, _revoked_before
+    now = time.monotonic()
+    if now - _checked_at < TOKEN_REVOCATION_CHECK:
+        return
+    with _lock:
+        if now - _checked_at < TOKEN_REVOCATION_CHECK:
+            return
+        _checked_at = now
+        store = get_storage()
+        try:
+            with store.connect("dreambox") as db:
+                row = db.execute(CacheVersion.READ_SQL["tokens"]).fetchone()
+                version = int(row["version"]) if row else 0
+                if version == _version:
+                    return
+                rows = db.execute(REVOCATIONS_SQL, (time.time(),)).fetchall()
+        except Exception as e:
+            # keep the last good list; try again next poll
+            print(f"[AUTH] token revocation reload failed: {e}")
+            return
+
+        digests: Set[str] = set()
+        before: Dict[int, float] = {}
+        for r in rows:
+            if r["token_digest"]:
+                digests.add(r["token_digest"])
+            if r["user_id"] is not None:
+                uid = int(r["user_id"])
+                before[uid] = max(before.get(uid, 0.0), float(r["revoked_before"] or 0))
+        # swap whole objects so readers never see a half-built list
+        _revoked_digests = digests
+        _revoked_before = before
+        _version = version
+
+
+def revoke_token(token: str, exp: Optional[float] = None):
+    """Revoke one token until its exp (read from the token when not given)."""
+    if exp is None:
+        try:
+            exp = float(jwt.get_unverified_claims(token).get("exp") or 0)
+        except JWTError:
+            return
+    now = time.time()
+    if exp <= now:
+        return
+    digest = token_digest(token)
+    with get_storage().connect("dreambox") as db:
+        db.execute(PURGE_REVOCATIONS_SQL, (now,))
+        db.execute(
+            "INSERT INTO token_revocations(token_digest, user_id, revoked_before, expires_at) VALUES(?, NULL, NULL, ?)",
+            (digest, exp),
+        )
+        _bump(db)
+    _revoked_digests.add(digest)
+
+
+def revoke_user_tokens(user_id: int):
+    """
+    Revoke every token for user_id issued up to now. The cutoff keeps
+    sub-second precision: tokens carry a fractional iat, so a token issued
+    earlier in the same second is revoked and one issued afterwards is not.
+    """
+    now = time.time()
+    with get_storage().connect("dreambox") as db:
+        db.execute(PURGE_REVOCATIONS_SQL, (now,))
+        db.execute(
+            "INSERT INTO token_revocations(token_digest, user_id, revoked_before, expires_at) VALUES(NULL, ?, ?, ?)",
+            (user_id, now, now + USER_REVOCATION_TTL_SECONDS),
+        )
+        _bump(db)
+    _revoked_before[int(user_id)] = max(_revoked_before.get(int(user_id), 0.0), now)
+
+
+def _is_revoked(digest: str, claims: dict) -> bool:
+    if digest in _revoked_digests:
+        return True
+    if not _revoked_before:
+        return False
+    try:
+        uid = int(claims.get("sub"))
+    except (TypeError, ValueError):
+        return False
+    cutoff = _revoked_before.get(uid)
+    return cutoff is not None and float(claims.get("iat") or 0) <= cutoff
+
+
+# ============================================================
+# VERIFY
+# ============================================================
+
+def decode_token(token: str, secret: str, algorithm: str) -> dict:
+    """
+    jwt.decode() with a cache in front. Raises JWTError for bad, expired or
+    revoked tokens, same as jose.
+    """
+    _sync_revocations()
+    digest = token_digest(token)
+    key = (digest, algorithm, secret)
+
+    claims = _verified.get(key)
+    if claims is None:
+        claims = jwt.decode(token, secret, algorithms=[algorithm])
+        exp = claims.get("exp")
+        if exp is not None:
+            ttl = float(exp) - time.time()
+            if ttl > 0:
+                _verified.set(key, claims, ttl=ttl)
+
+    if _is_revoked(digest, claims):
+        raise JWTError("Token has been revoked")
+    return claims
+
+
+def stats() -> dict:
+    return {
+        "verified": _verified.stats(),
+        "revoked_tokens": len(_revoked_digests),
+        "revoked_users": len(_revoked_before),
+    }
@@ -0,0 +1,169 @@
+# twofa_store.py
+"""
+Short-lived 2FA challenges, kept out of the users table.
+
+TWOFA_STORE:
+  memory   dict in this process (default when WEB_CONCURRENCY is unset or 1)
+  db       twofa_challenges table in the dreambox db, for several workers
+
+Either way a challenge is (code, expires_at, attempts) per user. Logging in
+again replaces it, a correct code consumes it, and TWOFA_MAX_ATTEMPTS wrong
+codes drop it so the user has to log in again. Expired rows are swept in
+batches at most every TWOFA_SWEEP_SECONDS.
+"""
+import os
+import hmac
+import time
+import sqlite3
+import threading
+from typing import Dict, Tuple
+
+from db_indexes import register_query
+from storage import get_storage
+
+_default_store = "memory" if os.environ.get("WEB_CONCURRENCY", "1").strip() in ("", "1") else "db"
+TWOFA_STORE = os.environ.get("TWOFA_STORE", _default_store).strip().lower()
+TWOFA_MAX_ATTEMPTS = int(os.environ.get("TWOFA_MAX_ATTEMPTS", "5"))
+TWOFA_SWEEP_SECONDS = float(os.environ.get("TWOFA_SWEEP_SECONDS", "60"))
+TWOFA_SWEEP_BATCH = 500
+
+# check() results
+OK = "ok"
+MISSING = "missing"
+EXPIRED = "expired"
+INVALID = "invalid"
+LOCKED = "locked"
+
+
+def _same_code(stored: str, code: str) -> bool:
+    # compare_digest only takes ASCII str; bytes let a non-ASCII guess count as a wrong code
+    return hmac.compare_digest(stored.encode("utf-8"), code.encode("utf-8"))
+
+
+class MemoryTwoFAStore:
+    def __init__(self):
+        self._items: Dict[int, Tuple[str, float, int]] = {}  # user_id -> (code, expires_at, attempts)
+        self._lock = threading.Lock()
+        self._swept_at = 0.0
+
+    def issue(self, user_id: int, code: str, ttl_seconds: float):
+        now = time.time()
+        with self._lock:
+            self._items[user_id] = (code, now + ttl_seconds, 0)
+            if now - self._swept_at > TWOFA_SWEEP_SECONDS:
+                self._swept_at = now
+                for uid in [u for u, (_, exp, _) in self._items.items() if exp <= now]:
+                    del self._items[uid]
+
+    def check(self, user_id: int, code: str) -> str:
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is None:
+                return MISSING
+            stored, expires_at, attempts = item
+            if time.time() > expires_at:
+                del self._items[user_id]
+                return EXPIRED
+            if _same_code(stored, code):
+                del self._items[user_id]
+                return OK
+            attempts += 1
+            if attempts >= TWOFA_MAX_ATTEMPTS:
+                del self._items[user_id]
+                return LOCKED
+            self._items[user_id] = (stored, expires_at, attempts)
+            return INVALID
+
+    def discard(self, user_id: int):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {"store": "memory", "active": len(self._items)}
+
+
+class DBTwoFAStore:
+    def __init__(self):
+        self._swept_at = 0.0
+        # UPDATE ... RETURNING needs sqlite >= 3.35
+        self._returning = get_storage().dialect != "sqlite" or sqlite3.sqlite_version_info >= (3, 35, 0)
+
+    def issue(self, user_id: int, code: str, ttl_seconds: float):
+        now = time.time()
+        with get_storage().connect("dreambox") as db:
+            db.execute(
+                "INSERT INTO twofa_challenges (user_id, code, expires_at, attempts) VALUES (?, ?, ?, 0) "
+                "ON CONFLICT(user_id) DO UPDATE SET code = excluded.code, expires_at = excluded.expires_at, attempts = 0",
+                (user_id, code, now + ttl_seconds),
+            )
+        if now - self._swept_at > TWOFA_SWEEP_SECONDS:
+            self._swept_at = now
+            self.sweep()
+
+    BY_USER_SQL = register_query(
+        "twofa.by_user", "dreambox",
+        "SELECT code, expires_at FROM twofa_challenges WHERE user_id = ?", (1,),
+    )
+    WRONG_GUESS_SQL = "UPDATE twofa_challenges SET attempts = attempts + 1 WHERE user_id = ?"
+
+    def check(self, user_id: int, code: str) -> str:
+        with get_storage().connect("dreambox") as db:
+            row = db.execute(self.BY_USER_SQL, (user_id,)).fetchone()
+            if row is None:
+                return MISSING
+            if time.time() > float(row["expires_at"]):
+                db.execute("DELETE FROM twofa_challenges WHERE user_id = ?", (user_id,))
+                return EXPIRED
+            if _same_code(row["code"], code):
+                # code in the WHERE: two racing verifications can't both consume it
+                cur = db.execute("DELETE FROM twofa_challenges WHERE user_id = ? AND code = ?", (user_id, code))
+                return OK if cur.rowcount > 0 else MISSING
+            # count the guess in the database, not from the row read above, so
+            # parallel wrong guesses each see every guess before them
+            if self._returning:
+                counted = db.execute(self.WRONG_GUESS_SQL + " RETURNING attempts", (user_id,)).fetchone()
+            else:
+                # the UPDATE holds the write lock until commit, so this re-read is still ours
+                db.execute(self.WRONG_GUESS_SQL, (user_id,))
+                counted = db.execute("SELECT attempts FROM twofa_challenges WHERE user_id = ?", (user_id,)).fetchone()
+            if counted is None:
+                return MISSING  # consumed or dropped since the read above
+            if int(counted["attempts"]) >= TWOFA_MAX_ATTEMPTS:
+                db.execute("DELETE FROM twofa_challenges WHERE user_id = ?", (user_id,))
+                return LOCKED
+            return INVALID
+
+    def discard(self, user_id: int):
+        with get_storage().connect("dreambox") as db:
+            db.execute("DELETE FROM twofa_challenges WHERE user_id = ?", (user_id,))
+
+    SWEEP_SQL = register_query(
+        "twofa.sweep", "dreambox",
+        "DELETE FROM twofa_challenges WHERE user_id IN ("
+        "  SELECT user_id FROM twofa_challenges WHERE expires_at <= ? LIMIT ?"
+        ")",
+        (1.0, 500),
+    )
+
+    def sweep(self) -> int:
+        """Delete expired challenges, TWOFA_SWEEP_BATCH rows per statement."""
+        total = 0
+        while True:
+            with get_storage().connect("dreambox") as db:
+                n = db.execute(self.SWEEP_SQL, (time.time(), TWOFA_SWEEP_BATCH)).rowcount
+            total += max(n, 0)
+            if n < TWOFA_SWEEP_BATCH:
+                return total
+
+    def stats(self) -> dict:
+        with get_storage().connect("dreambox") as db:
+            row = db.execute("SELECT COUNT(*) AS n FROM twofa_challenges").fetchone()
+        return {"store": "db", "active": int(row["n"])}
+
+
+if TWOFA_STORE == "db":
+    challenges = DBTwoFAStore()
+elif TWOFA_STORE == "memory":
+    challenges = MemoryTwoFAStore()
+else:
+    raise RuntimeError(f"Unknown TWOFA_STORE: {TWOFA_STORE}")